@@ -0,0 +1,130 @@
+"""
+Committee -> candidate allocation weights for committees linked to several candidates.
+
+``individual_support._build_cmte_to_cand`` gives each committee one
+candidate (principal designation first, else the first ccl row), so a joint
+fundraising or multi-candidate committee's receipts all land on one of its
+candidates. With ``INDIV_ALLOCATION`` set to another rule, the step instead
+builds a sparse (committee x candidate) weight matrix from every ccl link:
+
+    "principal"    one candidate per committee, as _build_cmte_to_cand (default)
+    "equal"        each linked candidate gets 1/k of the committee's receipts
+    "designation"  links weighted by ALLOCATION_DSGN_WEIGHTS[ccl CMTE_DSGN]
+                   (unlisted designations weigh 1.0), normalized per committee
+
+Each chunk is reduced to per-committee sums with one bincount and spread to
+candidates with one sparse mat-vec (``allocate``). Rows and columns are
+``id_codes.IdCodes`` codes and only the links are stored (CSR), so memory is
+proportional to the ccl row count rather than committees x candidates. Uses
+scipy.sparse when installed, else the same product as a NumPy bincount.
+
+Links to candidates outside cn are ignored when normalizing; links to
+candidates outside the office/year of a run keep their share, which the
+step drops (``restrict``) and records under the ledger's office_year stage.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+try:
+    import scipy.sparse as sparse
+except ImportError:  # optional: NumPy fallback below
+    sparse = None
+
+
+ALLOCATION_RULES = ("principal", "equal", "designation")
+
+
+class AllocationMatrix:
+    """CSR (committee code x candidate code) weights; each non-empty row sums to 1 before ``restrict``."""
+
+    def __init__(self, indptr, indices, weights, n_cands: int):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=float)
+        self.n_cands = n_cands
+        # Row of every stored link, for the NumPy mat-vec and expand()
+        self._rows = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int32), np.diff(self.indptr))
+        self._matrix_t = None
+        if sparse is not None:
+            self._matrix_t = sparse.csr_matrix(
+                (self.weights, self.indices, self.indptr), shape=(len(self.indptr) - 1, n_cands)
+            ).T.tocsr()
+
+    @property
+    def n_links(self) -> int:
+        return len(self.indices)
+
+    @classmethod
+    def from_ccl(cls, ccl: pd.DataFrame, cmte_codes, cand_codes, rule: str, dsgn_weights: dict | None = None):
+        """
+        Weights for every committee of ``cmte_codes`` from the ccl links.
+
+        Args:
+            ccl: Linkage rows (CMTE_ID, CAND_ID, CMTE_DSGN)
+            cmte_codes: IdCodes of committees (matrix rows)
+            cand_codes: IdCodes of candidates (matrix columns)
+            rule: One of ALLOCATION_RULES
+            dsgn_weights: CMTE_DSGN -> relative link weight for rule "designation"
+        """
+        if rule not in ALLOCATION_RULES:
+            raise ValueError(f"Unknown allocation rule {rule!r}; expected one of {ALLOCATION_RULES}")
+        links = ccl.dropna(subset=["CMTE_ID", "CAND_ID"])
+        dsgn = links["CMTE_DSGN"].fillna("")
+        if rule == "principal":
+            from individual_support import _build_cmte_to_cand
+            chosen = _build_cmte_to_cand(ccl)
+            links = pd.DataFrame({"CMTE_ID": list(chosen), "CAND_ID": list(chosen.values())})
+            weight = np.ones(len(links))
+        elif rule == "equal":
+            weight = np.ones(len(links))
+        else:
+            weight = dsgn.map(dsgn_weights or {}).fillna(1.0).to_numpy(dtype=float)
+
+        frame = pd.DataFrame({
+            "row": cmte_codes.encode(links["CMTE_ID"]),
+            "col": cand_codes.encode(links["CAND_ID"]),
+            "w": weight,
+        })
+        # A committee may be linked to the same candidate in several ccl rows (years, designations)
+        frame = frame[(frame["row"] >= 0) & (frame["col"] >= 0) & (frame["w"] > 0)]
+        frame = frame.groupby(["row", "col"], as_index=False)["w"].max()
+        frame["w"] /= frame.groupby("row")["w"].transform("sum")
+
+        counts = np.bincount(frame["row"].to_numpy(), minlength=len(cmte_codes))
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+        return cls(indptr, frame["col"].to_numpy(), frame["w"].to_numpy(), len(cand_codes))
+
+    def restrict(self, is_valid_cand) -> "AllocationMatrix":
+        """Drop the links to candidates outside ``is_valid_cand`` (IdCodes mask) without renormalizing."""
+        keep = np.asarray(is_valid_cand)[self.indices]
+        counts = np.bincount(self._rows[keep], minlength=len(self.indptr) - 1)
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+        return AllocationMatrix(indptr, self.indices[keep], self.weights[keep], self.n_cands)
+
+    def row_share(self) -> np.ndarray:
+        """Table of the weight each committee passes on (0 for committees without links), trailing slot 0."""
+        share = np.zeros(len(self.indptr))
+        share[:-1] = np.bincount(self._rows, weights=self.weights, minlength=len(self.indptr) - 1)
+        return share
+
+    def allocate(self, cmte_sums) -> np.ndarray:
+        """Per-candidate totals ``W.T @ cmte_sums`` for a vector of per-committee amounts."""
+        cmte_sums = np.asarray(cmte_sums, dtype=float)
+        if self._matrix_t is not None:
+            return self._matrix_t @ cmte_sums
+        return np.bincount(self.indices, weights=self.weights * cmte_sums[self._rows], minlength=self.n_cands)
+
+    def expand(self, cmte) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        One entry per (row of ``cmte``, linked candidate): returns the row
+        positions, candidate codes and weights (CSR row gather).
+        """
+        cmte = np.asarray(cmte)
+        starts = self.indptr[cmte]
+        lens = self.indptr[cmte + 1] - starts
+        rows = np.repeat(np.arange(len(cmte)), lens)
+        pos = np.arange(int(lens.sum())) - np.repeat(np.cumsum(lens) - lens - starts, lens)
+        return rows, self.indices[pos], self.weights[pos]
@@ -0,0 +1,224 @@
+"""
+Mergeable quantile sketches of TRANSACTION_AMT.
+
+Each support step keeps one t-digest per candidate (plus one for the whole
+category) while it streams the raw file. Digests from different chunks,
+workers or offices merge into one, so p50/p90/p99 contribution sizes can be
+read back from the small JSON files written next to the outputs.
+
+Usage:
+    python amount_sketches.py total_individual_amount_sketch_16.json
+    python amount_sketches.py senate_*_amount_sketch_16.json --cand S0FL00338
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_DELTA = 200
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class TDigest:
+    """Merging t-digest over float amounts (numpy centroids, no dependencies)."""
+
+    def __init__(self, delta: int = DEFAULT_DELTA):
+        self.delta = delta
+        self.means = np.empty(0, dtype=float)
+        self.weights = np.empty(0, dtype=float)
+        self.n = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self._buf_means: list[np.ndarray] = []
+        self._buf_weights: list[np.ndarray] = []
+        self._buf_size = 0
+
+    def update(self, values) -> None:
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return
+        self._push(values, np.ones(values.size))
+        self.n += int(values.size)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def merge(self, other: "TDigest") -> None:
+        other._compress()
+        if other.n == 0:
+            return
+        self._push(other.means, other.weights)
+        self.n += other.n
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _push(self, means: np.ndarray, weights: np.ndarray) -> None:
+        self._buf_means.append(means)
+        self._buf_weights.append(weights)
+        self._buf_size += means.size
+        if self._buf_size > 20 * self.delta:
+            self._compress()
+
+    def _compress(self) -> None:
+        if not self._buf_means:
+            return
+        means = np.concatenate([self.means] + self._buf_means)
+        weights = np.concatenate([self.weights] + self._buf_weights)
+        self._buf_means, self._buf_weights, self._buf_size = [], [], 0
+
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        cum = np.cumsum(weights)
+        q_left = (cum - weights) / cum[-1]
+        # k1 scale function: small clusters at the tails, large in the middle
+        k = self.delta / (2 * np.pi) * np.arcsin(np.clip(2 * q_left - 1, -1, 1))
+        cluster = np.floor(k - k[0]).astype(np.int64)
+        _, cluster = np.unique(cluster, return_inverse=True)
+
+        w = np.bincount(cluster, weights=weights)
+        self.means = np.bincount(cluster, weights=weights * means) / w
+        self.weights = w
+
+    def quantile(self, q: float) -> float:
+        self._compress()
+        if self.n == 0:
+            return float("nan")
+        if self.means.size == 1:
+            return float(self.means[0])
+        cum = np.cumsum(self.weights)
+        centers = (cum - self.weights / 2) / cum[-1]
+        xs = np.concatenate([[0.0], centers, [1.0]])
+        ys = np.concatenate([[self.min], self.means, [self.max]])
+        return float(np.interp(q, xs, ys))
+
+    def to_dict(self) -> dict:
+        self._compress()
+        return {
+            "delta": self.delta,
+            "n": self.n,
+            "total": self.total,
+            "min": self.min if self.n else None,
+            "max": self.max if self.n else None,
+            "means": self.means.round(4).tolist(),
+            "weights": self.weights.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "TDigest":
+        td = cls(delta=d.get("delta", DEFAULT_DELTA))
+        td.means = np.asarray(d["means"], dtype=float)
+        td.weights = np.asarray(d["weights"], dtype=float)
+        td.n = int(d["n"])
+        td.total = float(d.get("total", 0.0))
+        if td.n:
+            td.min = float(d["min"])
+            td.max = float(d["max"])
+        return td
+
+
+class SketchSet:
+    """One t-digest per candidate plus an overall digest for the category."""
+
+    def __init__(self, category: str, delta: int = DEFAULT_DELTA):
+        self.category = category
+        self.delta = delta
+        self.overall = TDigest(delta)
+        self.candidates: dict[str, TDigest] = {}
+
+    def update(self, cand_ids: pd.Series, amounts: pd.Series) -> None:
+        """Add one chunk of (CAND_ID, TRANSACTION_AMT) rows."""
+        if len(amounts) == 0:
+            return
+        values = np.asarray(amounts, dtype=float)
+        self.overall.update(values)
+
+        codes, uniques = pd.factorize(np.asarray(cand_ids))
+        order = np.argsort(codes, kind="stable")
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        for idx in np.split(order, bounds):
+            cand = uniques[codes[idx[0]]]
+            td = self.candidates.get(cand)
+            if td is None:
+                td = self.candidates[cand] = TDigest(self.delta)
+            td.update(values[idx])
+
+    def merge(self, other: "SketchSet") -> None:
+        self.overall.merge(other.overall)
+        for cand, td in other.candidates.items():
+            mine = self.candidates.get(cand)
+            if mine is None:
+                mine = self.candidates[cand] = TDigest(self.delta)
+            mine.merge(td)
+
+    def quantile_table(self, quantiles=DEFAULT_QUANTILES) -> pd.DataFrame:
+        """Per-candidate transaction count, total and quantiles, overall row first."""
+        rows = []
+        for key, td in [("ALL", self.overall)] + sorted(self.candidates.items()):
+            row = {"CATEGORY": self.category, "CAND_ID": key, "N_TRANSACTIONS": td.n, "TOTAL_AMT": td.total}
+            for q in quantiles:
+                row[f"P{round(q * 100):g}"] = td.quantile(q)
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def to_json(self, path: Path, **meta) -> None:
+        payload = {
+            "category": self.category,
+            **meta,
+            "overall": self.overall.to_dict(),
+            "candidates": {c: td.to_dict() for c, td in sorted(self.candidates.items())},
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, path: Path) -> "SketchSet":
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        ss = cls(payload["category"], delta=payload["overall"].get("delta", DEFAULT_DELTA))
+        ss.overall = TDigest.from_dict(payload["overall"])
+        ss.candidates = {c: TDigest.from_dict(d) for c, d in payload["candidates"].items()}
+        return ss
+
+
+def sketch_path(out_dir: Path, prefix: str, category: str, suffix: str) -> Path:
+    """Location of a category's sketch file, next to the CSV outputs."""
+    return out_dir / f"{prefix}_{category}_amount_sketch_{suffix}.json"
+
+
+def load_and_merge(paths) -> dict[str, SketchSet]:
+    """Load sketch files and merge them by category (e.g. across offices or cycles)."""
+    merged: dict[str, SketchSet] = {}
+    for p in paths:
+        ss = SketchSet.from_json(Path(p))
+        if ss.category in merged:
+            merged[ss.category].merge(ss)
+        else:
+            merged[ss.category] = ss
+    return merged
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Query TRANSACTION_AMT quantiles from saved sketch files.")
+    ap.add_argument("files", nargs="+", type=Path, help="*_amount_sketch_*.json files (merged by category)")
+    ap.add_argument("--cand", action="append", default=[], help="Only show these CAND_IDs (repeatable)")
+    ap.add_argument("--q", type=float, nargs="+", default=list(DEFAULT_QUANTILES), help="Quantiles to report")
+    args = ap.parse_args()
+
+    for category, ss in load_and_merge(args.files).items():
+        table = ss.quantile_table(args.q)
+        if args.cand:
+            table = table[table["CAND_ID"].isin(["ALL"] + args.cand)]
+        print(f"\n{category}:")
+        print(table.to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""
+Side-by-side benchmark of the aggregation engines on the configured cycle
+or on a generated synthetic cycle.
+
+Each engine runs the support steps plus merge_support for one office type in
+a fresh process (so peak memory is its own), the output CSVs are hashed and
+compared against the first engine's, and one record per run is appended to
+``outputs/bench_history.jsonl``.
+
+With ``--readers`` the bulk-file parsers (stream_reader backends) are timed
+instead: each streams itcont and itpas2 through ``iter_chunks`` in a fresh
+process, the parsed rows are hashed and compared, and the records carry
+rows/s and MB/s per file (``kind: "reader"``).
+
+Usage:
+    python bench_engines.py                       # pandas vs sql, total office
+    python bench_engines.py --engines pandas sql --office senate --repeat 3
+    python bench_engines.py --engines pandas sql polars --synthetic 5000000
+    python bench_engines.py --readers pandas arrow --threads 8 --repeat 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import platform
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+OFFICE_FILTERS = {"senate": {"S"}, "presidential": {"P"}, "total": {"S", "P"}}
+OUTPUT_NAMES = ["final_support_table", "candidates_no_support", "candidates_all_with_flag"]
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(kb / 1024 / (1024 if platform.system() == "Darwin" else 1), 1)
+
+
+def make_synthetic_cycle(cycle_dir: Path, n_indiv: int, n_pas2: int = None, n_cands: int = 2000,
+                         seed: int = 0) -> Path:
+    """
+    Write a synthetic cycle (cn/cm/ccl/itcont/itpas2) under ``cycle_dir`` in the
+    configured cycle's layout. Amounts carry cents, and a few rows exercise the
+    filters: other transaction types, non-positive amounts, unlinked
+    committees and over-long lines.
+    """
+    from config import SUFFIX, TARGET_ELECTION_YR, CN_COLS, CM_COLS, CCL_COLS, INDIV_COLS, ITPAS2_COLS
+
+    rng = np.random.default_rng(seed)
+    n_pas2 = n_indiv // 4 if n_pas2 is None else n_pas2
+    year = int(TARGET_ELECTION_YR)
+
+    def write(folder, name, cols, data, n):
+        path = cycle_dir / f"{folder}{SUFFIX}" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fields = [np.asarray(data[c], dtype=str) if c in data else np.full(n, "") for c in cols]
+        lines = fields[0]
+        for f in fields[1:]:
+            lines = np.char.add(np.char.add(lines, "|"), f)
+        path.write_text("\n".join(lines.tolist()) + "\n", encoding="utf-8")
+
+    cand_ids = np.array([f"{'S' if i % 4 else 'P'}{i:08d}" for i in range(n_cands)])
+    states = np.array(["CA", "TX", "NY", "FL", "OH", "PA", "AZ", "GA", "00"])
+    write("cn", "cn.txt", CN_COLS, {
+        "CAND_ID": cand_ids,
+        "CAND_NAME": np.char.add("NAME ", cand_ids),
+        "CAND_PTY_AFFILIATION": rng.choice(["DEM", "REP", "LIB", "IND"], n_cands),
+        "CAND_ELECTION_YR": np.where(rng.random(n_cands) < 0.9, year, year - 2),
+        "CAND_OFFICE_ST": rng.choice(states, n_cands),
+        "CAND_OFFICE": cand_ids.astype("U1"),
+        "CAND_STATUS": rng.choice(["C", "N", "P"], n_cands),
+        "CAND_PCC": np.array([f"C{i:08d}" for i in range(n_cands)]),
+    }, n_cands)
+
+    # One principal campaign committee per candidate, then superPACs and PACs
+    n_pacs = max(n_cands // 2, 1)
+    pcc_ids = np.array([f"C{i:08d}" for i in range(n_cands)])
+    other_ids = np.array([f"C9{i:07d}" for i in range(n_pacs)])
+    other_tp = rng.choice(["O", "Q", "N", "Q"], n_pacs)
+    write("cm", "cm.txt", CM_COLS, {
+        "CMTE_ID": np.concatenate([pcc_ids, other_ids]),
+        "CMTE_NM": np.char.add("CMTE ", np.concatenate([pcc_ids, other_ids])),
+        "CMTE_DSGN": np.concatenate([np.full(n_cands, "P"), np.full(n_pacs, "U")]),
+        "CMTE_TP": np.concatenate([np.where(cand_ids.astype("U1") == "P", "P", "S"), other_tp]),
+        "ORG_TP": np.concatenate([np.full(n_cands, ""), np.where(other_tp == "Q", rng.choice(["C", "", "L"], n_pacs), "")]),
+    }, n_cands + n_pacs)
+    write("ccl", "ccl.txt", CCL_COLS, {
+        "CAND_ID": cand_ids,
+        "CAND_ELECTION_YR": np.full(n_cands, year),
+        "FEC_ELECTION_YR": np.full(n_cands, year),
+        "CMTE_ID": pcc_ids,
+        "CMTE_TP": np.where(cand_ids.astype("U1") == "P", "P", "S"),
+        "CMTE_DSGN": np.full(n_cands, "P"),
+        "LINKAGE_ID": np.arange(n_cands),
+    }, n_cands)
+
+    def cents(n):
+        amt = np.round(rng.lognormal(4.5, 1.2, n), 2)
+        amt[rng.random(n) < 0.01] *= -1
+        return np.char.mod("%.2f", amt)
+
+    cmte = np.where(rng.random(n_indiv) < 0.97, rng.choice(pcc_ids, n_indiv), "C99999999")
+    write("indiv", "itcont.txt", INDIV_COLS, {
+        "CMTE_ID": cmte,
+        "TRANSACTION_TP": rng.choice(["15", "15E", "15C", "22Y"], n_indiv, p=[0.85, 0.1, 0.03, 0.02]),
+        "ENTITY_TP": rng.choice(["IND", "ORG"], n_indiv, p=[0.98, 0.02]),
+        "NAME": np.char.add("DONOR, NUMBER", rng.integers(0, n_indiv, n_indiv).astype(str)),
+        "STATE": rng.choice(states[:-1], n_indiv),
+        "TRANSACTION_DT": np.full(n_indiv, f"0101{year}"),
+        "TRANSACTION_AMT": cents(n_indiv),
+        "SUB_ID": np.arange(4_000_000_000_000_000_001, 4_000_000_000_000_000_001 + n_indiv),
+    }, n_indiv)
+
+    write("pas2", "itpas2.txt", ITPAS2_COLS, {
+        "CMTE_ID": rng.choice(other_ids, n_pas2),
+        "TRANSACTION_TP": rng.choice(["24E", "24K", "24A", "24Z"], n_pas2, p=[0.4, 0.45, 0.1, 0.05]),
+        "ENTITY_TP": np.full(n_pas2, "CCM"),
+        "TRANSACTION_DT": np.full(n_pas2, f"0101{year}"),
+        "TRANSACTION_AMT": cents(n_pas2),
+        "CAND_ID": rng.choice(cand_ids, n_pas2),
+        "SUB_ID": np.arange(4_100_000_000_000_000_001, 4_100_000_000_000_000_001 + n_pas2),
+    }, n_pas2)
+
+    # A couple of lines with an embedded pipe, which every engine must drop
+    with open(cycle_dir / f"indiv{SUFFIX}" / "itcont.txt", "a", encoding="utf-8") as f:
+        f.write(f"{pcc_ids[0]}|N|Q1|G{year}|1|15|IND|BAD|PIPE|CITY|CA|00000|X|Y|0101{year}|99.99||T|1|||1|EXTRA\n")
+    return cycle_dir
+
+
+def _point_config_at(cycle_dir: Path) -> None:
+    """Redirect config's input/output folders to another cycle directory (same cycle label)."""
+    import config
+
+    for name, folder in [("CM_DIR", "cm"), ("CN_DIR", "cn"), ("CCL_DIR", "ccl"),
+                         ("INDIV_DIR", "indiv"), ("PAS2_DIR", "pas2")]:
+        setattr(config, name, cycle_dir / f"{folder}{config.SUFFIX}")
+    config.CYCLE_DIR = cycle_dir
+    config.OUT_DIR = cycle_dir / "outputs"
+    for name, sub in [("SENATE_OUT_DIR", "senate"), ("PRESIDENTIAL_OUT_DIR", "presidential"), ("TOTAL_OUT_DIR", "total")]:
+        setattr(config, name, config.OUT_DIR / sub)
+        getattr(config, name).mkdir(parents=True, exist_ok=True)
+
+
+def _run_engine(engine: str, office: str, threads, cycle_dir, queue) -> None:
+    """Worker: run one engine end to end and report timing, memory and output hashes."""
+    import contextlib
+    import io
+
+    if cycle_dir is not None:
+        _point_config_at(cycle_dir)
+
+    import merge_support
+    from config import SUFFIX, get_output_dir
+
+    office_filter = OFFICE_FILTERS[office]
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if engine == "polars":
+            # Support steps and merge run as one lazy plan; there is no separate support phase to time
+            import polars_engine
+            polars_engine.main(office_filter)
+            t_support = time.perf_counter() - t0
+        elif engine == "sql":
+            import sql_engine
+            frames = sql_engine.main(office_filter, threads=threads)
+        else:
+            import superpac_ie_support, individual_support, pac_support_corp_union
+            frames = {
+                "superpac": superpac_ie_support.main(office_filter),
+                "indiv": individual_support.main(office_filter),
+                "pac": pac_support_corp_union.main(office_filter),
+            }
+        if engine != "polars":
+            t_support = time.perf_counter() - t0
+            merge_support.main(office_filter, frames=frames)
+    seconds = time.perf_counter() - t0
+
+    out_dir = get_output_dir(office_filter)
+    hashes = {}
+    for name in OUTPUT_NAMES:
+        path = out_dir / f"{office}_{name}_{SUFFIX}.csv"
+        hashes[name] = hashlib.sha256(path.read_bytes()).hexdigest()
+    queue.put({"seconds": seconds, "support_seconds": t_support, "peak_rss_mb": _peak_rss_mb(), "hashes": hashes})
+
+
+def _run_reader(backend: str, threads, cycle_dir, queue) -> None:
+    """Worker: stream itcont and itpas2 through one reader backend and report throughput and row hashes."""
+    import pandas as pd
+
+    if cycle_dir is not None:
+        _point_config_at(cycle_dir)
+    if backend == "arrow" and threads:
+        import pyarrow as pa
+        pa.set_cpu_count(threads)
+
+    from config import CHUNKSIZE, INDIV_DIR, PAS2_DIR, INDIV_COLS, ITPAS2_COLS
+    from individual_support import _find_file
+    from stream_reader import iter_chunks
+
+    files = {}
+    for name, folder, cols in [("itcont", INDIV_DIR, INDIV_COLS), ("itpas2", PAS2_DIR, ITPAS2_COLS)]:
+        path = _find_file(folder, name)
+        digest = hashlib.sha256()
+        stats = {}
+        t0 = time.perf_counter()
+        rows = 0
+        for chunk in iter_chunks(path, cols, CHUNKSIZE, stats=stats, backend=backend):
+            rows += len(chunk)
+            digest.update(pd.util.hash_pandas_object(chunk, index=True).to_numpy().tobytes())
+        seconds = time.perf_counter() - t0
+        files[name] = {
+            "seconds": round(seconds, 3), "rows": rows, "bytes": stats.get("bytes", 0),
+            "rows_per_sec": round(rows / seconds) if seconds else None,
+            "mb_per_sec": round(stats.get("bytes", 0) / 1e6 / seconds, 1) if seconds else None,
+            "arrow_fallback_blocks": stats.get("arrow_fallback_blocks", 0),
+            "hash": digest.hexdigest(),
+        }
+    queue.put({"files": files, "peak_rss_mb": _peak_rss_mb()})
+
+
+def _synthetic_cycle(ctx, synthetic_rows: int):
+    """Generate a synthetic cycle in a temporary directory; returns (TemporaryDirectory, cycle_dir)."""
+    tmp = tempfile.TemporaryDirectory(prefix="fec_bench_")
+    cycle_dir = Path(tmp.name)
+    # Generate in a child so the parent's peak RSS (inherited by the workers) stays small
+    gen = ctx.Process(target=make_synthetic_cycle, args=(cycle_dir, synthetic_rows))
+    gen.start()
+    gen.join()
+    if gen.exitcode:
+        raise RuntimeError(f"synthetic cycle generation failed (exit code {gen.exitcode})")
+    print(f"Generated synthetic cycle ({synthetic_rows:,} itcont rows) in {cycle_dir}")
+    return tmp, cycle_dir
+
+
+def _append_history(records: list[dict]) -> None:
+    from config import OUT_DIR
+
+    history = OUT_DIR / "bench_history.jsonl"
+    with open(history, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    print(f"\nAppended {len(records)} records -> {history}")
+
+
+def run_reader_benchmark(backends, repeat: int = 1, threads=None, synthetic_rows: int = None) -> list[dict]:
+    """
+    Time each stream_reader backend ``repeat`` times over itcont and itpas2
+    and append one record per run to bench_history.jsonl. ``threads`` caps
+    pyarrow's CPU pool (the pandas parser is single-threaded).
+    """
+    from config import SUFFIX
+
+    ctx = mp.get_context("spawn")
+    tmp, cycle_dir = _synthetic_cycle(ctx, synthetic_rows) if synthetic_rows else (None, None)
+    records = []
+    reference = None
+    for backend in backends:
+        for run in range(1, repeat + 1):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_run_reader, args=(backend, threads, cycle_dir, queue))
+            proc.start()
+            result = queue.get()
+            proc.join()
+            if proc.exitcode:
+                raise RuntimeError(f"{backend} reader run failed (exit code {proc.exitcode})")
+
+            hashes = {name: f.pop("hash") for name, f in result["files"].items()}
+            if reference is None:
+                reference = hashes
+            record = {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "kind": "reader",
+                "reader": backend,
+                "cycle": SUFFIX,
+                "dataset": "synthetic" if synthetic_rows else "real",
+                "run": run,
+                "seconds": round(sum(f["seconds"] for f in result["files"].values()), 3),
+                "files": result["files"],
+                "peak_rss_mb": result["peak_rss_mb"],
+                "cpu_count": os.cpu_count(),
+                "threads": threads,
+                "identical_output": hashes == reference,
+            }
+            records.append(record)
+            per_file = " | ".join(f"{name} {f['rows_per_sec']:,} rows/s {f['mb_per_sec']} MB/s"
+                                  for name, f in result["files"].items())
+            print(f"  {backend:8s} run {run}: {record['seconds']:8.2f}s | {per_file} | peak {record['peak_rss_mb']} MB | "
+                  f"{'identical' if record['identical_output'] else 'OUTPUT DIFFERS'}")
+    if tmp is not None:
+        tmp.cleanup()
+    _append_history(records)
+    return records
+
+
+def run_benchmark(engines, office: str = "total", repeat: int = 1, threads=None, synthetic_rows: int = None) -> list[dict]:
+    """
+    Run each engine ``repeat`` times and append one record per run to
+    bench_history.jsonl. With ``synthetic_rows`` the engines run on a
+    generated cycle of that many itcont rows in a temporary directory instead
+    of the configured data; records are tagged ``dataset: synthetic``.
+    """
+    from config import SUFFIX, INDIV_DIR, PAS2_DIR
+    from individual_support import _find_file
+
+    ctx = mp.get_context("spawn")
+    tmp = None
+    cycle_dir = None
+    indiv_dir, pas2_dir = INDIV_DIR, PAS2_DIR
+    if synthetic_rows:
+        tmp, cycle_dir = _synthetic_cycle(ctx, synthetic_rows)
+        indiv_dir, pas2_dir = cycle_dir / f"indiv{SUFFIX}", cycle_dir / f"pas2{SUFFIX}"
+
+    input_bytes = sum(_find_file(d, n).stat().st_size for d, n in [(indiv_dir, "itcont"), (pas2_dir, "itpas2")])
+    records = []
+    reference = None
+    for engine in engines:
+        for run in range(1, repeat + 1):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_run_engine, args=(engine, office, threads, cycle_dir, queue))
+            proc.start()
+            result = queue.get()
+            proc.join()
+            if proc.exitcode:
+                raise RuntimeError(f"{engine} run failed (exit code {proc.exitcode})")
+
+            if reference is None:
+                reference = result["hashes"]
+            record = {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "kind": "engine",
+                "engine": engine,
+                "office": office,
+                "cycle": SUFFIX,
+                "dataset": "synthetic" if synthetic_rows else "real",
+                "run": run,
+                "seconds": round(result["seconds"], 3),
+                "support_seconds": round(result["support_seconds"], 3),
+                "peak_rss_mb": result["peak_rss_mb"],
+                "input_bytes": input_bytes,
+                "cpu_count": os.cpu_count(),
+                "threads": threads,
+                "identical_output": result["hashes"] == reference,
+            }
+            records.append(record)
+            print(f"  {engine:8s} run {run}: {record['seconds']:8.2f}s total | "
+                  f"{record['support_seconds']:8.2f}s support steps | peak {record['peak_rss_mb']} MB | "
+                  f"{'identical' if record['identical_output'] else 'OUTPUT DIFFERS'}")
+    if tmp is not None:
+        tmp.cleanup()
+    _append_history(records)
+    return records
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark the aggregation engines against each other.")
+    ap.add_argument("--engines", nargs="+", default=["pandas", "sql"], choices=["pandas", "sql", "polars"])
+    ap.add_argument("--office", choices=sorted(OFFICE_FILTERS), default="total")
+    ap.add_argument("--repeat", type=int, default=1, help="Runs per engine")
+    ap.add_argument("--readers", nargs="+", choices=["pandas", "arrow"],
+                    help="Benchmark these bulk-file reader backends instead of the engines")
+    ap.add_argument("--threads", type=int,
+                    help="Worker threads for engines and readers that take them (default: all cores)")
+    ap.add_argument("--synthetic", type=int, metavar="ROWS",
+                    help="Benchmark on a generated cycle with this many itcont rows instead of the configured data")
+    args = ap.parse_args()
+
+    if args.readers:
+        print(f"Benchmarking readers {', '.join(args.readers)} ({os.cpu_count()} CPUs)")
+        records = run_reader_benchmark(args.readers, args.repeat, args.threads, args.synthetic)
+        if not all(r["identical_output"] for r in records):
+            raise SystemExit("Readers produced different rows")
+        return
+
+    print(f"Benchmarking {', '.join(args.engines)} on office={args.office} ({os.cpu_count()} CPUs)")
+    records = run_benchmark(args.engines, args.office, args.repeat, args.threads, args.synthetic)
+    if not all(r["identical_output"] for r in records):
+        raise SystemExit("Engines produced different outputs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Cross-cycle candidate panel (CAND_ID x cycle) built from per-cycle final tables.
+
+Unlike combine_csv, files are streamed in chunks straight into a typed,
+cycle-partitioned dataset (``<panel>/cycle=2016/<source>-0000.parquet``), so
+memory stays at one chunk no matter how many cycles are included. Rows are
+deduplicated on the (CAND_ID, CYCLE) key through a hash set of 64-bit key
+hashes instead of a full-row ``drop_duplicates``; the first file (in sorted
+path order) that supplies a key wins, so Senate/Presidential/Total copies of
+the same candidate collapse to one row.
+
+Usage:
+    python build_panel.py --input-dir final_output_files --panel-dir panel
+    python build_panel.py --panel-dir panel --wide panel_wide.csv --values TOTAL_SUPPORT INDIVIDUAL_SUPPORT
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from combine_csv import infer_cycle, infer_office_type
+
+
+KEY_COLS = ["CAND_ID", "CYCLE"]
+DEFAULT_PATTERN = "*final_support_table_*.csv"
+CHUNKSIZE = 200_000
+MANIFEST = "_panel_manifest.json"
+
+# Everything else in a final table is a support amount
+TEXT_COLS = ["CAND_ID", "CAND_ELECTION_YR", "CAND_NAME", "CAND_PTY_AFFILIATION", "CAND_OFFICE", "CAND_OFFICE_ST"]
+INT_COLS = ["HAS_MONEY"]
+
+
+def cycle_year(cycle: str) -> int:
+    """Two-digit file suffix -> four-digit cycle year (80..99 -> 1980..1999)."""
+    yy = int(cycle)
+    return 1900 + yy if yy >= 80 else 2000 + yy
+
+
+def _type_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [c.strip() for c in df.columns]
+    for col in df.columns:
+        if col in TEXT_COLS or col in ("source_file", "office_type"):
+            continue
+        if col == "CYCLE":
+            df[col] = df[col].astype(np.int16)
+        elif col in INT_COLS:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(np.int8)
+        else:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(np.float64)
+    return df
+
+
+def _key_hashes(df: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(df[KEY_COLS], index=False).to_numpy()
+
+
+def _write_part(df: pd.DataFrame, path: Path) -> Path:
+    try:
+        df.to_parquet(path.with_suffix(".parquet"), index=False)
+        return path.with_suffix(".parquet")
+    except ImportError:
+        df.to_csv(path.with_suffix(".csv"), index=False)
+        return path.with_suffix(".csv")
+
+
+def build_panel(input_dir: Path, panel_dir: Path, pattern: str = DEFAULT_PATTERN,
+                chunksize: int = CHUNKSIZE) -> dict:
+    """
+    Stream every matching final table under ``input_dir`` into ``panel_dir``.
+
+    Returns the manifest (rows kept/duplicates per cycle, part files written).
+    """
+    if not input_dir.exists():
+        raise FileNotFoundError(f"Input directory not found: {input_dir}")
+    files = sorted(input_dir.rglob(pattern))
+    files = [f for f in files if infer_cycle(f.name) is not None]
+    if not files:
+        raise FileNotFoundError(f"No {pattern} files with a cycle suffix found in: {input_dir}")
+
+    panel_dir.mkdir(parents=True, exist_ok=True)
+    for old in panel_dir.glob("cycle=*/*"):
+        old.unlink()
+
+    seen: set[int] = set()
+    manifest = {"source_dir": str(input_dir), "pattern": pattern, "cycles": {}, "parts": []}
+
+    for f in files:
+        year = cycle_year(infer_cycle(f.name))
+        office_type = infer_office_type(f)
+        part_dir = panel_dir / f"cycle={year}"
+        part_dir.mkdir(exist_ok=True)
+        stats = manifest["cycles"].setdefault(str(year), {"rows": 0, "duplicates": 0, "files": 0})
+        stats["files"] += 1
+
+        reader = pd.read_csv(f, dtype={c: str for c in TEXT_COLS}, chunksize=chunksize, low_memory=False)
+        for k, chunk in enumerate(reader):
+            chunk = _type_chunk(chunk)
+            chunk.insert(1, "CYCLE", np.int16(year))
+            chunk["source_file"] = f.name
+            chunk["office_type"] = office_type
+
+            h = _key_hashes(chunk)
+            fresh = ~pd.Index(h).duplicated() & np.fromiter(
+                (x not in seen for x in h.tolist()), dtype=bool, count=len(h)
+            )
+            stats["duplicates"] += int(len(h) - fresh.sum())
+            if not fresh.any():
+                continue
+            seen.update(h[fresh].tolist())
+            chunk = chunk[fresh]
+
+            part = _write_part(chunk.reset_index(drop=True), part_dir / f"{f.stem}-{k:04d}")
+            stats["rows"] += len(chunk)
+            manifest["parts"].append(str(part.relative_to(panel_dir)))
+
+        print(f"  {f.relative_to(input_dir)} -> cycle={year} ({office_type})")
+
+    with open(panel_dir / MANIFEST, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2)
+
+    print(f"\nPanel written -> {panel_dir}")
+    for year, stats in sorted(manifest["cycles"].items()):
+        print(f"  {year}: {stats['rows']:,} candidates from {stats['files']} files "
+              f"({stats['duplicates']:,} duplicate keys dropped)")
+    return manifest
+
+
+def load_panel(panel_dir: Path, cycles=None, columns=None) -> pd.DataFrame:
+    """Read the panel (optionally only some cycles / columns) as one long frame."""
+    frames = []
+    for part_dir in sorted(panel_dir.glob("cycle=*")):
+        if cycles is not None and int(part_dir.name.split("=", 1)[1]) not in set(cycles):
+            continue
+        for part in sorted(part_dir.iterdir()):
+            if part.suffix == ".parquet":
+                frames.append(pd.read_parquet(part, columns=columns))
+            elif part.suffix == ".csv":
+                frames.append(_type_chunk(pd.read_csv(part, dtype={c: str for c in TEXT_COLS}, usecols=columns)))
+    if not frames:
+        return pd.DataFrame(columns=columns or KEY_COLS)
+    # Later cycles may add support columns; missing ones become NaN
+    return pd.concat(frames, ignore_index=True, sort=False)
+
+
+def pivot_wide(panel: pd.DataFrame, values=("TOTAL_SUPPORT",)) -> pd.DataFrame:
+    """Long panel -> one row per CAND_ID with ``<VALUE>_<cycle>`` columns."""
+    values = list(values)
+    meta = (
+        panel.sort_values("CYCLE")
+             .drop_duplicates("CAND_ID", keep="last")
+             .set_index("CAND_ID")[[c for c in ["CAND_NAME", "CAND_OFFICE", "CAND_OFFICE_ST"] if c in panel.columns]]
+    )
+    wide = panel.pivot(index="CAND_ID", columns="CYCLE", values=values)
+    wide.columns = [f"{v}_{cyc}" for v, cyc in wide.columns]
+    return meta.join(wide, how="right").reset_index()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Build a typed CAND_ID x cycle panel from per-cycle final tables.")
+    ap.add_argument("--input-dir", type=Path, help="Folder searched recursively for final tables (omit to reuse the panel)")
+    ap.add_argument("--panel-dir", type=Path, required=True, help="Output dataset folder (cycle=YYYY partitions)")
+    ap.add_argument("--pattern", default=DEFAULT_PATTERN, help=f"File glob (default {DEFAULT_PATTERN})")
+    ap.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="Rows per streamed chunk")
+    ap.add_argument("--wide", type=Path, help="Also write a wide CSV (one row per candidate, one column per cycle)")
+    ap.add_argument("--values", nargs="+", default=["TOTAL_SUPPORT"], help="Columns to pivot for --wide")
+    args = ap.parse_args()
+
+    if args.input_dir:
+        build_panel(args.input_dir, args.panel_dir, args.pattern, args.chunksize)
+
+    if args.wide:
+        panel = load_panel(args.panel_dir)
+        wide = pivot_wide(panel, args.values)
+        args.wide.parent.mkdir(parents=True, exist_ok=True)
+        wide.to_csv(args.wide, index=False)
+        print(f"Wide panel: {len(wide):,} candidates x {len(wide.columns):,} columns -> {args.wide}")
+
+
+if __name__ == "__main__":
+    main()
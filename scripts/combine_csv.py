@@ -1,9 +1,13 @@
 from __future__ import annotations
 
 import argparse
+import os
 import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 
@@ -34,7 +38,79 @@ def infer_office_type(filepath: Path) -> str:
     return "unknown"
 
 
-def combine_csvs(input_dir: Path, output_path: Path, recursive: bool = False) -> None:
+def _load_annotated(f: Path, extra_cols: dict) -> pd.DataFrame:
+    df = pd.read_csv(f, dtype=str, low_memory=False)  # keep everything as text to avoid type conflicts
+    df.columns = [c.strip() for c in df.columns]
+    for col, value in extra_cols.items():
+        df[col] = value
+    return df
+
+
+def _iter_loaded(jobs_list: list, jobs: int):
+    """
+    Load (path, extra columns) pairs on a thread pool and yield the frames in
+    input order. At most ``2 * jobs`` files are in flight, so a slow file
+    holds back the writer, not memory.
+    """
+    if jobs <= 1:
+        for f, extra_cols in jobs_list:
+            yield f, _load_annotated(f, extra_cols)
+        return
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        todo = iter(jobs_list)
+        for f, extra_cols in todo:
+            pending.append((f, pool.submit(_load_annotated, f, extra_cols)))
+            if len(pending) >= 2 * jobs:
+                break
+        while pending:
+            f, fut = pending.popleft()
+            yield f, fut.result()
+            nxt = next(todo, None)
+            if nxt is not None:
+                pending.append((nxt[0], pool.submit(_load_annotated, *nxt)))
+
+
+def _output_columns(jobs_list: list) -> list:
+    """Union of header + annotation columns in first-seen order (what concat(sort=False) gives)."""
+    columns = {}
+    for f, extra_cols in jobs_list:
+        header = pd.read_csv(f, nrows=0).columns
+        for c in [c.strip() for c in header] + list(extra_cols):
+            columns.setdefault(c, None)
+    return list(columns)
+
+
+def _append_combined(jobs_list: list, output_path: Path, jobs: int) -> tuple[int, int, dict]:
+    """
+    Stream the annotated files into ``output_path`` in input order, dropping
+    exact duplicate rows via a set of 64-bit row hashes.
+    Returns (rows written, columns, rows per office_type).
+    """
+    columns = _output_columns(jobs_list)
+    seen: set[int] = set()
+    n_rows = 0
+    office_counts: dict[str, int] = {}
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", newline="", encoding="utf-8") as out:
+        pd.DataFrame(columns=columns).to_csv(out, index=False)
+        for f, df in _iter_loaded(jobs_list, jobs):
+            df = df.reindex(columns=columns)
+            h = pd.util.hash_pandas_object(df, index=False).to_numpy()
+            fresh = ~pd.Index(h).duplicated() & np.fromiter(
+                (x not in seen for x in h.tolist()), dtype=bool, count=len(h)
+            )
+            seen.update(h[fresh].tolist())
+            df = df[fresh]
+            df.to_csv(out, index=False, header=False)
+            n_rows += len(df)
+            for office, count in df["office_type"].value_counts(sort=False).items():
+                office_counts[office] = office_counts.get(office, 0) + int(count)
+    return n_rows, len(columns), office_counts
+
+
+def combine_csvs(input_dir: Path, output_path: Path, recursive: bool = False, jobs: int = 1) -> None:
     if not input_dir.exists():
         raise FileNotFoundError(f"Input directory not found: {input_dir}")
 
@@ -47,45 +123,32 @@ def combine_csvs(input_dir: Path, output_path: Path, recursive: bool = False) ->
     if not csv_files:
         raise FileNotFoundError(f"No .csv files found in: {input_dir}")
 
-    frames: list[pd.DataFrame] = []
+    jobs_list = []
     for f in csv_files:
-        df = pd.read_csv(f, dtype=str, low_memory=False)  # keep everything as text to avoid type conflicts
-        df.columns = [c.strip() for c in df.columns]
-
-        df["source_file"] = f.name
-        df["source_path"] = str(f.relative_to(input_dir))
-        
         cyc = infer_cycle(f.name)
-        df["cycle"] = cyc if cyc is not None else ""
-        
-        office_type = infer_office_type(f)
-        df["office_type"] = office_type
-
-        frames.append(df)
+        jobs_list.append((f, {
+            "source_file": f.name,
+            "source_path": str(f.relative_to(input_dir)),
+            "cycle": cyc if cyc is not None else "",
+            "office_type": infer_office_type(f),
+        }))
 
-    combined = pd.concat(frames, ignore_index=True, sort=False)
-
-    # Optional: drop exact duplicate rows
-    combined = combined.drop_duplicates()
-
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    combined.to_csv(output_path, index=False)
+    # Exact duplicate rows are dropped as files stream in
+    n_rows, n_cols, office_counts = _append_combined(jobs_list, output_path, jobs)
 
     print(f"Combined {len(csv_files)} files -> {output_path}")
-    print(f"Rows: {len(combined):,} | Columns: {len(combined.columns):,}")
+    print(f"Rows: {n_rows:,} | Columns: {n_cols:,}")
     
     # Show breakdown by office type
-    if "office_type" in combined.columns:
-        print("\nBreakdown by office type:")
-        office_counts = combined["office_type"].value_counts()
-        for office, count in office_counts.items():
-            print(f"  {office}: {count:,} rows")
+    print("\nBreakdown by office type:")
+    for office, count in sorted(office_counts.items(), key=lambda kv: -kv[1]):
+        print(f"  {office}: {count:,} rows")
 
 
-def combine_by_type(input_dir: Path, output_dir: Path) -> None:
+def combine_by_type(input_dir: Path, output_dir: Path, jobs: int = 1) -> None:
     """
     Combine CSVs separately for each office type (senate, presidential, total).
-    Creates three separate combined files.
+    Creates three separate combined files; ``jobs`` files are parsed concurrently.
     """
     if not input_dir.exists():
         raise FileNotFoundError(f"Input directory not found: {input_dir}")
@@ -112,24 +175,18 @@ def combine_by_type(input_dir: Path, output_dir: Path) -> None:
         print(f"\nProcessing {office_name} files...")
         output_file = output_dir / f"combined_{office_name}_ALL.csv"
         
-        frames: list[pd.DataFrame] = []
+        jobs_list = []
         for f in csv_files:
-            df = pd.read_csv(f, dtype=str, low_memory=False)
-            df.columns = [c.strip() for c in df.columns]
-            
-            df["source_file"] = f.name
             cyc = infer_cycle(f.name)
-            df["cycle"] = cyc if cyc is not None else ""
-            df["office_type"] = office_name
-            
-            frames.append(df)
-        
-        combined = pd.concat(frames, ignore_index=True, sort=False)
-        combined = combined.drop_duplicates()
+            jobs_list.append((f, {
+                "source_file": f.name,
+                "cycle": cyc if cyc is not None else "",
+                "office_type": office_name,
+            }))
         
-        combined.to_csv(output_file, index=False)
+        n_rows, n_cols, _ = _append_combined(jobs_list, output_file, jobs)
         print(f"  Combined {len(csv_files)} files -> {output_file}")
-        print(f"  Rows: {len(combined):,} | Columns: {len(combined.columns):,}")
+        print(f"  Rows: {n_rows:,} | Columns: {n_cols:,}")
 
 
 def main() -> None:
@@ -144,13 +201,15 @@ def main() -> None:
     ap.add_argument("--output-dir", type=Path, help="Output directory (for by-type mode)")
     ap.add_argument("--recursive", action="store_true", help="Recursively search for CSV files in subdirectories")
     ap.add_argument("--by-type", action="store_true", help="Create separate combined files for senate/presidential/total")
+    ap.add_argument("--jobs", type=int, default=min(8, os.cpu_count() or 1),
+                    help="Files parsed concurrently (output order is unchanged; 1 = sequential)")
     args = ap.parse_args()
 
     if args.by_type:
         output_dir = args.output_dir or args.input_dir
-        combine_by_type(args.input_dir, output_dir)
+        combine_by_type(args.input_dir, output_dir, jobs=args.jobs)
     else:
-        combine_csvs(args.input_dir, args.output, recursive=args.recursive)
+        combine_csvs(args.input_dir, args.output, recursive=args.recursive, jobs=args.jobs)
 
 
 if __name__ == "__main__":
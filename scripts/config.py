@@ -57,6 +57,7 @@ CN_DIR = CYCLE_DIR / f"cn{SUFFIX}"
 CCL_DIR = CYCLE_DIR / f"ccl{SUFFIX}"
 INDIV_DIR = CYCLE_DIR / f"indiv{SUFFIX}"
 PAS2_DIR = CYCLE_DIR / f"pas2{SUFFIX}"
+OTH_DIR = CYCLE_DIR / f"oth{SUFFIX}"    # optional: itoth, only read by transfer_support
 
 # Output folders - now with subfolders for each office type
 OUT_DIR = CYCLE_DIR / "outputs"
@@ -74,6 +75,88 @@ TOTAL_OUT_DIR.mkdir(parents=True, exist_ok=True)
 # Behavior
 VALID_OFFICES = {"S", "P"}    # ✅ Senate + Presidential only (no House)
 CHUNKSIZE = 2_000_000
+BUILD_AMOUNT_SKETCHES = True  # per-candidate TRANSACTION_AMT t-digests (see amount_sketches.py)
+BUILD_TXN_INDEX = True        # CAND_ID -> raw line byte offsets for drill-down (see txn_index.py)
+BUILD_INDUSTRY_ROLLUP = True  # individual support by EMPLOYER/OCCUPATION industry (see industry.py)
+INDUSTRY_CACHE_SIZE = 500_000 # distinct EMPLOYER/OCCUPATION values kept in the normalization LRU cache
+SCREEN_DONOR_LIMITS = False   # flag donors over DONOR_LIMIT per candidate and election (see donor_limits.py)
+SPILL_DIR = None              # spill_agg bucket files (None = system temp dir)
+SPILL_BUCKETS = 64            # hash partitions per SpillAggregator
+SPILL_BUFFER_ROWS = 4_000_000 # rows buffered in memory before a spill
+INTERMEDIATE_FORMAT = "parquet"  # support-step intermediates: "parquet", "feather" or "csv"
+READER_BACKEND = "pandas"      # bulk-file parser: "pandas" or "arrow" (memory-mapped, multi-threaded; see stream_reader.py)
+SAMPLE = None                 # sampling.Sample for partial development runs (set by run_all --sample-*)
+SPLIT_LEADERSHIP_PACS = False # also report LEADERSHIP_PAC_SUPPORT (cm CMTE_DSGN 'D'; overlaps the ORG_TP columns)
+NETTING_POLICY = "gross"      # amounts <= 0 (refunds, corrections): "gross" drops them, "net" nets them
+                              # into the support columns, "both" adds NET_ columns (see netting.py)
+INDIV_ALLOCATION = "principal" # committee -> candidate rule for individual receipts (see allocation.py)
+ALLOCATION_DSGN_WEIGHTS = {"P": 1.0, "A": 1.0, "J": 1.0}  # ccl CMTE_DSGN link weights for "designation"
+TRANSFER_TYPES = {"18G": "in", "24G": "out"}  # itoth TRANSACTION_TP -> direction seen from the filer
+TRANSFER_MAX_HOPS = 3         # committee-to-committee hops traced by transfer_support
+
+# Individual contribution limit per candidate per election, by election year.
+# Indexed for inflation in odd years since 2003; add the new cycle's limit
+# here before screening it (no entry -> DONOR_LIMIT is None and
+# individual_support refuses to screen).
+DONOR_LIMITS = {
+    "2002": 1_000, "2004": 2_000, "2006": 2_100, "2008": 2_300, "2010": 2_400, "2012": 2_500,
+    "2014": 2_600, "2016": 2_700, "2018": 2_700, "2020": 2_800, "2022": 2_900, "2024": 3_300,
+    "2026": 3_500,
+}
+DONOR_LIMIT = DONOR_LIMITS.get(TARGET_ELECTION_YR)
+
+# PAC support by the committee's connected-organization type (cm ORG_TP).
+# Corporate and nonconnected PACs make up TOTAL_SUPPORT; the other types are
+# reported beside it.
+PAC_ORG_TYPES = {
+    "C": "CORP_PAC_SUPPORT",
+    "": "NONCONNECTED_PAC_SUPPORT",
+    "L": "LABOR_PAC_SUPPORT",
+    "M": "MEMBERSHIP_PAC_SUPPORT",
+    "T": "TRADE_PAC_SUPPORT",
+    "V": "COOPERATIVE_PAC_SUPPORT",
+    "W": "CORP_NO_STOCK_PAC_SUPPORT",
+}
+LEADERSHIP_PAC_COL = "LEADERSHIP_PAC_SUPPORT"
+# Party committees (cm CMTE_TP) and the itpas2 types counted as party support:
+# coordinated expenditures (24F), contributions (24K) and independent expenditures (24E).
+# Read in the PAC step's itpas2 pass; reported next to TOTAL_SUPPORT like the other PAC types.
+PARTY_CMTE_TYPES = ("X", "Y", "Z")
+PARTY_TRANSACTION_TYPES = ("24F", "24K", "24E")
+PARTY_SUPPORT_COL = "PARTY_SUPPORT"
+TRANSFER_SUPPORT_COL = "ATTRIBUTED_TRANSFER_SUPPORT"
+
+# Contributor STATE codes of the per-state individual breakdown (50 states, DC,
+# territories, military mail); foreign and blank states share the OTHER_STATE slot
+DONOR_STATES = (
+    "AK", "AL", "AR", "AZ", "CA", "CO", "CT", "DE", "FL", "GA", "HI", "IA", "ID", "IL", "IN", "KS", "KY", "LA",
+    "MA", "MD", "ME", "MI", "MN", "MO", "MS", "MT", "NC", "ND", "NE", "NH", "NJ", "NM", "NV", "NY", "OH", "OK",
+    "OR", "PA", "RI", "SC", "SD", "TN", "TX", "UT", "VA", "VT", "WA", "WI", "WV", "WY",
+    "DC", "AS", "GU", "MP", "PR", "VI", "AA", "AE", "AP",
+)
+OTHER_STATE = "OTHER"
+
+def pac_support_cols(split_leadership=None):
+    """Columns of the PAC intermediate: one per ORG_TP, party committees, plus leadership PACs when enabled."""
+    if split_leadership is None:
+        split_leadership = SPLIT_LEADERSHIP_PACS
+    cols = list(PAC_ORG_TYPES.values()) + [PARTY_SUPPORT_COL]
+    return cols + [LEADERSHIP_PAC_COL] if split_leadership else cols
+
+def detail_support_cols(split_leadership=None):
+    """Support columns written next to, but not included in, TOTAL_SUPPORT."""
+    in_total = (PAC_ORG_TYPES["C"], PAC_ORG_TYPES[""])
+    return [c for c in pac_support_cols(split_leadership) if c not in in_total] + [TRANSFER_SUPPORT_COL]
+
+def set_output_root(out_dir):
+    """Send all office outputs to ``out_dir`` (e.g. outputs_partial for sampled runs)."""
+    global OUT_DIR, SENATE_OUT_DIR, PRESIDENTIAL_OUT_DIR, TOTAL_OUT_DIR
+    OUT_DIR = Path(out_dir)
+    SENATE_OUT_DIR = OUT_DIR / "senate"
+    PRESIDENTIAL_OUT_DIR = OUT_DIR / "presidential"
+    TOTAL_OUT_DIR = OUT_DIR / "total"
+    for d in (SENATE_OUT_DIR, PRESIDENTIAL_OUT_DIR, TOTAL_OUT_DIR):
+        d.mkdir(parents=True, exist_ok=True)
 
 # Helper function to get output directory based on office filter
 def get_output_dir(office_filter):
@@ -117,6 +200,7 @@ INDIV_COLS = [
     "NAME","CITY","STATE","ZIP_CODE","EMPLOYER","OCCUPATION","TRANSACTION_DT","TRANSACTION_AMT",
     "OTHER_ID","TRAN_ID","FILE_NUM","MEMO_CD","MEMO_TEXT","SUB_ID"
 ]
+ITOTH_COLS = INDIV_COLS  # committee-to-committee transactions share the itcont layout
 ITPAS2_COLS = [
     "CMTE_ID","AMNDT_IND","RPT_TP","TRANSACTION_PGI","IMAGE_NUM","TRANSACTION_TP","ENTITY_TP",
     "NAME","CITY","STATE","ZIP_CODE","EMPLOYER","OCCUPATION","TRANSACTION_DT","TRANSACTION_AMT",
@@ -126,16 +210,103 @@ ITPAS2_COLS = [
 def write_csv_no_blank_line(df, path, **kwargs):
     """
     Write DataFrame to CSV without trailing blank line.
+    Single streaming pass: the trailing newline is truncated in place.
+    """
+    with open(path, "wb+") as f:
+        df.to_csv(f, **kwargs)
+        _truncate_trailing_newlines(f)
+
+def _truncate_trailing_newlines(f):
+    """Cut trailing \r/\n bytes off an open binary file without reading it back."""
+    pos = f.seek(0, 2)
+    while pos > 0:
+        f.seek(pos - 1)
+        if f.read(1) not in (b"\r", b"\n"):
+            break
+        pos -= 1
+    f.truncate(pos)
+
+def write_csv_variants(df, variants, **kwargs):
+    """
+    Write several row subsets of ``df`` (e.g. final / no_support / all_with_flag)
+    from one CSV serialization.
+
+    Args:
+        df: Full table, already sorted
+        variants: {path: boolean mask aligned with df, or None for all rows}
+        kwargs: Passed to DataFrame.to_csv (index=False etc.)
+    """
+    import os
+    import numpy as np
+
+    kwargs.setdefault("header", True)
+    terminator = kwargs.get("lineterminator", os.linesep)
+    text = df.to_csv(None, **kwargs)
+    lines = text.split(terminator)[:-1]
+    n_header = 1 if kwargs["header"] is not False else 0
+    if len(lines) != len(df) + n_header:
+        # Embedded line breaks in a field: serialize each variant separately
+        for path, mask in variants.items():
+            write_csv_no_blank_line(df if mask is None else df[np.asarray(mask)], path, **kwargs)
+        return
+
+    header, rows = lines[:n_header], np.array(lines[n_header:], dtype=object)
+    encoding = kwargs.get("encoding") or "utf-8"
+    for path, mask in variants.items():
+        selected = rows if mask is None else rows[np.asarray(mask, dtype=bool)]
+        with open(path, "wb") as f:
+            f.write(terminator.join(header + selected.tolist()).encode(encoding))
+
+# ---- Support-step intermediates ----
+# Typed columnar files handed from the support scripts to merge_support.
+# CSV is kept for the final publication tables only.
+_INTERMEDIATE_EXT = {"parquet": ".parquet", "feather": ".feather", "csv": ".csv"}
+
+def write_intermediate(df, out_dir, name):
+    """
+    Write a support intermediate as INTERMEDIATE_FORMAT; falls back to CSV
+    when pyarrow is not installed. Returns the path written.
     """
+    fmt = INTERMEDIATE_FORMAT
+    path = out_dir / f"{name}{_INTERMEDIATE_EXT[fmt]}"
+    try:
+        if fmt == "parquet":
+            df.to_parquet(path, index=False)
+        elif fmt == "feather":
+            df.reset_index(drop=True).to_feather(path)
+        else:
+            write_csv_no_blank_line(df, path, index=False)
+    except ImportError:
+        print(f"[config][WARN] pyarrow not installed; writing {name} as CSV")
+        path = out_dir / f"{name}.csv"
+        write_csv_no_blank_line(df, path, index=False)
+    return path
+
+def run_manifest_path(out_dir, prefix):
+    """Per-office JSON describing how the outputs in ``out_dir`` were produced."""
+    return out_dir / f"{prefix}_run_manifest_{SUFFIX}.json"
+
+def write_run_manifest(out_dir, prefix, info):
+    """Write the run manifest (cycle, office, engine, sampling, ...) next to the outputs."""
+    import json
+    import time
+    payload = {"cycle": SUFFIX, "office": prefix, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), **info}
+    path = run_manifest_path(out_dir, prefix)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    return path
+
+def find_intermediate(out_dir, name):
+    """Newest existing intermediate for ``name`` in any supported format, or None."""
+    found = [out_dir / f"{name}{ext}" for ext in _INTERMEDIATE_EXT.values()]
+    found = [p for p in found if p.exists()]
+    return max(found, key=lambda p: p.stat().st_mtime) if found else None
+
+def read_intermediate(path, dtypes=None):
+    """Read an intermediate written by write_intermediate (CSV only for legacy outputs)."""
     import pandas as pd
-    df.to_csv(path, **kwargs)
-    
-    # Remove trailing blank lines
-    with open(path, 'rb') as f:
-        content = f.read()
-    
-    # Strip all trailing newlines
-    content = content.rstrip(b'\r\n')
-    
-    with open(path, 'wb') as f:
-        f.write(content)
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path)
+    if path.suffix == ".feather":
+        return pd.read_feather(path)
+    return pd.read_csv(path, dtype=dtypes)
@@ -0,0 +1,227 @@
+"""
+Dependency-graph executor for the pipeline steps.
+
+``run_all.py --jobs N`` builds one task per (step, office) and runs every task
+whose inputs are ready in its own worker process, as long as the running
+tasks fit a CPU budget (N cores) and a memory budget (estimated peak RSS per
+step from bench_history.jsonl, see plan.py). The support scans of all three
+offices (itcont and itpas2) therefore overlap, and each office's
+``merge_support`` starts as soon as its three intermediates are back.
+
+A task that alone exceeds the budget still runs, just with nothing beside
+it. Support frames travel back to the parent through a pipe and are handed
+to the dependent merge, exactly like the sequential path.
+
+After the run a critical-path report (per-task start/finish, queue wait,
+peak RSS, the chain of tasks that bounded the wall time) is printed and
+written to ``outputs/run_dag_report.json``.
+"""
+
+from __future__ import annotations
+
+import importlib
+import json
+import multiprocessing as mp
+import os
+import time
+import traceback
+from dataclasses import dataclass, field
+from multiprocessing.connection import wait
+
+DEFAULT_STEP_MEM_MB = 1024
+
+
+@dataclass
+class Task:
+    """One step for one office."""
+
+    key: str                        # e.g. "total/merge_support"
+    step: str                       # plan.STEP_INPUTS key
+    module: str
+    func: str
+    office_filter: set
+    deps: list = field(default_factory=list)
+    cpus: int = 1
+    mem_mb: float = DEFAULT_STEP_MEM_MB
+    kwargs: dict = field(default_factory=dict)
+    env: dict = field(default_factory=dict)
+    # Filled in by run_dag
+    submitted: float | None = None
+    finished: float | None = None
+    seconds: float | None = None
+    peak_rss_mb: float | None = None
+
+
+def _apply_overrides(overrides: dict) -> None:
+    """Replay the parent's runtime config changes (sampling, output root, allocation, netting, reader) in a worker."""
+    import config
+
+    if overrides.get("out_root") is not None:
+        config.set_output_root(overrides["out_root"])
+    config.SAMPLE = overrides.get("sample")
+    if overrides.get("allocation") is not None:
+        config.INDIV_ALLOCATION = overrides["allocation"]
+    if overrides.get("netting") is not None:
+        config.NETTING_POLICY = overrides["netting"]
+    if overrides.get("reader") is not None:
+        config.READER_BACKEND = overrides["reader"]
+
+
+def _worker(conn, module: str, func: str, office_filter: set, kwargs: dict, env: dict, overrides: dict) -> None:
+    from bench_engines import _peak_rss_mb
+
+    try:
+        os.environ.update(env)
+        _apply_overrides(overrides)
+        t0 = time.perf_counter()
+        result = getattr(importlib.import_module(module), func)(office_filter=office_filter, **kwargs)
+        conn.send(("ok", result, time.perf_counter() - t0, _peak_rss_mb()))
+    except BaseException:
+        conn.send(("error", traceback.format_exc(), None, None))
+    finally:
+        conn.close()
+
+
+def default_mem_budget_mb() -> float | None:
+    """80% of physical memory in MB (None where it cannot be determined)."""
+    try:
+        return 0.8 * os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 2**20
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def run_dag(tasks: list[Task], cpu_budget: int, mem_budget_mb: float | None = None, overrides: dict | None = None,
+            make_kwargs=None) -> dict:
+    """
+    Run ``tasks`` respecting their ``deps`` and the budgets.
+
+    Args:
+        tasks: Tasks in preferred launch order
+        cpu_budget: Cores available to all running tasks together
+        mem_budget_mb: Memory available to all running tasks together (None: unlimited)
+        overrides: Runtime config to replay in workers (see _apply_overrides)
+        make_kwargs: Optional fn(task, results) -> extra kwargs, called at launch
+            (e.g. to pass finished support frames to a merge)
+
+    Returns:
+        {task key: result}
+    """
+    ctx = mp.get_context("spawn")
+    pending = {t.key: t for t in tasks}
+    running = {}   # reader connection -> (task, process)
+    results = {}
+    used_cpu, used_mem = 0, 0.0
+    t_start = time.perf_counter()
+
+    def fits(task):
+        if not running:
+            return True
+        if used_cpu + task.cpus > cpu_budget:
+            return False
+        return mem_budget_mb is None or used_mem + task.mem_mb <= mem_budget_mb
+
+    while pending or running:
+        for key, task in list(pending.items()):
+            if any(d not in results for d in task.deps) or not fits(task):
+                continue
+            kwargs = dict(task.kwargs, **(make_kwargs(task, results) if make_kwargs else {}))
+            reader, writer = ctx.Pipe(duplex=False)
+            proc = ctx.Process(target=_worker, name=key,
+                               args=(writer, task.module, task.func, task.office_filter, kwargs, task.env,
+                                     overrides or {}))
+            proc.start()
+            writer.close()
+            task.submitted = time.perf_counter() - t_start
+            running[reader] = (task, proc)
+            used_cpu += task.cpus
+            used_mem += task.mem_mb
+            del pending[key]
+            print(f"[dag] started {key} (cpus {task.cpus}, ~{task.mem_mb:,.0f} MB) | running {len(running)}")
+
+        if not running:
+            raise RuntimeError(f"Tasks with unsatisfiable dependencies: {sorted(pending)}")
+        for reader in wait(list(running)):
+            task, proc = running.pop(reader)
+            try:
+                status, payload, seconds, peak = reader.recv()
+            except EOFError:
+                status, payload, seconds, peak = "error", f"worker exited with code {proc.exitcode}", None, None
+            proc.join()
+            reader.close()
+            used_cpu -= task.cpus
+            used_mem -= task.mem_mb
+            if status != "ok":
+                for other, p in running.values():
+                    p.terminate()
+                raise RuntimeError(f"{task.key} failed:\n{payload}")
+            task.finished = time.perf_counter() - t_start
+            task.seconds, task.peak_rss_mb = seconds, peak
+            results[task.key] = payload
+            print(f"[dag] finished {task.key} in {seconds:.1f}s (peak {peak} MB)")
+    return results
+
+
+def critical_path(tasks: list[Task]) -> list[Task]:
+    """
+    Chain of tasks that bounded the wall time, ending at the last finish.
+    A task that waited for budget after its inputs were ready is linked to
+    the task whose completion let it start; otherwise to its
+    latest-finishing dependency.
+    """
+    by_key = {t.key: t for t in tasks}
+    node = max(tasks, key=lambda t: t.finished)
+    chain = [node]
+    while True:
+        ready = max((by_key[d].finished for d in node.deps), default=0.0)
+        if node.submitted - ready > 0.01:
+            released = [t for t in tasks if t.finished <= node.submitted and t is not node]
+            prev = max(released, key=lambda t: t.finished, default=None)
+        else:
+            prev = max((by_key[d] for d in node.deps), key=lambda t: t.finished, default=None)
+        if prev is None:
+            break
+        chain.append(prev)
+        node = prev
+    return chain[::-1]
+
+
+def report(tasks: list[Task], cpu_budget: int, mem_budget_mb, path=None) -> dict:
+    """Print (and optionally save) per-task timings and the critical path."""
+    by_key = {t.key: t for t in tasks}
+    wall = max(t.finished for t in tasks)
+    serial = sum(t.seconds for t in tasks)
+    chain = critical_path(tasks)
+    rows = []
+    for t in sorted(tasks, key=lambda t: t.submitted):
+        ready = max((by_key[d].finished for d in t.deps), default=0.0)
+        rows.append({
+            "task": t.key, "start": round(t.submitted, 2), "finish": round(t.finished, 2),
+            "seconds": round(t.seconds, 2), "queue_wait": round(t.submitted - ready, 2),
+            "peak_rss_mb": t.peak_rss_mb, "critical": any(t is c for c in chain),
+        })
+    payload = {
+        "cpu_budget": cpu_budget, "mem_budget_mb": mem_budget_mb,
+        "wall_seconds": round(wall, 2), "step_seconds": round(serial, 2),
+        "parallelism": round(serial / wall, 2) if wall else None,
+        "critical_path": [t.key for t in chain],
+        "critical_path_seconds": round(sum(t.seconds for t in chain), 2),
+        "tasks": rows,
+    }
+
+    print("\n" + "="*80)
+    print(f"CRITICAL PATH REPORT (cpu budget {cpu_budget}, memory budget "
+          f"{'unlimited' if mem_budget_mb is None else f'{mem_budget_mb:,.0f} MB'})")
+    print("="*80)
+    print(f"  {'task':40s} {'start':>7s} {'finish':>7s} {'secs':>7s} {'wait':>6s} {'peak MB':>8s}")
+    for r in rows:
+        mark = " *" if r["critical"] else ""
+        print(f"  {r['task']:40s} {r['start']:7.1f} {r['finish']:7.1f} {r['seconds']:7.1f} "
+              f"{r['queue_wait']:6.1f} {r['peak_rss_mb'] or 0:8.0f}{mark}")
+    print(f"\n  Wall {payload['wall_seconds']:.1f}s | step time {payload['step_seconds']:.1f}s | "
+          f"parallelism {payload['parallelism']}x")
+    print(f"  Critical path ({payload['critical_path_seconds']:.1f}s): {' -> '.join(payload['critical_path'])}")
+    if path is not None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        print(f"  Report -> {path}")
+    return payload
@@ -0,0 +1,122 @@
+"""
+Per-donor contribution-limit screening of individual receipts.
+
+Flags (donor, candidate, election) groups whose summed 15/15E receipts
+exceed ``DONOR_LIMIT``. It runs inside ``individual_support``'s itcont pass
+when ``SCREEN_DONOR_LIMITS`` is on. Each counted row contributes:
+
+- DONOR: 64-bit hash of the normalized NAME and the 5-digit ZIP_CODE (no
+  Python strings are kept per donor)
+- CAND: candidate code, ELECTION: TRANSACTION_PGI as year * 10 + election type
+- AMT and SUB_ID
+
+The rows go through a ``SpillAggregator`` without pre-summing, so the
+SUB_IDs survive and memory stays bounded however many donors there are.
+Each bucket is then reduced on its own: group sums over the limit are
+flagged together with their SUB_IDs.
+
+This is a screen, not a finding. Donors are matched on name + ZIP (name
+variants split a donor, namesakes in one ZIP merge). Amounts follow the
+committee -> candidate rule in use (``--allocation`` shares), and
+redesignations and reattributions are not modelled.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from spill_agg import SpillAggregator
+
+
+# TRANSACTION_PGI election type letters; 0 = missing or unknown
+ELECTION_TYPES = ["", "P", "G", "R", "S", "C", "E", "O"]
+_ELECTION_IDX = {code: k for k, code in enumerate(ELECTION_TYPES) if code}
+
+FLAG_COLS = ["DONOR_KEY", "CAND_ID", "ELECTION", "TOTAL_AMT", "LIMIT", "N_TRANSACTIONS", "SUB_IDS"]
+_KEYS = ["DONOR", "CAND", "ELECTION"]
+
+
+def donor_keys(names: pd.Series, zips: pd.Series) -> np.ndarray:
+    """uint64 hash of upper-cased NAME (punctuation dropped, spaces collapsed) + first five ZIP digits."""
+    name = (names.fillna("").astype(str).str.upper()
+                 .str.replace(r"[^A-Z0-9 ]+", " ", regex=True)
+                 .str.replace(r"\s+", " ", regex=True).str.strip())
+    zip5 = zips.fillna("").astype(str).str[:5]
+    return pd.util.hash_array((name + "|" + zip5).to_numpy(dtype=object))
+
+
+def election_codes(pgi: pd.Series) -> np.ndarray:
+    """TRANSACTION_PGI ("P2016") -> year * 10 + election type index (0 when unparseable)."""
+    text = pgi.fillna("").astype(str).str.strip().str.upper()
+    kind = text.str[:1].map(_ELECTION_IDX).fillna(0).to_numpy(dtype=np.int32)
+    year = pd.to_numeric(text.str[1:5], errors="coerce").fillna(0).to_numpy(dtype=np.int32)
+    return year * 10 + kind
+
+
+def election_labels(codes) -> np.ndarray:
+    codes = np.asarray(codes)
+    kinds = np.asarray(ELECTION_TYPES, dtype=object)[codes % 10]
+    years = np.where(codes >= 10, (codes // 10).astype(str), "")
+    return (kinds + years.astype(object)).astype(object)
+
+
+class DonorLimitScreen:
+    """Spills (donor, candidate, election, amount, SUB_ID) rows and flags groups over ``limit``."""
+
+    def __init__(self, limit: float, n_buckets: int = 64, buffer_rows: int = 4_000_000, spill_dir=None):
+        self.limit = float(limit)
+        self._agg = SpillAggregator(
+            {"DONOR": np.uint64, "CAND": np.int32, "ELECTION": np.int32},
+            {"AMT": np.float64, "SUB_ID": np.int64},
+            n_buckets=n_buckets, buffer_rows=buffer_rows, spill_dir=spill_dir, combine=False,
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self._agg.close()
+
+    def add(self, chunk: pd.DataFrame, cand: np.ndarray, amt: np.ndarray) -> None:
+        """One counted itcont chunk with its candidate codes and (allocated) amounts."""
+        sub_id = pd.to_numeric(chunk["SUB_ID"], errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+        self._agg.add(
+            {"DONOR": donor_keys(chunk["NAME"], chunk["ZIP_CODE"]), "CAND": cand,
+             "ELECTION": election_codes(chunk["TRANSACTION_PGI"])},
+            {"AMT": amt, "SUB_ID": sub_id},
+        )
+
+    def _flag(self, frame: pd.DataFrame) -> pd.DataFrame:
+        total = frame.groupby(_KEYS, sort=False)["AMT"].transform("sum").to_numpy()
+        # Allocated shares are fractional; ignore sub-cent excesses
+        over = frame[total > self.limit + 0.005].sort_values(_KEYS + ["SUB_ID"])
+        return (over.groupby(_KEYS, sort=False)
+                    .agg(TOTAL_AMT=("AMT", "sum"), N_TRANSACTIONS=("AMT", "size"),
+                         SUB_IDS=("SUB_ID", lambda s: " ".join(map(str, s))))
+                    .reset_index())
+
+    def flagged(self, cand_codes, jobs: int = 1) -> pd.DataFrame:
+        """One row per flagged (donor, candidate, election), largest totals first."""
+        frames = [f for f in self._agg.iter_groups(jobs=jobs, reduce=self._flag) if len(f)]
+        if not frames:
+            return pd.DataFrame(columns=FLAG_COLS)
+        out = pd.concat(frames, ignore_index=True)
+        out = pd.DataFrame({
+            "DONOR_KEY": [f"{k:016x}" for k in out["DONOR"].to_numpy(dtype=np.uint64).tolist()],
+            "CAND_ID": cand_codes.decode(out["CAND"].to_numpy()),
+            "ELECTION": election_labels(out["ELECTION"].to_numpy()),
+            "TOTAL_AMT": out["TOTAL_AMT"].round(2),
+            "LIMIT": self.limit,
+            "N_TRANSACTIONS": out["N_TRANSACTIONS"],
+            "SUB_IDS": out["SUB_IDS"],
+        })
+        return out.sort_values(["TOTAL_AMT", "DONOR_KEY", "CAND_ID", "ELECTION"],
+                               ascending=[False, True, True, True], ignore_index=True)
+
+    def stats(self) -> dict:
+        self._agg.flush()
+        return self._agg.stats()
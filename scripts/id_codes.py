@@ -0,0 +1,59 @@
+"""
+Dense integer codes for FEC committee and candidate IDs.
+
+The support steps used to test every chunk row against Python sets of
+``CMTE_ID``/``CAND_ID`` strings (``isin``) and to map committees to
+candidates and ORG_TP with ``Series.map`` over dicts. An ``IdCodes`` assigns
+each ID known for the cycle (from cm/cn/ccl) a dense int32 code, so a chunk
+column is hashed once with ``encode`` and every later membership test or
+lookup is a NumPy take from a table built with ``mask``/``lookup``.
+
+Unknown IDs and missing values encode to -1. Tables carry one extra trailing
+slot holding the fill value, so indexing them with -1 needs no special case:
+
+    cmte = IdCodes(cm["CMTE_ID"])
+    is_pac = cmte.mask(pac_ids)
+    org_tp = cmte.lookup(org_type, fill="", dtype=object)
+    codes = cmte.encode(chunk["CMTE_ID"])
+    chunk = chunk[is_pac[codes] & (org_tp[codes] == "C")]
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+class IdCodes:
+    """Sorted dictionary of IDs -> int32 codes 0..n-1 (-1 for unknown)."""
+
+    def __init__(self, *id_columns):
+        ids = pd.concat([pd.Series(col, dtype=object) for col in id_columns], ignore_index=True)
+        self.ids = pd.Index(np.sort(ids.dropna().unique().astype(object)))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def encode(self, values) -> np.ndarray:
+        """int32 code per value; -1 for IDs outside the dictionary and missing values."""
+        return self.ids.get_indexer(pd.Index(np.asarray(values, dtype=object))).astype(np.int32)
+
+    def decode(self, codes) -> np.ndarray:
+        """IDs for non-negative codes (object array)."""
+        return self.ids.to_numpy()[np.asarray(codes)]
+
+    def mask(self, members) -> np.ndarray:
+        """Boolean membership table: ``table[codes]`` is True for codes of ``members``."""
+        table = np.zeros(len(self) + 1, dtype=bool)
+        codes = self.encode(list(members))
+        table[codes[codes >= 0]] = True
+        return table
+
+    def lookup(self, mapping, fill, dtype) -> np.ndarray:
+        """Value table from a dict/Series ID -> value: ``table[codes]`` replaces ``.map(mapping)``."""
+        mapping = pd.Series(mapping, dtype=object)
+        table = np.full(len(self) + 1, fill, dtype=dtype)
+        codes = self.encode(mapping.index)
+        known = codes >= 0
+        table[codes[known]] = mapping.to_numpy()[known].astype(dtype)
+        return table
@@ -0,0 +1,412 @@
+"""
+Incremental refresh of the support totals from republished FEC files.
+
+The FEC republishes the current cycle's itcont/itpas2 every week. Instead of
+re-running the three support steps for every office (3 passes over itcont,
+6 over itpas2), a refresh makes one narrow pass over each file, builds the
+ledger of contributing transactions keyed by SUB_ID and diffs it against the
+stored ledger:
+
+- new SUB_IDs (above the stored watermark or not seen before) are added
+- SUB_IDs whose candidate, category or amount changed (amendments) are replaced
+- SUB_IDs that disappeared from the file are removed
+
+Only those deltas are applied to the stored per-candidate accumulators, which
+are then written as the usual support intermediates before ``merge_support``
+re-runs for Senate, Presidential and Total.
+
+Transfer support is traced over the whole itoth graph rather than summed
+per transaction, so ``transfer_support`` simply re-runs for every office
+when itoth changed since the last refresh (the first office traces the
+graph, the others reuse its saved trace).
+
+Usage:
+    python incremental.py            # first run initializes the state
+    python incremental.py --reset    # drop stored state and rebuild
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import (TARGET_ELECTION_YR, PAC_ORG_TYPES, LEADERSHIP_PAC_COL, PARTY_SUPPORT_COL, PARTY_CMTE_TYPES,
+                    PARTY_TRANSACTION_TYPES, write_intermediate, get_output_dir, get_output_prefix)
+from stream_reader import iter_chunks
+from id_codes import IdCodes
+
+
+# Ledger category codes (int8) -> support column; PAC categories follow PAC_ORG_TYPES
+# from CAT_PAC on (corporate 2, nonconnected 3, as before the ORG_TP breakdown), then party committees
+CATEGORIES = ["INDIVIDUAL_SUPPORT", "SUPERPAC_IE_SUPPORT"] + list(PAC_ORG_TYPES.values()) + [PARTY_SUPPORT_COL]
+CAT_INDIV, CAT_SUPERPAC, CAT_PAC = 0, 1, 2
+CAT_PARTY = CAT_PAC + len(PAC_ORG_TYPES)
+CAT_LEADERSHIP = 0x40  # flag on the PAC category of leadership PACs (cm CMTE_DSGN 'D')
+
+OFFICE_RUNS = [({"S"}, "SENATE"), ({"P"}, "PRESIDENTIAL"), ({"S", "P"}, "TOTAL (SENATE + PRESIDENTIAL)")]
+
+
+def _state_dir() -> Path:
+    from config import OUT_DIR
+    return OUT_DIR / "incremental"
+
+
+def _load_candidates(cn_path: Path, cn_cols: list, offices: set) -> pd.DataFrame:
+    """Candidate master restricted to offices and target year, as the support steps do."""
+    cn = pd.read_csv(cn_path, sep="|", header=None, names=cn_cols, dtype=str, encoding_errors="ignore")
+    cn = cn[cn["CAND_OFFICE"].isin(offices)].copy()
+    cn["CAND_ELECTION_YR"] = cn["CAND_ELECTION_YR"].astype(str).str.extract(r"(\d{4})", expand=False)
+    return cn[cn["CAND_ELECTION_YR"] == TARGET_ELECTION_YR].copy()
+
+
+class Ledger:
+    """Contributing transactions of one source file, sorted by SUB_ID."""
+
+    def __init__(self, sub_id, cand, category, amount):
+        order = np.argsort(sub_id, kind="stable")
+        self.sub_id = np.asarray(sub_id, dtype=np.int64)[order]
+        self.cand = np.asarray(cand, dtype="U9")[order]
+        self.category = np.asarray(category, dtype=np.int8)[order]
+        self.amount = np.asarray(amount, dtype=float)[order]
+
+    @classmethod
+    def empty(cls) -> "Ledger":
+        return cls(np.empty(0, np.int64), np.empty(0, "U9"), np.empty(0, np.int8), np.empty(0))
+
+    @classmethod
+    def load(cls, path: Path) -> "Ledger":
+        if not path.exists():
+            return cls.empty()
+        with np.load(path) as z:
+            return cls(z["sub_id"], z["cand"], z["category"], z["amount"])
+
+    def save(self, path: Path) -> None:
+        np.savez(path, sub_id=self.sub_id, cand=self.cand, category=self.category, amount=self.amount)
+
+    @property
+    def watermark(self) -> int:
+        return int(self.sub_id[-1]) if len(self.sub_id) else 0
+
+    def frame(self, mask=None) -> pd.DataFrame:
+        sl = slice(None) if mask is None else mask
+        return pd.DataFrame({"CAND_ID": self.cand[sl], "CATEGORY": self.category[sl], "AMT": self.amount[sl]})
+
+
+def diff_ledgers(old: Ledger, new: Ledger) -> tuple[pd.DataFrame, dict]:
+    """
+    Signed per-(CAND_ID, CATEGORY) deltas turning ``old`` into ``new``.
+    Returns (deltas with columns CAND_ID, CATEGORY, AMT, N; counters).
+    """
+    pos = np.searchsorted(old.sub_id, new.sub_id)
+    pos_c = np.minimum(pos, max(len(old.sub_id) - 1, 0))
+    in_old = (pos < len(old.sub_id)) & (old.sub_id[pos_c] == new.sub_id) if len(old.sub_id) else np.zeros(len(new.sub_id), bool)
+    in_new = np.isin(old.sub_id, new.sub_id, assume_unique=False)
+
+    changed = in_old.copy()
+    if in_old.any():
+        j = pos[in_old]
+        same = (
+            (old.cand[j] == new.cand[in_old])
+            & (old.category[j] == new.category[in_old])
+            & (old.amount[j] == new.amount[in_old])
+        )
+        changed[in_old] = ~same
+    added = ~in_old
+    removed = ~in_new
+    old_changed = np.zeros(len(old.sub_id), bool)
+    old_changed[pos[changed]] = True
+
+    plus = new.frame(added | changed).assign(N=1)
+    minus = old.frame(removed | old_changed).assign(N=-1)
+    minus["AMT"] = -minus["AMT"]
+    deltas = (
+        pd.concat([plus, minus], ignore_index=True)
+          .groupby(["CAND_ID", "CATEGORY"], as_index=False)[["AMT", "N"]].sum()
+    )
+    counters = {
+        "added": int(added.sum()),
+        "added_above_watermark": int((new.sub_id[added] > old.watermark).sum()),
+        "amended": int(changed.sum()),
+        "removed": int(removed.sum()),
+        "unchanged": int(in_old.sum() - changed.sum()),
+    }
+    return deltas, counters
+
+
+def apply_deltas(totals: pd.DataFrame, deltas: pd.DataFrame) -> pd.DataFrame:
+    """Add signed deltas to the stored (CAND_ID, CATEGORY) -> (AMT, N) accumulators."""
+    out = (
+        pd.concat([totals, deltas], ignore_index=True)
+          .groupby(["CAND_ID", "CATEGORY"], as_index=False)[["AMT", "N"]].sum()
+    )
+    # Accumulators whose last transaction disappeared drop out, as if never seen
+    return out[out["N"] > 0].reset_index(drop=True)
+
+
+def _sub_ids(series: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """Exact int64 SUB_IDs (19 digits do not survive a float round-trip) and a validity mask."""
+    ok = series.fillna("").str.fullmatch(r"\d{1,18}|[1-8]\d{18}")
+    return series.where(ok, "0").astype(np.int64), ok
+
+
+def _scan_itcont(path, cols, chunksize, cmte_codes, cand_of_cmte, cand_codes, is_valid_cand) -> Ledger:
+    parts = []
+    usecols = ["CMTE_ID", "TRANSACTION_TP", "ENTITY_TP", "TRANSACTION_AMT", "SUB_ID"]
+    for chunk in iter_chunks(path, cols, chunksize, usecols=usecols):
+        chunk = chunk[(chunk["TRANSACTION_TP"].isin(["15", "15E"])) & (chunk["ENTITY_TP"] == "IND")]
+        cand = cand_of_cmte[cmte_codes.encode(chunk["CMTE_ID"])]
+        keep = is_valid_cand[cand]
+        chunk = chunk[keep].assign(CAND_ID=cand_codes.decode(cand[keep]))
+        amt = pd.to_numeric(chunk["TRANSACTION_AMT"], errors="coerce")
+        sub_id, sub_ok = _sub_ids(chunk["SUB_ID"])
+        mask = amt.notna() & (amt > 0) & sub_ok
+        parts.append((sub_id[mask], chunk.loc[mask, "CAND_ID"], np.full(int(mask.sum()), CAT_INDIV), amt[mask]))
+    return _ledger_from_parts(parts)
+
+
+def _scan_itpas2(path, cols, chunksize, cmte_codes, is_superpac, is_pac, is_party, org_of_cmte, is_leadership,
+                 cand_codes, is_valid_cand) -> Ledger:
+    parts = []
+    usecols = ["CMTE_ID", "TRANSACTION_TP", "TRANSACTION_AMT", "CAND_ID", "SUB_ID"]
+    for chunk in iter_chunks(path, cols, chunksize, usecols=usecols):
+        chunk = chunk[is_valid_cand[cand_codes.encode(chunk["CAND_ID"])]]
+        amt = pd.to_numeric(chunk["TRANSACTION_AMT"], errors="coerce")
+        sub_id, sub_ok = _sub_ids(chunk["SUB_ID"])
+        ok = amt.notna() & (amt > 0) & sub_ok
+
+        cmte = cmte_codes.encode(chunk["CMTE_ID"])
+        superpac = ok & (chunk["TRANSACTION_TP"] == "24E") & is_superpac[cmte]
+        pac = ok & is_pac[cmte] & ~chunk["TRANSACTION_TP"].isin(["24E", "24A"])
+        org = org_of_cmte[cmte]
+        pac &= org >= 0
+        party = ok & is_party[cmte] & chunk["TRANSACTION_TP"].isin(PARTY_TRANSACTION_TYPES)
+
+        parts.append((sub_id[superpac], chunk.loc[superpac, "CAND_ID"], np.full(int(superpac.sum()), CAT_SUPERPAC),
+                      amt[superpac]))
+        pac_cat = CAT_PAC + org[pac] + np.where(is_leadership[cmte[pac]], CAT_LEADERSHIP, 0)
+        parts.append((sub_id[pac], chunk.loc[pac, "CAND_ID"], pac_cat, amt[pac]))
+        parts.append((sub_id[party], chunk.loc[party, "CAND_ID"], np.full(int(party.sum()), CAT_PARTY), amt[party]))
+    return _ledger_from_parts(parts)
+
+
+def _ledger_from_parts(parts) -> Ledger:
+    if not parts:
+        return Ledger.empty()
+    return Ledger(
+        np.concatenate([np.asarray(p[0], dtype=np.int64) for p in parts]),
+        np.concatenate([np.asarray(p[1], dtype="U9") for p in parts]),
+        np.concatenate([np.asarray(p[2], dtype=np.int8) for p in parts]),
+        np.concatenate([np.asarray(p[3], dtype=float) for p in parts]),
+    )
+
+
+def _write_support_outputs(totals: pd.DataFrame, cn: pd.DataFrame, office_filter: set) -> None:
+    """Write the three support intermediates for one office from the accumulators."""
+    from config import SUFFIX, SPLIT_LEADERSHIP_PACS
+
+    out_dir = get_output_dir(office_filter)
+    prefix = get_output_prefix(office_filter)
+    cn_office = cn[cn["CAND_OFFICE"].isin(office_filter)]
+    cand_year = cn_office.drop_duplicates("CAND_ID").set_index("CAND_ID")["CAND_ELECTION_YR"]
+    t = totals[totals["CAND_ID"].isin(cn_office["CAND_ID"])]
+
+    def _cat(code, flag=0):
+        s = t[(t["CATEGORY"] & ~flag) == code].groupby("CAND_ID", sort=False)["AMT"].sum()
+        return s.astype(float).to_dict()
+
+    for code, name in ((CAT_SUPERPAC, "superpac_ie_support"), (CAT_INDIV, "individual_support")):
+        col = CATEGORIES[code]
+        vals = _cat(code)
+        out = (
+            pd.DataFrame({"CAND_ID": list(vals), col: list(vals.values())}, columns=["CAND_ID", col])
+              .assign(CAND_ELECTION_YR=lambda d: d["CAND_ID"].map(cand_year))
+              [["CAND_ID", "CAND_ELECTION_YR", col]]
+              .sort_values(col, ascending=False)
+        )
+        write_intermediate(out, out_dir, f"{prefix}_{name}_{SUFFIX}")
+
+    pac_cols = list(PAC_ORG_TYPES.values())
+    pac_totals = {col: _cat(CAT_PAC + k, CAT_LEADERSHIP) for k, col in enumerate(pac_cols)}
+    pac_totals[PARTY_SUPPORT_COL] = _cat(CAT_PARTY)
+    if SPLIT_LEADERSHIP_PACS:
+        lead = t[(t["CATEGORY"] & CAT_LEADERSHIP) != 0].groupby("CAND_ID", sort=False)["AMT"].sum()
+        pac_totals[LEADERSHIP_PAC_COL] = lead.astype(float).to_dict()
+    all_cands = sorted(set().union(*(set(v) for k, v in pac_totals.items() if k != LEADERSHIP_PAC_COL)))
+    out = pd.DataFrame({"CAND_ID": all_cands}, columns=["CAND_ID"])
+    for col, vals in pac_totals.items():
+        out[col] = out["CAND_ID"].map(vals).fillna(0.0)
+    out = (
+        out.assign(CAND_ELECTION_YR=lambda d: d["CAND_ID"].map(cand_year))
+           [["CAND_ID", "CAND_ELECTION_YR"] + list(pac_totals)]
+           .sort_values(["CORP_PAC_SUPPORT", "NONCONNECTED_PAC_SUPPORT"], ascending=False)
+    )
+    write_intermediate(out, out_dir, f"{prefix}_pac_support_corp_nonconnected_{SUFFIX}")
+    print(f"[incremental][{prefix}] Wrote support intermediates to {out_dir}")
+
+
+def _refresh_transfers(state: dict, summary: dict) -> dict:
+    """Re-run transfer_support per office if itoth changed; returns the new intermediates by office prefix."""
+    import transfer_support
+    from config import OTH_DIR, SUFFIX, find_intermediate
+    from superpac_ie_support import _find_file
+
+    try:
+        path = _find_file(OTH_DIR, "itoth")
+    except FileNotFoundError:
+        path = None
+    prev = state["sources"].get("itoth", {})
+    stored = all(find_intermediate(get_output_dir(o), f"{get_output_prefix(o)}_transfer_support_{SUFFIX}")
+                 for o, _ in OFFICE_RUNS)
+    if path is not None and stored:
+        st = path.stat()
+        if prev.get("size") == st.st_size and prev.get("mtime") == st.st_mtime:
+            print(f"[incremental] itoth: unchanged since last refresh ({path.name}), skipping")
+            summary["itoth"] = {"skipped": True}
+            return {}
+
+    t0 = time.time()
+    frames = {get_output_prefix(o): transfer_support.main(o) for o, _ in OFFICE_RUNS}
+    if path is None:
+        state["sources"].pop("itoth", None)
+    else:
+        st = path.stat()
+        state["sources"]["itoth"] = {"path": str(path), "size": st.st_size, "mtime": st.st_mtime,
+                                     "refreshed_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+    summary["itoth"] = {"seconds": round(time.time() - t0, 1)}
+    print(f"[incremental] itoth: re-traced transfers for {len(frames)} offices | {summary['itoth']['seconds']}s")
+    return frames
+
+
+def refresh(reset: bool = False, run_merge: bool = True) -> dict:
+    """Diff the current raw files against stored state, apply deltas, rebuild outputs."""
+    from config import (CM_DIR, CN_DIR, CCL_DIR, INDIV_DIR, PAS2_DIR, CM_COLS, CN_COLS, CCL_COLS,
+                        INDIV_COLS, ITPAS2_COLS, VALID_OFFICES, CHUNKSIZE, INDIV_ALLOCATION, NETTING_POLICY)
+    from superpac_ie_support import _find_file
+    from individual_support import _build_cmte_to_cand
+
+    # The SUB_ID ledgers hold one candidate per transaction
+    if INDIV_ALLOCATION != "principal":
+        raise ValueError(f"Incremental refresh only supports INDIV_ALLOCATION = 'principal' "
+                         f"(got {INDIV_ALLOCATION!r}); run the full pipeline instead")
+    # The stored per-candidate totals are gross (amounts > 0 only)
+    if NETTING_POLICY != "gross":
+        raise ValueError(f"Incremental refresh only supports NETTING_POLICY = 'gross' "
+                         f"(got {NETTING_POLICY!r}); run the full pipeline instead")
+
+    state_dir = _state_dir()
+    if reset and state_dir.exists():
+        shutil.rmtree(state_dir)
+    state_dir.mkdir(parents=True, exist_ok=True)
+    state_path = state_dir / "state.json"
+    totals_path = state_dir / "totals.csv"
+    state = json.loads(state_path.read_text()) if state_path.exists() else {"sources": {}}
+    totals = (
+        pd.read_csv(totals_path, dtype={"CAND_ID": str, "CATEGORY": np.int8})
+        if totals_path.exists() else pd.DataFrame(columns=["CAND_ID", "CATEGORY", "AMT", "N"])
+    )
+    print(f"[incremental] State: {state_dir} ({'new' if not state['sources'] else 'existing'})")
+
+    cm_path = _find_file(CM_DIR, "cm")
+    cm = pd.read_csv(cm_path, sep="|", header=None, names=CM_COLS, dtype=str, encoding_errors="ignore")
+    cm["CMTE_TP"] = cm["CMTE_TP"].fillna("")
+    cm["ORG_TP"] = cm["ORG_TP"].fillna("")
+    ccl = pd.read_csv(_find_file(CCL_DIR, "ccl"), sep="|", header=None, names=CCL_COLS, dtype=str, encoding_errors="ignore")
+    cmte_to_cand = _build_cmte_to_cand(ccl)
+
+    cn = _load_candidates(_find_file(CN_DIR, "cn"), CN_COLS, set(VALID_OFFICES))
+
+    # Dense ID codes (see id_codes.py) replace per-chunk isin/map over strings
+    cmte_codes = IdCodes(cm["CMTE_ID"], ccl["CMTE_ID"])
+    cand_codes = IdCodes(cn["CAND_ID"])
+    is_superpac = cmte_codes.mask(cm.loc[cm["CMTE_TP"] == "O", "CMTE_ID"].dropna())
+    is_pac = cmte_codes.mask(cm.loc[cm["CMTE_TP"].isin(["Q", "N"]), "CMTE_ID"].dropna())
+    # A committee also listed as a PAC counts as a PAC
+    is_party = cmte_codes.mask(cm.loc[cm["CMTE_TP"].isin(PARTY_CMTE_TYPES), "CMTE_ID"].dropna()) & ~is_pac
+    org_index = {t: k for k, t in enumerate(PAC_ORG_TYPES)}
+    org_of_cmte = cmte_codes.lookup(cm.set_index("CMTE_ID")["ORG_TP"].map(org_index).fillna(-1).to_dict(),
+                                    fill=-1, dtype=np.int8)
+    is_leadership = cmte_codes.mask(cm.loc[cm["CMTE_DSGN"] == "D", "CMTE_ID"].dropna())
+    cmte_cand = pd.Series(cand_codes.encode(list(cmte_to_cand.values())), index=list(cmte_to_cand.keys()))
+    cand_of_cmte = cmte_codes.lookup(cmte_cand, fill=-1, dtype=np.int32)
+    is_valid_cand = cand_codes.mask(cn["CAND_ID"].dropna())
+
+    sources = {
+        "itcont": (_find_file(INDIV_DIR, "itcont"),
+                   lambda p: _scan_itcont(p, INDIV_COLS, CHUNKSIZE, cmte_codes, cand_of_cmte, cand_codes, is_valid_cand)),
+        "itpas2": (_find_file(PAS2_DIR, "itpas2"),
+                   lambda p: _scan_itpas2(p, ITPAS2_COLS, CHUNKSIZE, cmte_codes, is_superpac, is_pac, is_party,
+                                          org_of_cmte, is_leadership, cand_codes, is_valid_cand)),
+    }
+
+    summary = {}
+    for key, (path, scan) in sources.items():
+        st = path.stat()
+        prev = state["sources"].get(key, {})
+        if prev.get("size") == st.st_size and prev.get("mtime") == st.st_mtime:
+            print(f"[incremental] {key}: unchanged since last refresh ({path.name}), skipping")
+            summary[key] = {"skipped": True}
+            continue
+
+        t0 = time.time()
+        ledger_path = state_dir / f"{key}_ledger.npz"
+        old = Ledger.load(ledger_path)
+        print(f"[incremental] {key}: scanning {path} (watermark SUB_ID {old.watermark})")
+        new = scan(path)
+        deltas, counters = diff_ledgers(old, new)
+        totals = apply_deltas(totals, deltas)
+        new.save(ledger_path)
+
+        state["sources"][key] = {
+            "path": str(path), "size": st.st_size, "mtime": st.st_mtime,
+            "watermark": new.watermark, "rows": int(len(new.sub_id)),
+            "refreshed_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        counters["seconds"] = round(time.time() - t0, 1)
+        summary[key] = counters
+        print(f"[incremental] {key}: +{counters['added']:,} new ({counters['added_above_watermark']:,} above watermark), "
+              f"{counters['amended']:,} amended, -{counters['removed']:,} removed, "
+              f"{counters['unchanged']:,} unchanged | {len(deltas):,} candidate deltas | {counters['seconds']}s")
+
+    # The accumulators must agree with a fresh sum over the stored ledgers
+    fresh = pd.concat(
+        [Ledger.load(state_dir / f"{key}_ledger.npz").frame() for key in sources], ignore_index=True
+    ).groupby(["CAND_ID", "CATEGORY"])["AMT"].sum()
+    drift = (totals.set_index(["CAND_ID", "CATEGORY"])["AMT"] - fresh).abs().max() if len(fresh) else 0.0
+    if pd.notna(drift) and drift > 0.01:
+        print(f"[incremental][WARN] Accumulators drifted from ledgers by ${drift:,.2f}; consider --reset")
+
+    transfers = _refresh_transfers(state, summary)
+
+    totals.to_csv(totals_path, index=False)
+    state_path.write_text(json.dumps(state, indent=2))
+
+    for office_filter, _ in OFFICE_RUNS:
+        _write_support_outputs(totals, cn, office_filter)
+
+    if run_merge:
+        import merge_support
+        for office_filter, label in OFFICE_RUNS:
+            print(f"\n[incremental] merge_support [{label}]")
+            transfer = transfers.get(get_output_prefix(office_filter))
+            merge_support.main(office_filter=office_filter,
+                               frames={"transfer": transfer} if transfer is not None else None)
+
+    return summary
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Apply weekly FEC file updates incrementally.")
+    ap.add_argument("--reset", action="store_true", help="Discard stored state and rebuild from the current files")
+    ap.add_argument("--skip-merge", action="store_true", help="Only update the support intermediates")
+    args = ap.parse_args()
+    refresh(reset=args.reset, run_merge=not args.skip_merge)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,22 @@
 ## 04
 
+from __future__ import annotations
+
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from config import TARGET_ELECTION_YR, write_csv_no_blank_line, get_output_dir, get_output_prefix
+from config import (TARGET_ELECTION_YR, DONOR_STATES, OTHER_STATE, write_intermediate, write_csv_no_blank_line,
+                    get_output_dir, get_output_prefix)
+from amount_sketches import SketchSet, sketch_path
+from stream_reader import LINE_LEN_COL
+from txn_index import TxnIndexBuilder, index_path
+from reconciliation import ReconLedger, ledger_path, AMT_COL
+from id_codes import IdCodes
+from allocation import AllocationMatrix
+from industry import INDUSTRY_CODES, shared_coder, rollup_table
+from donor_limits import DonorLimitScreen
+from netting import amount_mask, split_signed, netted_columns, side_mask
+from sampling import Sample
 
 def _find_file(folder: Path, startswith: str) -> Path:
     for ext in ("*.txt", "*.dat"):
@@ -26,16 +40,58 @@ def _build_cmte_to_cand(ccl: pd.DataFrame) -> dict:
     chosen = ccl.dropna(subset=["CMTE_ID", "CAND_ID"]).drop_duplicates("CMTE_ID", keep="first")
     return dict(zip(chosen["CMTE_ID"], chosen["CAND_ID"]))
 
+def _state_tables(by_state: np.ndarray, seen: np.ndarray, cand_codes: IdCodes, state_codes: IdCodes,
+                  cn: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Per-candidate in-state share and the long (candidate, contributor state)
+    breakdown from the (candidate code x state code) accumulator. The
+    in-state share is blank for candidates without a home state (President).
+    """
+    cands = np.flatnonzero(seen)
+    ids = cand_codes.decode(cands)
+    info = cn.drop_duplicates("CAND_ID").set_index("CAND_ID").reindex(ids)
+    rows = by_state[cands]
+    total = rows.sum(axis=1)
+    home = state_codes.encode(info["CAND_OFFICE_ST"])
+    in_state = np.where(home >= 0, rows[np.arange(len(cands)), home], np.nan)
+    share = pd.DataFrame({
+        "CAND_ID": ids,
+        "CAND_ELECTION_YR": info["CAND_ELECTION_YR"].to_numpy(),
+        "CAND_OFFICE_ST": info["CAND_OFFICE_ST"].to_numpy(),
+        "INDIVIDUAL_SUPPORT": total.round(2),
+        "IN_STATE_SUPPORT": in_state.round(2),
+        "OUT_OF_STATE_SUPPORT": (total - in_state).round(2),
+        "IN_STATE_SHARE": (in_state / total).round(4),
+    }).sort_values("INDIVIDUAL_SUPPORT", ascending=False)
+
+    labels = np.append(state_codes.ids.to_numpy(), OTHER_STATE)
+    c, st = np.nonzero(rows)
+    long = (
+        pd.DataFrame({
+            "CAND_ID": ids[c],
+            "CAND_ELECTION_YR": info["CAND_ELECTION_YR"].to_numpy()[c],
+            "STATE": labels[st],
+            "INDIVIDUAL_SUPPORT": rows[c, st].round(2),
+        })
+          .sort_values(["CAND_ID", "INDIVIDUAL_SUPPORT"], ascending=[True, False], kind="stable")
+    )
+    return share, long
+
 def main(office_filter=None, cfg=None):
     """
-    Generate individual contribution support data.
+    Generate individual contribution support data, plus the in-state donor
+    share, per-state breakdown and industry rollup from the same pass.
     
     Args:
         office_filter: Set of office codes to include (e.g., {'S'}, {'P'}, or {'S', 'P'})
         cfg: Optional config dict (for testing/flexibility)
+
+    Returns:
+        The typed intermediate (CAND_ID, CAND_ELECTION_YR, support columns),
+        so merge_support can take it in memory when run in the same process.
     """
     if cfg is None:
-        from config import CCL_DIR, CN_DIR, INDIV_DIR, CCL_COLS, CN_COLS, INDIV_COLS, SUFFIX, VALID_OFFICES, CHUNKSIZE
+        from config import CCL_DIR, CN_DIR, INDIV_DIR, CCL_COLS, CN_COLS, INDIV_COLS, SUFFIX, VALID_OFFICES, CHUNKSIZE, BUILD_AMOUNT_SKETCHES, BUILD_TXN_INDEX, SAMPLE, INDIV_ALLOCATION, ALLOCATION_DSGN_WEIGHTS, BUILD_INDUSTRY_ROLLUP, INDUSTRY_CACHE_SIZE, SCREEN_DONOR_LIMITS, DONOR_LIMIT, SPILL_BUCKETS, SPILL_BUFFER_ROWS, SPILL_DIR, NETTING_POLICY
     else:
         CCL_DIR = cfg['CCL_DIR']
         CN_DIR = cfg['CN_DIR']
@@ -46,6 +102,23 @@ def main(office_filter=None, cfg=None):
         SUFFIX = cfg['SUFFIX']
         VALID_OFFICES = cfg['VALID_OFFICES']
         CHUNKSIZE = cfg['CHUNKSIZE']
+        BUILD_AMOUNT_SKETCHES = cfg.get('BUILD_AMOUNT_SKETCHES', True)
+        BUILD_TXN_INDEX = cfg.get('BUILD_TXN_INDEX', True)
+        SAMPLE = cfg.get('SAMPLE')
+        INDIV_ALLOCATION = cfg.get('INDIV_ALLOCATION', "principal")
+        ALLOCATION_DSGN_WEIGHTS = cfg.get('ALLOCATION_DSGN_WEIGHTS', {})
+        BUILD_INDUSTRY_ROLLUP = cfg.get('BUILD_INDUSTRY_ROLLUP', True)
+        INDUSTRY_CACHE_SIZE = cfg.get('INDUSTRY_CACHE_SIZE', 500_000)
+        SCREEN_DONOR_LIMITS = cfg.get('SCREEN_DONOR_LIMITS', False)
+        DONOR_LIMIT = cfg.get('DONOR_LIMIT')
+        SPILL_BUCKETS = cfg.get('SPILL_BUCKETS', 64)
+        SPILL_BUFFER_ROWS = cfg.get('SPILL_BUFFER_ROWS', 4_000_000)
+        SPILL_DIR = cfg.get('SPILL_DIR')
+        NETTING_POLICY = cfg.get('NETTING_POLICY', "gross")
+    sample = SAMPLE or Sample()
+    if SCREEN_DONOR_LIMITS and DONOR_LIMIT is None:
+        raise ValueError(f"No donor limit for the {TARGET_ELECTION_YR} election; add it to DONOR_LIMITS in config.py "
+                         "or set SCREEN_DONOR_LIMITS = False")
     
     # Use provided office_filter or default to all valid offices
     if office_filter is None:
@@ -67,6 +140,20 @@ def main(office_filter=None, cfg=None):
     print(f"[individual_support][{prefix}] Loading candidate master:", cn_path)
 
     cn = pd.read_csv(cn_path, sep="|", header=None, names=CN_COLS, dtype=str, encoding_errors="ignore")
+    # Dense codes: chunks are hashed once, every later test is an array lookup
+    cand_codes = IdCodes(cn["CAND_ID"])
+    cmte_codes = IdCodes(ccl["CMTE_ID"])
+    cmte_cand = pd.Series(cand_codes.encode(list(cmte_to_cand.values())), index=list(cmte_to_cand.keys()))
+    is_linked = cmte_codes.mask(cmte_to_cand)
+    cand_of_cmte = cmte_codes.lookup(cmte_cand, fill=-1, dtype=np.int32)
+    in_sample = sample.cmte_table(cmte_codes)
+    # Multi-candidate committees: split receipts over every linked candidate (see allocation.py)
+    alloc = None
+    if INDIV_ALLOCATION != "principal":
+        alloc = AllocationMatrix.from_ccl(ccl, cmte_codes, cand_codes, INDIV_ALLOCATION, ALLOCATION_DSGN_WEIGHTS)
+        n_multi = int((np.diff(alloc.indptr) > 1).sum())
+        print(f"[individual_support][{prefix}] Allocation '{INDIV_ALLOCATION}': {alloc.n_links:,} links, "
+              f"{n_multi:,} committees linked to several candidates")
     
     # Filter to specified offices
     cn = cn[cn["CAND_OFFICE"].isin(office_filter)].copy()
@@ -77,61 +164,183 @@ def main(office_filter=None, cfg=None):
     before = len(cn)
     cn = cn[cn["CAND_ELECTION_YR"] == TARGET_ELECTION_YR].copy()
     print(f"[individual_support][{prefix}] After year filter {TARGET_ELECTION_YR}: {before:,} -> {len(cn):,}")
+    if sample.active:
+        cn = sample.restrict_candidates(cn)
+        print(f"[individual_support][{prefix}] PARTIAL RUN {sample.to_dict()}: {len(cn):,} candidates selected")
 
-    valid_cand_ids = set(cn["CAND_ID"].dropna().unique())
-    cn_index = cn.set_index("CAND_ID")
+    is_valid_cand = cand_codes.mask(cn["CAND_ID"].dropna())
+    if alloc is not None:
+        # Share of each committee's receipts that goes to candidates in cn / in this office and year
+        known_share = alloc.row_share()
+        alloc = alloc.restrict(is_valid_cand)
+        valid_share = alloc.row_share()
+    cand_year = cn.drop_duplicates("CAND_ID").set_index("CAND_ID")["CAND_ELECTION_YR"]
 
-    totals = {}
+    # Gross and refund (negative amount) accumulators; refunds stay 0 under the gross policy
+    totals = np.zeros(len(cand_codes))
+    refunds = np.zeros(len(cand_codes))
+    seen = np.zeros(len(cand_codes), dtype=bool)
+    # (candidate x contributor state) totals; the trailing slot holds foreign/unknown states
+    state_codes = IdCodes(list(DONOR_STATES))
+    n_state_slots = len(state_codes) + 1
+    by_state = np.zeros((len(cand_codes), n_state_slots))
+    # (candidate x industry) totals; EMPLOYER/OCCUPATION go through the shared normalization cache
+    industry_coder = shared_coder(INDUSTRY_CACHE_SIZE) if BUILD_INDUSTRY_ROLLUP else None
+    if industry_coder is not None:
+        coder_start = industry_coder.stats()
+        by_industry = np.zeros((len(cand_codes), len(INDUSTRY_CODES)))
+    sketches = SketchSet("individual") if BUILD_AMOUNT_SKETCHES else None
+    # Per-donor limit screen: hashed (NAME+ZIP, candidate, election) rows spilled to disk (see donor_limits.py)
+    screen = DonorLimitScreen(DONOR_LIMIT, SPILL_BUCKETS, SPILL_BUFFER_ROWS, SPILL_DIR) if SCREEN_DONOR_LIMITS else None
 
     print(f"[individual_support][{prefix}] Streaming itcont:", indiv_path)
-    reader = pd.read_csv(
-        indiv_path, sep="|", header=None, names=INDIV_COLS,
-        dtype=str, chunksize=CHUNKSIZE, encoding_errors="ignore",
-        on_bad_lines="skip"
-    )
+    txn_index = TxnIndexBuilder(indiv_path, allocation=INDIV_ALLOCATION) if BUILD_TXN_INDEX else None
+    recon = ReconLedger("individual_support", indiv_path, scale=sample.scale, netting=NETTING_POLICY)
+    reader = sample.iter_chunks(indiv_path, INDIV_COLS, CHUNKSIZE, "individual", cand_ids=cn["CAND_ID"].dropna(),
+                                with_offsets=txn_index is not None, stats=recon.reader_stats)
 
     for i, chunk in enumerate(reader, start=1):
-        chunk = chunk[(chunk["TRANSACTION_TP"].isin(["15", "15E"])) & (chunk["ENTITY_TP"] == "IND")].copy()
+        chunk = recon.start(chunk)
+        chunk = recon.keep(chunk, chunk["TRANSACTION_TP"].isin(["15", "15E"]), "transaction_type")
+        chunk = recon.keep(chunk, chunk["ENTITY_TP"] == "IND", "entity_type")
         if chunk.empty:
             continue
 
         # Map committee -> candidate
-        chunk["CAND_ID"] = chunk["CMTE_ID"].map(cmte_to_cand)
-        chunk = chunk[chunk["CAND_ID"].notna()]
+        cmte = cmte_codes.encode(chunk["CMTE_ID"])
+        if sample.cmte_fraction:
+            chunk = recon.keep(chunk, in_sample[cmte], "sample")
+            cmte = cmte[in_sample[cmte]]
+        if alloc is None:
+            chunk = recon.keep(chunk.assign(CAND_CODE=cand_of_cmte[cmte]), is_linked[cmte], "unmapped_committee")
+            chunk = recon.keep(chunk, chunk["CAND_CODE"].to_numpy() >= 0, "unmapped_candidate")
+            if chunk.empty:
+                continue
+
+            # Filter to valid candidates for this office type
+            chunk = recon.keep(chunk, is_valid_cand[chunk["CAND_CODE"].to_numpy()], "office_year")
+        else:
+            chunk = recon.keep(chunk.assign(CMTE_CODE=cmte), is_linked[cmte], "unmapped_committee")
+            chunk = recon.keep(chunk, known_share[chunk["CMTE_CODE"].to_numpy()] > 0, "unmapped_candidate")
+            chunk = recon.keep(chunk, valid_share[chunk["CMTE_CODE"].to_numpy()] > 0, "office_year")
         if chunk.empty:
             continue
 
-        # Filter to valid candidates for this office type
-        chunk = chunk[chunk["CAND_ID"].isin(valid_cand_ids)]
+        amt = chunk[AMT_COL]
+        chunk = recon.keep(chunk, amount_mask(amt, NETTING_POLICY), "non_positive_amount")
         if chunk.empty:
             continue
 
-        amt = pd.to_numeric(chunk["TRANSACTION_AMT"], errors="coerce")
-        mask = amt.notna() & (amt > 0)
-        if not mask.any():
-            continue
+        amt = chunk[AMT_COL]
+        gross, negative = split_signed(amt.to_numpy())
+        if alloc is None:
+            recon.count_kept("INDIVIDUAL_SUPPORT", amt)
+            cand = chunk["CAND_CODE"].to_numpy()
+            totals += np.bincount(cand, weights=gross, minlength=len(totals))
+            if NETTING_POLICY != "gross":
+                refunds += np.bincount(cand, weights=negative, minlength=len(refunds))
+        else:
+            # Per-committee sums, then one sparse mat-vec onto the candidates
+            cmte = chunk["CMTE_CODE"].to_numpy()
+            n_neg = int((negative < 0).sum())
+            for weights, acc, column, rows in ((gross, totals, "INDIVIDUAL_SUPPORT", len(chunk) - n_neg),
+                                               (negative, refunds, recon.refund_column("INDIVIDUAL_SUPPORT"), n_neg)):
+                if rows == 0:
+                    continue
+                cmte_sums = np.bincount(cmte, weights=weights, minlength=len(cmte_codes))
+                allocated = alloc.allocate(cmte_sums)
+                acc += allocated
+                recon.count_kept_totals(column, rows, allocated.sum())
+                # Shares of linked candidates outside this office/year
+                recon.count_dropped("office_year", 0, float(cmte_sums.sum() - allocated.sum()))
+            # One row per (transaction, candidate) with its allocated amount, for sketches and the index
+            rows, cand, weight = alloc.expand(cmte)
+            chunk = chunk.iloc[rows]
+            amt = pd.Series(amt.to_numpy()[rows] * weight, index=chunk.index)
+        seen[cand] = True
+        side = side_mask(amt.to_numpy(), NETTING_POLICY)
+        if side is not None:
+            chunk, cand, amt = chunk[side], cand[side], amt[side]
+        state = state_codes.encode(chunk["STATE"])
+        state[state < 0] = n_state_slots - 1
+        by_state += np.bincount(cand.astype(np.int64) * n_state_slots + state, weights=amt.to_numpy(),
+                                minlength=by_state.size).reshape(by_state.shape)
+        if industry_coder is not None:
+            industry = industry_coder.encode(chunk["EMPLOYER"], chunk["OCCUPATION"])
+            by_industry += np.bincount(cand.astype(np.int64) * len(INDUSTRY_CODES) + industry,
+                                       weights=amt.to_numpy(), minlength=by_industry.size).reshape(by_industry.shape)
 
-        chunk = chunk.loc[mask]
-        amt = amt.loc[mask]
+        if screen is not None:
+            screen.add(chunk, cand, amt.to_numpy())
 
-        grp = amt.groupby(chunk["CAND_ID"]).sum()
-        for cand_id, val in grp.items():
-            totals[cand_id] = totals.get(cand_id, 0.0) + float(val)
+        chunk = chunk.assign(CAND_ID=cand_codes.decode(cand))
+        if sketches is not None:
+            sketches.update(chunk["CAND_ID"], amt)
+        if txn_index is not None:
+            txn_index.add(chunk["CAND_ID"], chunk.index, chunk[LINE_LEN_COL])
 
         if i % 5 == 0:
-            print(f"[individual_support][{prefix}] chunks: {i:,} | candidates so far: {len(totals):,}")
+            print(f"[individual_support][{prefix}] chunks: {i:,} | candidates so far: {int(seen.sum()):,}")
 
-    rows = [{"CAND_ID": k, "INDIVIDUAL_SUPPORT": v} for k, v in totals.items()]
+    columns = netted_columns("INDIVIDUAL_SUPPORT", totals[seen], refunds[seen], NETTING_POLICY)
     out = (
-        pd.DataFrame(rows, columns=["CAND_ID", "INDIVIDUAL_SUPPORT"])
-          .merge(cn_index, left_on="CAND_ID", right_index=True, how="left")
+        pd.DataFrame({"CAND_ID": cand_codes.decode(np.flatnonzero(seen)), **columns})
+          .assign(CAND_ELECTION_YR=lambda d: d["CAND_ID"].map(cand_year))
+          [["CAND_ID", "CAND_ELECTION_YR", *columns]]
           .sort_values("INDIVIDUAL_SUPPORT", ascending=False)
     )
+    # Committee-sampled runs estimate the full totals
+    out[list(columns)] *= sample.scale
 
     from config import SUFFIX
-    out_path = out_dir / f"{prefix}_individual_support_{SUFFIX}.csv"
-    write_csv_no_blank_line(out, out_path, index=False)
+    out_path = write_intermediate(out, out_dir, f"{prefix}_individual_support_{SUFFIX}")
     print(f"[individual_support][{prefix}] Wrote:", out_path)
 
+    share, by_state_long = _state_tables(by_state * sample.scale, seen, cand_codes, state_codes, cn)
+    share_path = out_dir / f"{prefix}_individual_in_state_share_{SUFFIX}.csv"
+    long_path = out_dir / f"{prefix}_individual_support_by_state_{SUFFIX}.csv"
+    write_csv_no_blank_line(share, share_path, index=False)
+    write_csv_no_blank_line(by_state_long, long_path, index=False)
+    home = share[share["IN_STATE_SUPPORT"].notna()]
+    in_state = (f"{100 * home['IN_STATE_SUPPORT'].sum() / home['INDIVIDUAL_SUPPORT'].sum():.1f}% of home-state "
+                f"candidates' individual support from in-state donors" if len(home) else "no home-state candidates")
+    print(f"[individual_support][{prefix}] Wrote: {share_path} ({in_state})")
+    print(f"[individual_support][{prefix}] Wrote: {long_path} ({len(by_state_long):,} candidate-state rows)")
+
+    if industry_coder is not None:
+        by_industry_long = rollup_table(by_industry * sample.scale, seen, cand_codes, cand_year)
+        industry_path = out_dir / f"{prefix}_individual_support_by_industry_{SUFFIX}.csv"
+        write_csv_no_blank_line(by_industry_long, industry_path, index=False)
+        st = industry_coder.stats(since=coder_start)
+        print(f"[individual_support][{prefix}] Wrote: {industry_path} ({len(by_industry_long):,} candidate-industry rows)")
+        print(f"[individual_support][{prefix}] Industry coding: {st['rows']:,} rows -> {st['lookups']:,} "
+              f"distinct-value lookups, cache hit rate {100 * st['hit_rate']:.1f}% ({st['cached']:,} cached, "
+              f"{st['evictions']:,} evicted) | {st['rows_per_sec']:,.0f} rows/s")
+
+    if screen is not None:
+        with screen:
+            st = screen.stats()
+            flags = screen.flagged(cand_codes)
+        flags_path = out_dir / f"{prefix}_donor_limit_flags_{SUFFIX}.csv"
+        write_csv_no_blank_line(flags, flags_path, index=False)
+        print(f"[individual_support][{prefix}] Wrote: {flags_path} ({len(flags):,} donor-candidate-election groups "
+              f"over ${DONOR_LIMIT:,}; {st['rows_in']:,} rows screened, {st['spill_mb']:,} MB spilled)")
+
+    if sketches is not None:
+        sk_path = sketch_path(out_dir, prefix, sketches.category, SUFFIX)
+        sketches.to_json(sk_path, office=prefix, cycle=SUFFIX)
+        print(f"[individual_support][{prefix}] Wrote:", sk_path)
+
+    if txn_index is not None:
+        ix_path = index_path(out_dir, prefix, "individual", SUFFIX)
+        n_lines = txn_index.save(ix_path)
+        print(f"[individual_support][{prefix}] Wrote: {ix_path} ({n_lines:,} indexed lines)")
+
+    rc_path = ledger_path(out_dir, prefix, "individual_support", SUFFIX)
+    recon.save(rc_path, {"INDIVIDUAL_SUPPORT": out["INDIVIDUAL_SUPPORT"].sum()})
+    print(f"[individual_support][{prefix}] Wrote:", rc_path)
+
+    return out
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,247 @@
+"""
+Industry rollup of individual contributions from the EMPLOYER / OCCUPATION text.
+
+itcont carries free-text EMPLOYER and OCCUPATION fields that the support
+steps used to parse and discard. ``individual_support`` now turns them into
+an industry code per row in its existing itcont pass and sums
+(candidate x industry) like the per-state breakdown.
+
+Normalizing tens of millions of free-text values one row at a time is the
+expensive part, and the values repeat heavily ("RETIRED", "SELF-EMPLOYED",
+large employers). So each chunk column is ``pd.factorize``d and only its
+unique values are normalized and classified. The results are memoized in
+an LRU cache bounded by ``INDUSTRY_CACHE_SIZE`` that lives for the whole
+process: all chunks and all three office runs share it. The rows then take
+their industry from a NumPy lookup table, so no Python code runs per row.
+
+Classification is keyword based:
+    1. the normalized value is matched exactly against STATUS_VALUES
+       (retired, not employed, not reported, self-employed);
+    2. otherwise the first INDUSTRY_RULES pattern found in it wins.
+A row's industry comes from its occupation when that is a status (retired,
+not employed), else from the employer, else from the occupation. What is
+still unmatched is "OTH".
+
+    python industry.py                       # print the industry code table
+    python industry.py "Google Inc." ENGINEER
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# Industry code table; positions index the (candidate x industry) accumulator
+INDUSTRIES = {
+    "RET": "Retired",
+    "NEMP": "Not employed",
+    "UNK": "Not reported",
+    "SELF": "Self-employed, industry not given",
+    "LAW": "Lawyers and law firms",
+    "HLTH": "Health",
+    "EDU": "Education",
+    "FIN": "Finance, insurance and real estate",
+    "TECH": "Technology and communications",
+    "GOV": "Government and military",
+    "CONS": "Construction and engineering",
+    "ENRG": "Energy and natural resources",
+    "AGR": "Agriculture",
+    "MEDIA": "Media and entertainment",
+    "TRANS": "Transportation",
+    "RETL": "Retail and consumer services",
+    "MFG": "Manufacturing",
+    "NPO": "Nonprofits and religion",
+    "OTH": "Other",
+}
+INDUSTRY_CODES = list(INDUSTRIES)
+_IDX = {code: k for k, code in enumerate(INDUSTRY_CODES)}
+NO_MATCH = -1
+
+# Whole normalized values that describe employment status rather than an industry
+STATUS_VALUES = {
+    "RETIRED": "RET",
+    "NONE": "NEMP", "NOT EMPLOYED": "NEMP", "UNEMPLOYED": "NEMP", "HOMEMAKER": "NEMP", "STUDENT": "NEMP",
+    "SELF": "SELF", "SELF EMPLOYED": "SELF", "SELFEMPLOYED": "SELF",
+    "": "UNK", "N A": "UNK", "NA": "UNK", "REFUSED": "UNK", "REQUESTED": "UNK", "INFORMATION REQUESTED": "UNK",
+    "INFORMATION REQUESTED PER BEST EFFORTS": "UNK",
+}
+
+# First match wins, so narrower industries come before broad words like SERVICES
+INDUSTRY_RULES = [
+    ("LAW", r"ATTORNEY|LAWYER|LAW|LEGAL|PARALEGAL|JUDGE|COUNSEL"),
+    ("HLTH", r"PHYSICIAN|DOCTOR|NURSE|HOSPITAL|HEALTH|MEDICAL|CLINIC|DENTIST|DENTAL|PHARMA\w*|PHARMACIST|"
+             r"SURGEON|THERAPIST|PSYCHOLOGIST|MD|RN"),
+    ("EDU", r"PROFESSOR|TEACHER|UNIVERSITY|COLLEGE|SCHOOL|EDUCATION|EDUCATOR|ACADEMY|PRINCIPAL"),
+    ("GOV", r"ARMY|NAVY|AIR FORCE|MARINES?|MILITARY|GOVERNMENT|STATE OF|CITY OF|COUNTY|FEDERAL|US DEPT|"
+            r"DEPARTMENT OF|POLICE|SHERIFF|FIREFIGHTER|PUBLIC SCHOOLS"),
+    ("FIN", r"BANK\w*|FINANCIAL|FINANCE|CAPITAL|INVEST\w*|INSURANCE|REAL ESTATE|REALTOR|MORTGAGE|"
+            r"ACCOUNTANT|CPA|ASSET MANAGEMENT|SECURITIES|HEDGE|EQUITY|TRADER|BROKER"),
+    ("TECH", r"GOOGLE|MICROSOFT|APPLE|AMAZON|FACEBOOK|META|ORACLE|IBM|INTEL|SOFTWARE|TECHNOLOGY|TECHNOLOGIES|"
+             r"TECH|COMPUTER|PROGRAMMER|DEVELOPER|DATA|INTERNET|TELECOM\w*|VERIZON|AT&T|COMCAST"),
+    ("CONS", r"ENGINEER\w*|CONSTRUCTION|CONTRACTOR|ARCHITECT|BUILDER|ELECTRICIAN|PLUMBER|CARPENTER"),
+    ("ENRG", r"OIL|GAS|ENERGY|PETROLEUM|EXXON\w*|CHEVRON|MINING|COAL|UTILITY|UTILITIES|ELECTRIC"),
+    ("AGR", r"FARM\w*|RANCH\w*|AGRICULTURE|AGRICULTURAL"),
+    ("MEDIA", r"MEDIA|NEWS|JOURNALIST|WRITER|AUTHOR|ACTOR|ACTRESS|MUSICIAN|ARTIST|ENTERTAINMENT|FILM|STUDIOS?|"
+              r"PRODUCER|PUBLISHING"),
+    ("TRANS", r"AIRLINES?|TRUCKING|PILOT|RAILROAD|LOGISTICS|SHIPPING|TRANSPORTATION"),
+    ("RETL", r"RETAIL|RESTAURANT|STORES?|WALMART|SALES|HOTEL"),
+    ("MFG", r"MANUFACTURING|MANUFACTURER|INDUSTRIES|BOEING|LOCKHEED|GENERAL ELECTRIC"),
+    ("NPO", r"CHURCH|MINISTRY|PASTOR|FOUNDATION|NONPROFIT|NON PROFIT|CHARITY"),
+]
+_RULES = [(_IDX[code], re.compile(rf"\b(?:{pattern})\b")) for code, pattern in INDUSTRY_RULES]
+
+_PUNCT = re.compile(r"[^A-Z0-9& ]+")
+_SUFFIXES = re.compile(r"\b(?:INC|INCORPORATED|LLC|LLP|LTD|CORP|CORPORATION|CO|COMPANY|PC|PLLC|THE)\b")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(value) -> str:
+    """Upper case, punctuation and legal-form suffixes removed, whitespace collapsed."""
+    text = _PUNCT.sub(" ", str(value).upper())
+    text = _SUFFIXES.sub(" ", text)
+    return _SPACE.sub(" ", text).strip()
+
+
+def classify(text: str) -> int:
+    """Industry index of a normalized value (NO_MATCH when no rule applies)."""
+    status = STATUS_VALUES.get(text)
+    if status is not None:
+        return _IDX[status]
+    for idx, pattern in _RULES:
+        if pattern.search(text):
+            return idx
+    return NO_MATCH
+
+
+def combine(employer: np.ndarray, occupation: np.ndarray) -> np.ndarray:
+    """Row industry from the employer and occupation indexes (see module docstring)."""
+    not_working = [_IDX["RET"], _IDX["NEMP"]]
+    fallback = not_working + [_IDX["UNK"], _IDX["SELF"], NO_MATCH]
+    unknown = [_IDX["UNK"], NO_MATCH]
+    return np.select(
+        [
+            np.isin(occupation, not_working),
+            np.isin(employer, not_working),
+            ~np.isin(employer, fallback),
+            ~np.isin(occupation, fallback),
+            (employer == _IDX["SELF"]) | (occupation == _IDX["SELF"]),
+            (employer == _IDX["UNK"]) & np.isin(occupation, unknown),
+        ],
+        [occupation, employer, employer, occupation, _IDX["SELF"], _IDX["UNK"]],
+        default=_IDX["OTH"],
+    ).astype(np.int8)
+
+
+class IndustryCoder:
+    """Industry index per itcont row, normalizing each distinct raw value once (bounded LRU cache)."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._cache = OrderedDict()   # (field, raw value) -> industry index
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rows = 0
+        self.seconds = 0.0
+
+    def _lookup(self, field: str, values) -> np.ndarray:
+        out = np.empty(len(values), dtype=np.int8)
+        cache = self._cache
+        for k, raw in enumerate(values):
+            key = (field, raw)
+            idx = cache.get(key)
+            if idx is None:
+                self.misses += 1
+                idx = classify(normalize(raw))
+                cache[key] = idx
+                if len(cache) > self.maxsize:
+                    cache.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self.hits += 1
+                cache.move_to_end(key)
+            out[k] = idx
+        return out
+
+    def _column(self, field: str, values: pd.Series) -> np.ndarray:
+        # Missing values factorize to -1, which reads the trailing "not reported" slot
+        codes, uniques = pd.factorize(values)
+        table = np.full(len(uniques) + 1, _IDX["UNK"], dtype=np.int8)
+        table[:-1] = self._lookup(field, uniques)
+        return table[codes]
+
+    def encode(self, employer: pd.Series, occupation: pd.Series) -> np.ndarray:
+        """Industry index (position in INDUSTRY_CODES) per row."""
+        t0 = time.perf_counter()
+        out = combine(self._column("EMPLOYER", employer), self._column("OCCUPATION", occupation))
+        self.seconds += time.perf_counter() - t0
+        self.rows += len(out)
+        return out
+
+    def stats(self, since: dict | None = None) -> dict:
+        """Counters, hit rate and rows/s; relative to an earlier ``stats()`` snapshot when given."""
+        counts = {"rows": self.rows, "hits": self.hits, "misses": self.misses, "seconds": self.seconds}
+        if since is not None:
+            counts = {k: v - since[k] for k, v in counts.items()}
+        lookups = counts["hits"] + counts["misses"]
+        return {
+            **counts,
+            "lookups": lookups,
+            "hit_rate": counts["hits"] / lookups if lookups else 0.0,
+            "rows_per_sec": counts["rows"] / counts["seconds"] if counts["seconds"] else 0.0,
+            "cached": len(self._cache),
+            "evictions": self.evictions,
+        }
+
+
+_SHARED = {}
+
+
+def shared_coder(maxsize: int) -> IndustryCoder:
+    """The process-wide coder, so later chunks and office runs start from a warm cache."""
+    if maxsize not in _SHARED:
+        _SHARED[maxsize] = IndustryCoder(maxsize)
+    return _SHARED[maxsize]
+
+
+def rollup_table(by_industry: np.ndarray, seen: np.ndarray, cand_codes, cand_year: pd.Series) -> pd.DataFrame:
+    """Long (candidate, industry) table from the (candidate code x industry) accumulator."""
+    cands = np.flatnonzero(seen)
+    ids = cand_codes.decode(cands)
+    rows = by_industry[cands]
+    c, ind = np.nonzero(rows)
+    codes = np.asarray(INDUSTRY_CODES, dtype=object)
+    return (
+        pd.DataFrame({
+            "CAND_ID": ids[c],
+            "CAND_ELECTION_YR": cand_year.reindex(ids).to_numpy()[c],
+            "INDUSTRY_CODE": codes[ind],
+            "INDUSTRY": [INDUSTRIES[code] for code in codes[ind]],
+            "INDIVIDUAL_SUPPORT": rows[c, ind].round(2),
+        })
+          .sort_values(["CAND_ID", "INDIVIDUAL_SUPPORT"], ascending=[True, False], kind="stable")
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Industry code table / classify one EMPLOYER and OCCUPATION.")
+    ap.add_argument("employer", nargs="?")
+    ap.add_argument("occupation", nargs="?", default="")
+    args = ap.parse_args()
+    if args.employer is None:
+        for code, label in INDUSTRIES.items():
+            print(f"{code:6s} {label}")
+        return
+    idx = IndustryCoder(16).encode(pd.Series([args.employer]), pd.Series([args.occupation]))[0]
+    print(f"{normalize(args.employer)!r} / {normalize(args.occupation)!r} -> "
+          f"{INDUSTRY_CODES[idx]} ({INDUSTRIES[INDUSTRY_CODES[idx]]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,8 @@
 
 import pandas as pd
 from pathlib import Path
-from config import TARGET_ELECTION_YR, write_csv_no_blank_line, get_output_dir, get_output_prefix
+from netting import NET_PREFIX, NET_TOTAL_SUPPORT_COL
+from config import TARGET_ELECTION_YR, TRANSFER_SUPPORT_COL, pac_support_cols, detail_support_cols, write_csv_variants, get_output_dir, get_output_prefix, find_intermediate, read_intermediate
 
 def _find_file(folder: Path, startswith: str) -> Path:
     for ext in ("*.txt", "*.dat"):
@@ -14,17 +15,20 @@ def _find_file(folder: Path, startswith: str) -> Path:
         raise FileNotFoundError(f"No data files found in {folder}")
     return max(cands, key=lambda p: p.stat().st_size)
 
-def _safe_read_csv(path: Path, cols: list, dtypes=None) -> pd.DataFrame:
+def _safe_read_support(path, cols: list, dtypes=None) -> pd.DataFrame:
     """
-    Read a CSV if it exists; otherwise return empty DF with requested cols.
+    Read a support intermediate (Parquet/Feather, or legacy CSV) if it exists;
+    otherwise return empty DF with requested cols.
     Ensures requested cols exist (fills missing numeric cols with 0).
     """
-    if not path.exists():
+    if path is None or not path.exists():
         print(f"[merge_support][WARN] Missing file: {path} (using zeros)")
         return pd.DataFrame(columns=cols)
 
-    df = pd.read_csv(path, dtype=dtypes)
+    df = read_intermediate(path, dtypes=dtypes)
+    return _ensure_cols(df, cols)
 
+def _ensure_cols(df: pd.DataFrame, cols: list) -> pd.DataFrame:
     for c in cols:
         if c not in df.columns:
             # Default missing numeric cols to 0; missing keys to NaN
@@ -59,11 +63,13 @@ def _collapse_support(df: pd.DataFrame, name: str, key_cols: list, sum_cols: lis
         if k not in df.columns:
             df[k] = pd.NA
 
-    # coerce numeric cols
+    # coerce numeric cols (typed intermediates are already float)
     for c in sum_cols:
         if c not in df.columns:
             df[c] = 0.0
-        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0.0)
+        if not pd.api.types.is_float_dtype(df[c]):
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+        df[c] = df[c].fillna(0.0)
 
     dup_mask = df.duplicated(key_cols, keep=False)
     if dup_mask.any():
@@ -83,14 +89,19 @@ def _collapse_support(df: pd.DataFrame, name: str, key_cols: list, sum_cols: lis
 
     return collapsed
 
-def main(office_filter=None):
+def main(office_filter=None, frames=None):
     """
     Merge support files for a specific office type.
     
     Args:
         office_filter: Set of office codes to include (e.g., {'S'}, {'P'}, or {'S', 'P'})
+        frames: Optional in-memory intermediates from the support steps, keyed
+            'superpac', 'indiv', 'pac' and 'transfer'; anything missing is read from disk.
+
+    Returns:
+        Dict of the output tables: 'final', 'no_support' and 'all'.
     """
-    from config import CN_DIR, CN_COLS, SUFFIX, VALID_OFFICES
+    from config import CN_DIR, CN_COLS, SUFFIX, VALID_OFFICES, SAMPLE, NETTING_POLICY
     
     # Use provided office_filter or default to all valid offices
     if office_filter is None:
@@ -101,18 +112,26 @@ def main(office_filter=None):
     out_dir = get_output_dir(office_filter)
     prefix = get_output_prefix(office_filter)
     
+    frames = frames or {}
+
     # Inputs - now using office-specific prefixes
-    superpac_path = out_dir / f"{prefix}_superpac_ie_support_{SUFFIX}.csv"
-    indiv_path = out_dir / f"{prefix}_individual_support_{SUFFIX}.csv"
-    pac_path = out_dir / f"{prefix}_pac_support_corp_nonconnected_{SUFFIX}.csv"
+    support_names = {
+        "superpac": f"{prefix}_superpac_ie_support_{SUFFIX}",
+        "indiv": f"{prefix}_individual_support_{SUFFIX}",
+        "pac": f"{prefix}_pac_support_corp_nonconnected_{SUFFIX}",
+        "transfer": f"{prefix}_transfer_support_{SUFFIX}",
+    }
+    support_paths = {
+        key: None if key in frames else find_intermediate(out_dir, name)
+        for key, name in support_names.items()
+    }
 
     cn_path = _find_file(CN_DIR, "cn")
 
     print(f"[merge_support][{prefix}] Reading:")
     print("  cn:", cn_path)
-    print("  superpac:", superpac_path)
-    print("  indiv:", indiv_path)
-    print("  pac:", pac_path)
+    for key, name in support_names.items():
+        print(f"  {key}:", "(in memory)" if key in frames else (support_paths[key] or out_dir / name))
 
     # ---------------------------
     # Load candidate master (authoritative universe)
@@ -134,6 +153,11 @@ def main(office_filter=None):
     cn = cn[cn["CAND_ELECTION_YR"] == TARGET_ELECTION_YR].copy()
     print(f"[merge_support][{prefix}] Candidate master: {before_yr:,} rows -> {len(cn):,} after election-year filter == {TARGET_ELECTION_YR}")
 
+    # Partial development runs only cover the selected candidates
+    if SAMPLE is not None and SAMPLE.active:
+        cn = SAMPLE.restrict_candidates(cn).copy()
+        print(f"[merge_support][{prefix}] PARTIAL RUN {SAMPLE.to_dict()}: {len(cn):,} rows selected")
+
     # Diagnostics: candidate IDs spanning multiple election years
     multi_year = cn.groupby("CAND_ID")["CAND_ELECTION_YR"].nunique(dropna=True)
     n_multi = int((multi_year > 1).sum())
@@ -192,21 +216,29 @@ def main(office_filter=None):
     # Read support files (prefer candidate-year merges if available)
     # ---------------------------
     # Try reading with CAND_ELECTION_YR; if not present, will be NA and we fall back to ID-only merge.
-    superpac = _safe_read_csv(
-        superpac_path,
-        cols=["CAND_ID", "CAND_ELECTION_YR", "SUPERPAC_IE_SUPPORT"],
-        dtypes={"CAND_ID": str}
-    )
-    indiv = _safe_read_csv(
-        indiv_path,
-        cols=["CAND_ID", "CAND_ELECTION_YR", "INDIVIDUAL_SUPPORT"],
-        dtypes={"CAND_ID": str}
-    )
-    pac = _safe_read_csv(
-        pac_path,
-        cols=["CAND_ID", "CAND_ELECTION_YR", "CORP_PAC_SUPPORT", "NONCONNECTED_PAC_SUPPORT"],
-        dtypes={"CAND_ID": str}
-    )
+    # Detail columns (outside TOTAL_SUPPORT) read as 0 from older intermediates
+    detail_cols = detail_support_cols()
+    pac_cols = pac_support_cols()
+    # NETTING_POLICY "both": the TOTAL_SUPPORT components also come net of refunds (NET_ columns)
+    net = (lambda cols: [NET_PREFIX + c for c in cols]) if NETTING_POLICY == "both" else (lambda cols: [])
+    input_cols = {
+        "superpac": ["CAND_ID", "CAND_ELECTION_YR", "SUPERPAC_IE_SUPPORT"] + net(["SUPERPAC_IE_SUPPORT"]),
+        "indiv": ["CAND_ID", "CAND_ELECTION_YR", "INDIVIDUAL_SUPPORT"] + net(["INDIVIDUAL_SUPPORT"]),
+        "pac": ["CAND_ID", "CAND_ELECTION_YR"] + pac_cols + net(["CORP_PAC_SUPPORT", "NONCONNECTED_PAC_SUPPORT"]),
+        "transfer": ["CAND_ID", "CAND_ELECTION_YR", TRANSFER_SUPPORT_COL],
+    }
+    loaded = {}
+    needs_parsing = {}
+    for key, cols in input_cols.items():
+        if key in frames:
+            loaded[key] = _ensure_cols(frames[key].copy(), cols)
+            needs_parsing[key] = False
+        else:
+            path = support_paths[key]
+            loaded[key] = _safe_read_support(path, cols, dtypes={"CAND_ID": str})
+            # Only legacy CSV intermediates carry untyped strings
+            needs_parsing[key] = path is not None and path.suffix == ".csv"
+    superpac, indiv, pac, transfer = loaded["superpac"], loaded["indiv"], loaded["pac"], loaded["transfer"]
 
     # Collapse duplicates in support files so merges never discard values
     key_cols = ["CAND_ID", "CAND_ELECTION_YR"]
@@ -214,32 +246,40 @@ def main(office_filter=None):
     superpac = _collapse_support(
         superpac, f"{prefix}_superpac",
         key_cols=key_cols,
-        sum_cols=["SUPERPAC_IE_SUPPORT"]
+        sum_cols=input_cols["superpac"][2:]
     )
 
     indiv = _collapse_support(
         indiv, f"{prefix}_indiv",
         key_cols=key_cols,
-        sum_cols=["INDIVIDUAL_SUPPORT"]
+        sum_cols=input_cols["indiv"][2:]
     )
 
     pac = _collapse_support(
         pac, f"{prefix}_pac",
         key_cols=key_cols,
-        sum_cols=["CORP_PAC_SUPPORT", "NONCONNECTED_PAC_SUPPORT"]
+        sum_cols=input_cols["pac"][2:]
     )
 
-    # Normalize years if present
-    for df_name, df in [(f"{prefix}_superpac", superpac), (f"{prefix}_indiv", indiv), (f"{prefix}_pac", pac)]:
-        if "CAND_ELECTION_YR" in df.columns:
+    transfer = _collapse_support(
+        transfer, f"{prefix}_transfer",
+        key_cols=key_cols,
+        sum_cols=[TRANSFER_SUPPORT_COL]
+    )
+
+    # Normalize years if present (typed intermediates already hold 4-digit strings)
+    for key, df in [("superpac", superpac), ("indiv", indiv), ("pac", pac), ("transfer", transfer)]:
+        if "CAND_ELECTION_YR" in df.columns and needs_parsing[key]:
             df["CAND_ELECTION_YR"] = _coerce_year(df["CAND_ELECTION_YR"])
 
     # Determine merge strategy
     has_year_superpac = superpac["CAND_ELECTION_YR"].notna().any()
     has_year_indiv = indiv["CAND_ELECTION_YR"].notna().any()
     has_year_pac = pac["CAND_ELECTION_YR"].notna().any()
+    # An empty transfer table (no itoth file) does not force the ID-only fallback
+    has_year_transfer = transfer.empty or transfer["CAND_ELECTION_YR"].notna().any()
 
-    use_year_merge = bool(has_year_superpac and has_year_indiv and has_year_pac)
+    use_year_merge = bool(has_year_superpac and has_year_indiv and has_year_pac and has_year_transfer)
 
     if use_year_merge:
         print(f"[merge_support][{prefix}] Merge strategy: using keys (CAND_ID, CAND_ELECTION_YR) for all support files.")
@@ -248,6 +288,7 @@ def main(office_filter=None):
             .merge(indiv, on=["CAND_ID", "CAND_ELECTION_YR"], how="left")
             .merge(pac, on=["CAND_ID", "CAND_ELECTION_YR"], how="left")
             .merge(superpac, on=["CAND_ID", "CAND_ELECTION_YR"], how="left")
+            .merge(transfer, on=["CAND_ID", "CAND_ELECTION_YR"], how="left")
         )
     else:
         print(f"[merge_support][{prefix}][WARN] One or more support files missing CAND_ELECTION_YR; falling back to CAND_ID-only merge.")
@@ -257,6 +298,7 @@ def main(office_filter=None):
             .merge(indiv.drop(columns=["CAND_ELECTION_YR"], errors="ignore"), on="CAND_ID", how="left")
             .merge(pac.drop(columns=["CAND_ELECTION_YR"], errors="ignore"), on="CAND_ID", how="left")
             .merge(superpac.drop(columns=["CAND_ELECTION_YR"], errors="ignore"), on="CAND_ID", how="left")
+            .merge(transfer.drop(columns=["CAND_ELECTION_YR"], errors="ignore"), on="CAND_ID", how="left")
         )
 
     # ---------------------------
@@ -268,13 +310,22 @@ def main(office_filter=None):
         "NONCONNECTED_PAC_SUPPORT",
         "SUPERPAC_IE_SUPPORT",
     ]
-    for col in support_cols:
+    net_cols = net(support_cols)
+    for col in support_cols + detail_cols + net_cols:
         if col not in merged.columns:
             merged[col] = 0.0
-        merged[col] = pd.to_numeric(merged[col], errors="coerce").fillna(0.0)
+        if not pd.api.types.is_float_dtype(merged[col]):
+            merged[col] = pd.to_numeric(merged[col], errors="coerce")
+        # Amounts are in cents; rounding drops float noise so every engine writes the same digits
+        merged[col] = merged[col].fillna(0.0).round(2)
 
-    merged["TOTAL_SUPPORT"] = merged[support_cols].sum(axis=1)
+    merged["TOTAL_SUPPORT"] = merged[support_cols].sum(axis=1).round(2)
     merged["HAS_MONEY"] = (merged["TOTAL_SUPPORT"] > 0).astype(int)
+    if net_cols:
+        merged[NET_TOTAL_SUPPORT_COL] = merged[net_cols].sum(axis=1).round(2)
+        net_cols = net_cols + [NET_TOTAL_SUPPORT_COL]
+    # Detail and net columns go last so the established column positions do not move
+    merged = merged[list(cn_labels.columns) + support_cols + ["TOTAL_SUPPORT", "HAS_MONEY"] + detail_cols + net_cols]
 
     # ---------------------------
     # Post-merge diagnostics
@@ -299,6 +350,8 @@ def main(office_filter=None):
     print(f"  Candidates with zero : {int((merged['HAS_MONEY'] == 0).sum()):,}")
     print(f"  Total candidates     : {len(merged):,}")
     print(f"  Total $ support      : {merged['TOTAL_SUPPORT'].sum():,.2f}")
+    if NET_TOTAL_SUPPORT_COL in merged.columns:
+        print(f"  Net of refunds       : {merged[NET_TOTAL_SUPPORT_COL].sum():,.2f}")
 
     # ---------------------------
     # Sorting + outputs
@@ -312,17 +365,28 @@ def main(office_filter=None):
     out_no_money = out_dir / f"{prefix}_candidates_no_support_{SUFFIX}.csv"
     out_all_flag = out_dir / f"{prefix}_candidates_all_with_flag_{SUFFIX}.csv"
 
-    write_csv_no_blank_line(with_money, out_with_money, index=False)
-    write_csv_no_blank_line(no_money, out_no_money, index=False)
-    write_csv_no_blank_line(merged_sorted, out_all_flag, index=False)
+    has_money = (merged_sorted["HAS_MONEY"] == 1).to_numpy()
+    write_csv_variants(
+        merged_sorted,
+        {out_with_money: has_money, out_no_money: ~has_money, out_all_flag: None},
+        index=False,
+    )
 
     print(f"[merge_support][{prefix}] Wrote:")
     print("  ", out_with_money)
     print("  ", out_no_money)
     print("  ", out_all_flag)
 
+    # Typed columnar copy for standalone validation (final/no_support are HAS_MONEY slices of it)
+    from config import INTERMEDIATE_FORMAT, write_intermediate
+    if INTERMEDIATE_FORMAT != "csv":
+        typed_path = write_intermediate(merged_sorted, out_dir, out_all_flag.stem)
+        print("  ", typed_path)
+
     print(f"\n[merge_support][{prefix}] Preview (top 25 with money):")
     print(with_money.head(25).to_string(index=False))
 
+    return {"final": with_money, "no_support": no_money, "all": merged_sorted}
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,55 @@
+"""
+Refunds and negative corrections in the streaming support steps.
+
+The bulk files report refunds, redesignations and corrections as negative
+TRANSACTION_AMT rows. The support steps used to drop every amount <= 0,
+which overstates the totals. Under ``NETTING_POLICY`` (config.py) the
+negative rows are kept and summed into a second, signed accumulator next
+to the gross one, in the same chunk loop:
+
+- "gross": amounts <= 0 are dropped (the established outputs)
+- "net":   the support columns hold gross + refunds
+- "both":  the support columns stay gross; ``NET_<column>`` holds gross + refunds
+
+Breakdowns taken from the same rows (per state, per industry, amount
+sketches, transaction indexes, donor screening) follow the support columns:
+they see the negative rows only under "net". Zero and missing amounts are
+always dropped.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+NETTING_POLICIES = ("gross", "net", "both")
+NET_PREFIX = "NET_"
+NET_TOTAL_SUPPORT_COL = NET_PREFIX + "TOTAL_SUPPORT"
+
+
+def amount_mask(amt: pd.Series, policy: str) -> pd.Series:
+    """Rows a support step counts: positive amounts, plus negative ones unless the policy is gross."""
+    if policy == "gross":
+        return amt.notna() & (amt > 0)
+    return amt.notna() & (amt != 0)
+
+
+def split_signed(amounts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(gross, refunds) bincount weights: the positive and the negative amounts, 0 elsewhere."""
+    neg = amounts < 0
+    return np.where(neg, 0.0, amounts), np.where(neg, amounts, 0.0)
+
+
+def netted_columns(column: str, gross, refunds, policy: str) -> dict:
+    """Output column(s) for one support column from its gross and refund accumulators."""
+    if policy == "gross":
+        return {column: gross}
+    if policy == "net":
+        return {column: gross + refunds}
+    return {column: gross, NET_PREFIX + column: gross + refunds}
+
+
+def side_mask(amounts: np.ndarray, policy: str) -> np.ndarray | None:
+    """Rows the breakdowns should see (None = all): the positive ones unless the support columns are net."""
+    return amounts > 0 if policy == "both" else None
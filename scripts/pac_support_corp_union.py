@@ -1,8 +1,17 @@
 ## 03
 
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from config import TARGET_ELECTION_YR, write_csv_no_blank_line, get_output_dir, get_output_prefix
+from config import (TARGET_ELECTION_YR, PAC_ORG_TYPES, LEADERSHIP_PAC_COL, PARTY_SUPPORT_COL, PARTY_CMTE_TYPES,
+                    PARTY_TRANSACTION_TYPES, write_intermediate, get_output_dir, get_output_prefix)
+from amount_sketches import SketchSet, sketch_path
+from stream_reader import LINE_LEN_COL
+from txn_index import TxnIndexBuilder, index_path
+from reconciliation import ReconLedger, ledger_path, AMT_COL
+from netting import amount_mask, split_signed, netted_columns, side_mask
+from id_codes import IdCodes
+from sampling import Sample
 
 def _find_file(folder: Path, startswith: str) -> Path:
     for ext in ("*.txt", "*.dat"):
@@ -16,14 +25,22 @@ def _find_file(folder: Path, startswith: str) -> Path:
 
 def main(office_filter=None, cfg=None):
     """
-    Generate PAC support data (corporate and nonconnected).
+    Generate PAC support data, one column per connected-organization type
+    (corporate and nonconnected feed TOTAL_SUPPORT; labor, membership,
+    trade, cooperative and corporation-without-stock are reported beside it).
+    Party committee support (coordinated expenditures, contributions, IEs)
+    is summed in the same itpas2 pass into PARTY_SUPPORT.
     
     Args:
         office_filter: Set of office codes to include (e.g., {'S'}, {'P'}, or {'S', 'P'})
         cfg: Optional config dict (for testing/flexibility)
+
+    Returns:
+        The typed intermediate (CAND_ID, CAND_ELECTION_YR, support columns),
+        so merge_support can take it in memory when run in the same process.
     """
     if cfg is None:
-        from config import CM_DIR, CN_DIR, PAS2_DIR, CM_COLS, CN_COLS, ITPAS2_COLS, SUFFIX, VALID_OFFICES, CHUNKSIZE
+        from config import CM_DIR, CN_DIR, PAS2_DIR, CM_COLS, CN_COLS, ITPAS2_COLS, SUFFIX, VALID_OFFICES, CHUNKSIZE, BUILD_AMOUNT_SKETCHES, BUILD_TXN_INDEX, SAMPLE, SPLIT_LEADERSHIP_PACS, NETTING_POLICY
     else:
         CM_DIR = cfg['CM_DIR']
         CN_DIR = cfg['CN_DIR']
@@ -34,6 +51,12 @@ def main(office_filter=None, cfg=None):
         SUFFIX = cfg['SUFFIX']
         VALID_OFFICES = cfg['VALID_OFFICES']
         CHUNKSIZE = cfg['CHUNKSIZE']
+        BUILD_AMOUNT_SKETCHES = cfg.get('BUILD_AMOUNT_SKETCHES', True)
+        BUILD_TXN_INDEX = cfg.get('BUILD_TXN_INDEX', True)
+        SAMPLE = cfg.get('SAMPLE')
+        SPLIT_LEADERSHIP_PACS = cfg.get('SPLIT_LEADERSHIP_PACS', False)
+        NETTING_POLICY = cfg.get('NETTING_POLICY', "gross")
+    sample = SAMPLE or Sample()
     
     # Use provided office_filter or default to all valid offices
     if office_filter is None:
@@ -56,12 +79,27 @@ def main(office_filter=None, cfg=None):
 
     # Keep only PAC committees (qualified/nonqualified)
     pac_ids = set(cm.loc[cm["CMTE_TP"].isin(["Q", "N"]), "CMTE_ID"].dropna().unique())
-    org_type = cm.set_index("CMTE_ID")["ORG_TP"].to_dict()
-    print(f"[pac_support][{prefix}] PAC committees (CMTE_TP in Q/N): {len(pac_ids):,}")
+    # Party committees (a committee also listed as a PAC counts as a PAC)
+    party_ids = set(cm.loc[cm["CMTE_TP"].isin(PARTY_CMTE_TYPES), "CMTE_ID"].dropna().unique()) - pac_ids
+    # ORG_TP -> position in PAC_ORG_TYPES (-1: type not reported)
+    org_types = list(PAC_ORG_TYPES)
+    pac_cols = list(PAC_ORG_TYPES.values())
+    org_type = cm.set_index("CMTE_ID")["ORG_TP"].map({t: k for k, t in enumerate(org_types)}).fillna(-1).to_dict()
+    leadership_ids = set(cm.loc[cm["CMTE_DSGN"] == "D", "CMTE_ID"].dropna().unique())
+    print(f"[pac_support][{prefix}] PAC committees (CMTE_TP in Q/N): {len(pac_ids):,} | "
+          f"party committees (CMTE_TP in {'/'.join(PARTY_CMTE_TYPES)}): {len(party_ids):,}")
 
     print(f"[pac_support][{prefix}] Loading candidate master:", cn_path)
 
     cn = pd.read_csv(cn_path, sep="|", header=None, names=CN_COLS, dtype=str, encoding_errors="ignore")
+    # Dense codes: chunks are hashed once, every later test is an array lookup
+    cmte_codes = IdCodes(cm["CMTE_ID"])
+    cand_codes = IdCodes(cn["CAND_ID"])
+    is_pac = cmte_codes.mask(pac_ids)
+    is_party = cmte_codes.mask(party_ids)
+    org_of_cmte = cmte_codes.lookup(org_type, fill=-1, dtype=np.int8)
+    is_leadership = cmte_codes.mask(leadership_ids)
+    in_sample = sample.cmte_table(cmte_codes)
     
     # Filter to specified offices
     cn = cn[cn["CAND_OFFICE"].isin(office_filter)].copy()
@@ -71,82 +109,147 @@ def main(office_filter=None, cfg=None):
     before = len(cn)
     cn = cn[cn["CAND_ELECTION_YR"] == TARGET_ELECTION_YR].copy()
     print(f"[pac_support][{prefix}] After year filter {TARGET_ELECTION_YR}: {before:,} -> {len(cn):,}")
-
-    valid_cand_ids = set(cn["CAND_ID"].dropna().unique())
-    cn_index = cn.set_index("CAND_ID")
-
-    corp_totals = {}
-    nonconn_totals = {}
+    if sample.active:
+        cn = sample.restrict_candidates(cn)
+        print(f"[pac_support][{prefix}] PARTIAL RUN {sample.to_dict()}: {len(cn):,} candidates selected")
+
+    is_valid_cand = cand_codes.mask(cn["CAND_ID"].dropna())
+    cand_year = cn.drop_duplicates("CAND_ID").set_index("CAND_ID")["CAND_ELECTION_YR"]
+
+    # (candidate x ORG_TP) totals, filled by one bincount over cand_code * n_types + type per chunk;
+    # the last type slot holds party committees
+    n_types = len(org_types) + 1
+    party_slot = n_types - 1
+    totals_cols = pac_cols + [PARTY_SUPPORT_COL]
+    totals = np.zeros((len(cand_codes), n_types))
+    refunds = np.zeros((len(cand_codes), n_types))   # negative amounts; stays 0 under the gross policy
+    seen = np.zeros(len(cand_codes), dtype=bool)
+    leadership_totals = np.zeros(len(cand_codes)) if SPLIT_LEADERSHIP_PACS else None
+    leadership_refunds = np.zeros(len(cand_codes)) if SPLIT_LEADERSHIP_PACS else None
+    corp_sketches = SketchSet("corp_pac") if BUILD_AMOUNT_SKETCHES else None
+    nonconn_sketches = SketchSet("nonconnected_pac") if BUILD_AMOUNT_SKETCHES else None
 
     print(f"[pac_support][{prefix}] Streaming itpas2:", itpas2_path)
-    reader = pd.read_csv(
-        itpas2_path, sep="|", header=None, names=ITPAS2_COLS,
-        dtype=str, chunksize=CHUNKSIZE, encoding_errors="ignore",
-        on_bad_lines="skip"
-    )
+    txn_index = TxnIndexBuilder(itpas2_path) if BUILD_TXN_INDEX else None
+    recon = ReconLedger("pac_support", itpas2_path, scale=sample.scale, netting=NETTING_POLICY)
+    reader = sample.iter_chunks(itpas2_path, ITPAS2_COLS, CHUNKSIZE, "pac", cand_ids=cn["CAND_ID"].dropna(),
+                                with_offsets=txn_index is not None, stats=recon.reader_stats)
 
     for i, chunk in enumerate(reader, start=1):
-        # Only PAC committees
-        chunk = chunk[chunk["CMTE_ID"].isin(pac_ids)]
+        chunk = recon.start(chunk)
+        # Only PAC and party committees
+        chunk = chunk.assign(CMTE_CODE=cmte_codes.encode(chunk["CMTE_ID"]))
+        if sample.cmte_fraction:
+            chunk = recon.keep(chunk, in_sample[chunk["CMTE_CODE"].to_numpy()], "sample")
+        codes = chunk["CMTE_CODE"].to_numpy()
+        chunk = recon.keep(chunk, is_pac[codes] | is_party[codes], "committee_type")
         if chunk.empty:
             continue
 
-        # Exclude independent expenditures
-        chunk = chunk[~chunk["TRANSACTION_TP"].isin(["24E", "24A"])]
+        # PACs: exclude independent expenditures; parties: coordinated, contributions and IEs
+        party = is_party[chunk["CMTE_CODE"].to_numpy()]
+        tp = chunk["TRANSACTION_TP"]
+        wanted = np.where(party, tp.isin(PARTY_TRANSACTION_TYPES), ~tp.isin(["24E", "24A"]))
+        chunk = recon.keep(chunk, wanted, "transaction_type")
         if chunk.empty:
             continue
 
         # Filter to valid candidates for this office type
-        chunk = chunk[chunk["CAND_ID"].isin(valid_cand_ids)]
+        chunk = chunk.assign(CAND_CODE=cand_codes.encode(chunk["CAND_ID"]))
+        chunk = recon.keep(chunk, chunk["CAND_CODE"].to_numpy() >= 0, "unmapped_candidate")
+        chunk = recon.keep(chunk, is_valid_cand[chunk["CAND_CODE"].to_numpy()], "office_year")
         if chunk.empty:
             continue
 
-        chunk = chunk.copy()
-        chunk["ORG_TP"] = chunk["CMTE_ID"].map(org_type).fillna("")
-
-        amt = pd.to_numeric(chunk["TRANSACTION_AMT"], errors="coerce")
-        mask = amt.notna() & (amt > 0)
-        if not mask.any():
+        amt = chunk[AMT_COL]
+        chunk = recon.keep(chunk, amount_mask(amt, NETTING_POLICY), "non_positive_amount")
+        if chunk.empty:
             continue
 
-        chunk = chunk.loc[mask]
-        chunk["AMT"] = amt.loc[mask]
-
-        # Corporate-connected PACs
-        corp = chunk[chunk["ORG_TP"] == "C"]
-        if not corp.empty:
-            grp = corp["AMT"].groupby(corp["CAND_ID"]).sum()
-            for cand_id, val in grp.items():
-                corp_totals[cand_id] = corp_totals.get(cand_id, 0.0) + float(val)
-
-        # Nonconnected PACs
-        nonconn = chunk[chunk["ORG_TP"] == ""]
-        if not nonconn.empty:
-            grp = nonconn["AMT"].groupby(nonconn["CAND_ID"]).sum()
-            for cand_id, val in grp.items():
-                nonconn_totals[cand_id] = nonconn_totals.get(cand_id, 0.0) + float(val)
+        # ORG_TP values outside PAC_ORG_TYPES (unknown codes) are not reported; parties have their own slot
+        party = is_party[chunk["CMTE_CODE"].to_numpy()]
+        org = np.where(party, party_slot, org_of_cmte[chunk["CMTE_CODE"].to_numpy()])
+        chunk = recon.keep(chunk, org >= 0, "org_type")
+        if chunk.empty:
+            continue
+        org = org[org >= 0]
+        chunk = chunk.assign(AMT=chunk[AMT_COL])
+
+        cand = chunk["CAND_CODE"].to_numpy()
+        amounts = chunk["AMT"].to_numpy()
+        gross, negative = split_signed(amounts)
+        slot = cand.astype(np.int64) * n_types + org
+        totals += np.bincount(slot, weights=gross, minlength=totals.size).reshape(totals.shape)
+        if NETTING_POLICY != "gross":
+            refunds += np.bincount(slot, weights=negative, minlength=refunds.size).reshape(refunds.shape)
+        seen[cand] = True
+        neg = amounts < 0
+        for rows, column_of in ((~neg, lambda col: col), (neg, recon.refund_column)):
+            type_rows = np.bincount(org[rows], minlength=n_types)
+            type_dollars = np.bincount(org[rows], weights=amounts[rows], minlength=n_types)
+            for k in np.flatnonzero(type_rows):
+                recon.count_kept_totals(column_of(totals_cols[k]), type_rows[k], type_dollars[k])
+        if leadership_totals is not None:
+            lead = is_leadership[chunk["CMTE_CODE"].to_numpy()] & (org != party_slot)
+            leadership_totals += np.bincount(cand[lead], weights=gross[lead], minlength=len(leadership_totals))
+            leadership_refunds += np.bincount(cand[lead], weights=negative[lead], minlength=len(leadership_refunds))
+
+        side = side_mask(amounts, NETTING_POLICY)
+        if side is not None:
+            chunk, org = chunk[side], org[side]
+
+        if corp_sketches is not None:
+            corp = org == org_types.index("C")
+            corp_sketches.update(chunk["CAND_ID"][corp], chunk["AMT"][corp])
+            nonconn = org == org_types.index("")
+            nonconn_sketches.update(chunk["CAND_ID"][nonconn], chunk["AMT"][nonconn])
+
+        if txn_index is not None:
+            txn_index.add(chunk["CAND_ID"], chunk.index, chunk[LINE_LEN_COL])
 
         if i % 5 == 0:
             print(
                 f"[pac_support][{prefix}] chunks: {i:,} | "
-                f"corp cands: {len(corp_totals):,} | nonconn cands: {len(nonconn_totals):,}"
+                f"PAC cands: {int(seen.sum()):,}"
             )
 
-    all_cands = sorted(set(corp_totals) | set(nonconn_totals))
+    columns = {}
+    for k, col in enumerate(totals_cols):
+        columns.update(netted_columns(col, totals[seen, k], refunds[seen, k], NETTING_POLICY))
+    if leadership_totals is not None:
+        columns.update(netted_columns(LEADERSHIP_PAC_COL, leadership_totals[seen], leadership_refunds[seen],
+                                      NETTING_POLICY))
+    pac_cols = list(columns)
     out = (
-        pd.DataFrame({"CAND_ID": all_cands}, columns=["CAND_ID"])
-          .assign(
-              CORP_PAC_SUPPORT=lambda d: d["CAND_ID"].map(corp_totals).fillna(0.0),
-              NONCONNECTED_PAC_SUPPORT=lambda d: d["CAND_ID"].map(nonconn_totals).fillna(0.0),
-          )
-          .merge(cn_index, left_on="CAND_ID", right_index=True, how="left")
+        pd.DataFrame({"CAND_ID": cand_codes.decode(np.flatnonzero(seen)), **columns})
+          .assign(CAND_ELECTION_YR=lambda d: d["CAND_ID"].map(cand_year))
+          [["CAND_ID", "CAND_ELECTION_YR"] + pac_cols]
           .sort_values(["CORP_PAC_SUPPORT", "NONCONNECTED_PAC_SUPPORT"], ascending=False)
     )
+    # Committee-sampled runs estimate the full totals
+    out[pac_cols] *= sample.scale
 
     from config import SUFFIX
-    out_path = out_dir / f"{prefix}_pac_support_corp_nonconnected_{SUFFIX}.csv"
-    write_csv_no_blank_line(out, out_path, index=False)
+    out_path = write_intermediate(out, out_dir, f"{prefix}_pac_support_corp_nonconnected_{SUFFIX}")
     print(f"[pac_support][{prefix}] Wrote:", out_path)
 
+    for sketches in (corp_sketches, nonconn_sketches):
+        if sketches is not None:
+            sk_path = sketch_path(out_dir, prefix, sketches.category, SUFFIX)
+            sketches.to_json(sk_path, office=prefix, cycle=SUFFIX)
+            print(f"[pac_support][{prefix}] Wrote:", sk_path)
+
+    if txn_index is not None:
+        ix_path = index_path(out_dir, prefix, "pac", SUFFIX)
+        n_lines = txn_index.save(ix_path)
+        print(f"[pac_support][{prefix}] Wrote: {ix_path} ({n_lines:,} indexed lines)")
+
+    rc_path = ledger_path(out_dir, prefix, "pac_support", SUFFIX)
+    # Leadership PACs overlap the ORG_TP columns, so they are not part of the ledger balance
+    recon.save(rc_path, {col: out[col].sum() for col in totals_cols})
+    print(f"[pac_support][{prefix}] Wrote:", rc_path)
+
+    return out
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,294 @@
+"""
+Dry-run planner: what a run would read, how long it should take, what is current.
+
+Without reading the full files it resolves every step input with
+``_find_file``, samples the first MB of each to get bytes/row and an
+estimated row count, and estimates each step's time and peak memory from
+``outputs/bench_history.jsonl`` (per-step records written by run_all, engine
+records written by bench_engines). It also lists:
+
+- steps whose outputs are current: intermediate present and its
+  reconciliation ledger recorded the current size/mtime of the bulk file,
+  with cm/cn/ccl not modified since, and made under the configured netting
+  policy (ledger) and allocation rule (run manifest)
+- bulk files an incremental refresh would skip (unchanged since the last one)
+
+Usage:
+    python run_all.py --plan
+    python plan.py --engine sql --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+from pathlib import Path
+
+HISTORY_NAME = "bench_history.jsonl"
+_SAMPLE_BYTES = 1 << 20
+
+# step -> (bulk input, dimension inputs); bulk sizes drive the time estimates
+STEP_INPUTS = {
+    "superpac_ie_support": ("itpas2", ["cm", "cn"]),
+    "individual_support": ("itcont", ["ccl", "cn"]),
+    "pac_support_corp_union": ("itpas2", ["cm", "cn"]),
+    "transfer_support": ("itoth", ["cm", "cn", "ccl"]),
+    "merge_support": ("cn", []),
+    "sql_engine": ("itcont+itpas2", ["cm", "cn", "ccl"]),
+    "polars_engine": ("itcont+itpas2", ["cm", "cn", "ccl"]),
+}
+ENGINE_STEPS = {
+    "pandas": ["transfer_support", "superpac_ie_support", "individual_support", "pac_support_corp_union",
+               "merge_support"],
+    "sql": ["transfer_support", "sql_engine", "merge_support"],
+    "polars": ["transfer_support", "polars_engine"],
+}
+# step -> (intermediate name stem, ledger step) for the currency check
+STEP_OUTPUTS = {
+    "superpac_ie_support": ("superpac_ie_support", "superpac_ie_support"),
+    "individual_support": ("individual_support", "individual_support"),
+    "pac_support_corp_union": ("pac_support_corp_nonconnected", "pac_support"),
+}
+# Steps whose intermediate depends on INDIV_ALLOCATION
+ALLOCATION_STEPS = {"individual_support"}
+OFFICE_FILTERS = {"senate": {"S"}, "presidential": {"P"}, "total": {"S", "P"}}
+
+
+def history_path(out_dir: Path) -> Path:
+    return Path(out_dir) / HISTORY_NAME
+
+
+def load_history(out_dir: Path) -> list[dict]:
+    path = history_path(out_dir)
+    if not path.exists():
+        return []
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return records
+
+
+def append_history(out_dir: Path, records: list[dict]) -> Path:
+    path = history_path(out_dir)
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    return path
+
+
+def input_files() -> dict[str, Path]:
+    """Every raw input, resolved the way the steps resolve them."""
+    from config import CM_DIR, CN_DIR, CCL_DIR, INDIV_DIR, PAS2_DIR, OTH_DIR
+    from individual_support import _find_file
+
+    found = {}
+    for key, folder in [("cm", CM_DIR), ("cn", CN_DIR), ("ccl", CCL_DIR), ("itcont", INDIV_DIR), ("itpas2", PAS2_DIR),
+                        ("itoth", OTH_DIR)]:
+        try:
+            found[key] = _find_file(folder, key)
+        except FileNotFoundError:
+            found[key] = None
+    return found
+
+
+def profile_file(path: Path) -> dict:
+    """Size, bytes/row and estimated rows from the first MB."""
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        sample = f.read(_SAMPLE_BYTES)
+    n_lines = sample.count(b"\n")
+    if len(sample) == size:
+        rows = n_lines + (1 if sample and not sample.endswith(b"\n") else 0)
+        return {"bytes": size, "bytes_per_row": round(size / rows, 1) if rows else None, "rows": rows, "exact": True}
+    per_row = len(sample) / n_lines if n_lines else float(len(sample))
+    return {"bytes": size, "bytes_per_row": round(per_row, 1), "rows": int(size / per_row), "exact": False}
+
+
+def step_bytes(step: str, files: dict) -> int:
+    bulk, _ = STEP_INPUTS[step]
+    return sum(files[k].stat().st_size for k in bulk.split("+") if files.get(k) is not None)
+
+
+def estimate_step(step: str, engine: str, n_bytes: int, history: list[dict]) -> dict:
+    """Median seconds-per-byte of recorded runs of this step, scaled to ``n_bytes``; max recorded peak RSS."""
+    runs = [r for r in history if r.get("kind") == "step" and r.get("step") == step
+            and r.get("engine", "pandas") == engine and r.get("input_bytes")]
+    if not runs:
+        return {"seconds": None, "peak_rss_mb": None, "samples": 0}
+    rate = statistics.median(r["seconds"] / r["input_bytes"] for r in runs)
+    peaks = [r["peak_rss_mb"] for r in runs if r.get("peak_rss_mb") is not None]
+    # Memory is bounded by CHUNKSIZE rather than file size, so report the largest observed peak
+    return {"seconds": round(rate * n_bytes, 1), "peak_rss_mb": max(peaks) if peaks else None, "samples": len(runs)}
+
+
+def estimate_pipeline(engine: str, office: str, n_bytes: int, history: list[dict]) -> dict:
+    """Whole-office estimate from bench_engines records (fallback when no step history exists)."""
+    runs = [r for r in history if r.get("kind") == "engine" and r.get("engine") == engine
+            and r.get("office") == office and r.get("input_bytes") and r.get("dataset", "real") == "real"]
+    if not runs:
+        return {"seconds": None, "peak_rss_mb": None, "samples": 0}
+    rate = statistics.median(r["seconds"] / r["input_bytes"] for r in runs)
+    peaks = [r["peak_rss_mb"] for r in runs if r.get("peak_rss_mb") is not None]
+    return {"seconds": round(rate * n_bytes, 1), "peak_rss_mb": max(peaks) if peaks else None, "samples": len(runs)}
+
+
+def current_steps(office: str, files: dict) -> dict[str, str]:
+    """Support steps whose outputs still match their inputs -> intermediate file name."""
+    import config
+    from config import SUFFIX, get_output_dir, find_intermediate, run_manifest_path
+    from reconciliation import ledger_path
+
+    out_dir = get_output_dir(OFFICE_FILTERS[office])
+    manifest_path = run_manifest_path(out_dir, office)
+    # Outputs from before the manifest recorded the rule used the default
+    allocation = "principal"
+    if manifest_path.exists():
+        with open(manifest_path, encoding="utf-8") as f:
+            allocation = json.load(f).get("allocation", "principal")
+    current = {}
+    for step, (stem, ledger_step) in STEP_OUTPUTS.items():
+        bulk, dims = STEP_INPUTS[step]
+        inter = find_intermediate(out_dir, f"{office}_{stem}_{SUFFIX}")
+        lpath = ledger_path(out_dir, office, ledger_step, SUFFIX)
+        if inter is None or not lpath.exists() or files.get(bulk) is None:
+            continue
+        with open(lpath, encoding="utf-8") as f:
+            ledger = json.load(f)
+        st = files[bulk].stat()
+        if ledger.get("scale", 1.0) != 1.0 or ledger["source_size"] != st.st_size or ledger["source_mtime"] != st.st_mtime:
+            continue
+        if ledger.get("netting", "gross") != config.NETTING_POLICY:
+            continue
+        if step in ALLOCATION_STEPS and allocation != config.INDIV_ALLOCATION:
+            continue
+        if any(files.get(d) is not None and files[d].stat().st_mtime > inter.stat().st_mtime for d in dims):
+            continue
+        current[step] = inter.name
+    return current
+
+
+def incremental_skips(files: dict) -> list[str]:
+    """Bulk files unchanged since the last incremental refresh."""
+    from config import OUT_DIR
+
+    state_path = OUT_DIR / "incremental" / "state.json"
+    if not state_path.exists():
+        return []
+    state = json.loads(state_path.read_text())
+    skips = []
+    for key, src in state.get("sources", {}).items():
+        path = files.get(key)
+        if path is not None:
+            st = path.stat()
+            if src.get("size") == st.st_size and src.get("mtime") == st.st_mtime:
+                skips.append(key)
+    return skips
+
+
+def build_plan(engine: str = "pandas") -> dict:
+    from config import OUT_DIR, SUFFIX, CHUNKSIZE, INDIV_ALLOCATION, NETTING_POLICY
+
+    files = input_files()
+    missing = [k for k, p in files.items() if p is None]
+    profiles = {k: {"path": str(p), **profile_file(p)} for k, p in files.items() if p is not None}
+    history = load_history(OUT_DIR)
+
+    offices = {}
+    for office in OFFICE_FILTERS:
+        steps = []
+        for step in ENGINE_STEPS[engine]:
+            n_bytes = step_bytes(step, files)
+            steps.append({"step": step, "input_bytes": n_bytes, **estimate_step(step, engine, n_bytes, history)})
+        known = [s["seconds"] for s in steps]
+        total_bytes = step_bytes("sql_engine", files)
+        offices[office] = {
+            "steps": steps,
+            "seconds": round(sum(known), 1) if all(k is not None for k in known) else None,
+            "from_engine_history": estimate_pipeline(engine, office, total_bytes, history),
+            "current": current_steps(office, files) if engine == "pandas" else {},
+        }
+
+    return {
+        "cycle": SUFFIX,
+        "engine": engine,
+        "chunksize": CHUNKSIZE,
+        "allocation": INDIV_ALLOCATION,
+        "netting": NETTING_POLICY,
+        "inputs": profiles,
+        "missing_inputs": missing,
+        "history_records": len(history),
+        "offices": offices,
+        "incremental_skips": incremental_skips(files),
+    }
+
+
+def _fmt_seconds(s) -> str:
+    if s is None:
+        return "n/a"
+    return f"{s / 60:.1f} min" if s >= 120 else f"{s:.1f} s"
+
+
+def print_plan(plan: dict) -> None:
+    print("\n" + "="*80)
+    print(f"RUN PLAN: cycle {plan['cycle']} | engine {plan['engine']} | chunksize {plan['chunksize']:,} | "
+          f"allocation {plan['allocation']} | netting {plan['netting']}")
+    print("="*80)
+    print("\nInputs:")
+    for key, p in plan["inputs"].items():
+        rows = f"{p['rows']:,}" if p["exact"] else f"~{p['rows']:,}"
+        print(f"  {key:7s} {p['bytes'] / 1e6:12,.1f} MB | {rows:>14s} rows | {p['bytes_per_row']} bytes/row | {p['path']}")
+    for key in plan["missing_inputs"]:
+        print(f"  {key:7s} MISSING" + (" (optional; ATTRIBUTED_TRANSFER_SUPPORT will be 0)" if key == "itoth" else ""))
+
+    print(f"\nEstimates ({plan['history_records']:,} history records):")
+    grand = 0.0
+    for office, o in plan["offices"].items():
+        print(f"  {office}:")
+        for s in o["steps"]:
+            tag = " [current]" if s["step"] in o["current"] else ""
+            peak = f"{s['peak_rss_mb']:,.0f} MB" if s["peak_rss_mb"] is not None else "n/a"
+            print(f"    {s['step']:22s} {_fmt_seconds(s['seconds']):>10s} | peak {peak:>9s} | "
+                  f"{s['samples']} runs{tag}")
+        fallback = o["from_engine_history"]
+        if o["seconds"] is None and fallback["seconds"] is not None:
+            print(f"    (from bench_engines history: {_fmt_seconds(fallback['seconds'])}, "
+                  f"peak {fallback['peak_rss_mb']} MB, {fallback['samples']} runs)")
+        est = o["seconds"] if o["seconds"] is not None else fallback["seconds"]
+        grand = None if grand is None or est is None else grand + est
+    print(f"  Total: {_fmt_seconds(grand)}")
+
+    print("\nOutputs current with their inputs (a rerun would reproduce them):")
+    any_current = False
+    for office, o in plan["offices"].items():
+        for step, name in o["current"].items():
+            print(f"  {office}/{step}: {name}")
+            any_current = True
+    if not any_current:
+        print("  none")
+    if plan["incremental_skips"]:
+        print(f"Incremental refresh would skip unchanged: {', '.join(plan['incremental_skips'])}")
+    print("="*80)
+
+
+def main(argv=None) -> dict:
+    ap = argparse.ArgumentParser(description="Show inputs, time/memory estimates and current outputs without running.")
+    ap.add_argument("--engine", choices=sorted(ENGINE_STEPS), default="pandas")
+    ap.add_argument("--json", action="store_true", help="Print the plan as JSON")
+    args = ap.parse_args(argv)
+    plan = build_plan(args.engine)
+    if args.json:
+        print(json.dumps(plan, indent=2))
+    else:
+        print_plan(plan)
+    return plan
+
+
+if __name__ == "__main__":
+    main()
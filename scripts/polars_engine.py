@@ -0,0 +1,283 @@
+"""
+Polars lazy-execution engine for the support steps and merge_support.
+
+Every input is a ``pl.scan_csv`` over the ``config.py`` schemas, so only the
+columns a query touches are parsed (projection pushdown), the transaction
+filters run inside the scan (predicate pushdown), and the group-bys and joins
+use all cores. The steps mirror the pandas scripts rule for rule; the final
+tables are handed to the same pandas CSV writer, so the outputs are
+byte-identical to the pandas path.
+
+Parsing matches stream_reader.iter_chunks (no quoting, short lines padded,
+lines with too many fields dropped) with one exception: a line whose only
+defect is an extra *empty* trailing field is kept here, because Polars cannot
+tell it from a complete line. Real FEC lines with embedded pipes always spill
+a non-empty SUB_ID and are dropped as in pandas.
+
+Requires ``pip install polars``. Select with ``python run_all.py --engine polars``.
+"""
+
+from __future__ import annotations
+
+import polars as pl
+
+from config import (TARGET_ELECTION_YR, PAC_ORG_TYPES, LEADERSHIP_PAC_COL, PARTY_SUPPORT_COL, PARTY_CMTE_TYPES,
+                    PARTY_TRANSACTION_TYPES, TRANSFER_SUPPORT_COL, detail_support_cols,
+                    write_csv_variants, write_intermediate, find_intermediate, read_intermediate, get_output_dir,
+                    get_output_prefix)
+from individual_support import _find_file
+
+
+EXTRA_COL = "__EXTRA"
+SUPPORT_COLS = ["INDIVIDUAL_SUPPORT", "CORP_PAC_SUPPORT", "NONCONNECTED_PAC_SUPPORT", "SUPERPAC_IE_SUPPORT"]
+
+
+def _scan(path, cols) -> pl.LazyFrame:
+    """Lazy scan of a pipe-delimited FEC file with every column as text."""
+    lf = pl.scan_csv(
+        path, separator="|", has_header=False, schema={c: pl.Utf8 for c in cols + [EXTRA_COL]},
+        quote_char=None, truncate_ragged_lines=True, missing_columns="insert", encoding="utf8-lossy",
+    )
+    # A value past the last schema column means the line had too many fields
+    return lf.filter(pl.col(EXTRA_COL).is_null()).drop(EXTRA_COL)
+
+
+def _amount() -> pl.Expr:
+    return pl.col("TRANSACTION_AMT").str.strip_chars().cast(pl.Float64, strict=False)
+
+
+def _year(col: str = "CAND_ELECTION_YR") -> pl.Expr:
+    return pl.col(col).str.extract(r"(\d{4})", 1)
+
+
+def _candidates(cn: pl.LazyFrame, office_filter: set) -> pl.LazyFrame:
+    """(CAND_ID, CAND_ELECTION_YR) universe for the support steps."""
+    return (
+        cn.filter(pl.col("CAND_OFFICE").is_in(sorted(office_filter)))
+          .with_columns(_year())
+          .filter(pl.col("CAND_ELECTION_YR") == TARGET_ELECTION_YR)
+          .filter(pl.col("CAND_ID").is_not_null())
+          .unique("CAND_ID", keep="first", maintain_order=True)
+          .select("CAND_ID", "CAND_ELECTION_YR")
+    )
+
+
+def _cmte_to_cand(ccl: pl.LazyFrame) -> pl.LazyFrame:
+    """CMTE_ID -> CAND_ID, principal committee (CMTE_DSGN 'P') first, else first observed."""
+    return (
+        ccl.with_columns((pl.col("CMTE_DSGN").fill_null("") == "P").cast(pl.Int8).alias("__is_principal"))
+           .sort(["CMTE_ID", "__is_principal"], descending=[False, True], maintain_order=True, nulls_last=True)
+           .filter(pl.col("CMTE_ID").is_not_null() & pl.col("CAND_ID").is_not_null())
+           .unique("CMTE_ID", keep="first", maintain_order=True)
+           .select("CMTE_ID", "CAND_ID")
+    )
+
+
+def support_frames(office_filter: set) -> dict:
+    """Lazy plans for the three support intermediates (same columns as the pandas steps)."""
+    from config import (CM_DIR, CN_DIR, CCL_DIR, INDIV_DIR, PAS2_DIR, CM_COLS, CN_COLS, CCL_COLS, INDIV_COLS, ITPAS2_COLS,
+                        SPLIT_LEADERSHIP_PACS)
+
+    cm = _scan(_find_file(CM_DIR, "cm"), CM_COLS).with_columns(
+        pl.col("CMTE_TP").fill_null(""), pl.col("ORG_TP").fill_null("")
+    )
+    cands = _candidates(_scan(_find_file(CN_DIR, "cn"), CN_COLS), office_filter)
+    cmte_to_cand = _cmte_to_cand(_scan(_find_file(CCL_DIR, "ccl"), CCL_COLS))
+
+    superpac_ids = cm.filter(pl.col("CMTE_TP") == "O").select("CMTE_ID").unique()
+    pac_ids = cm.filter(pl.col("CMTE_TP").is_in(["Q", "N"])).select("CMTE_ID").unique()
+    # A committee also listed as a PAC counts as a PAC
+    party_ids = (
+        cm.filter(pl.col("CMTE_TP").is_in(list(PARTY_CMTE_TYPES))).select("CMTE_ID").unique()
+          .join(pac_ids, on="CMTE_ID", how="anti")
+    )
+    # pandas builds ORG_TP from set_index(...).to_dict(): the last cm row wins
+    org_type = cm.unique("CMTE_ID", keep="last", maintain_order=True).select("CMTE_ID", "ORG_TP")
+    leadership = cm.filter(pl.col("CMTE_DSGN") == "D").select("CMTE_ID").unique().with_columns(
+        pl.lit(True).alias("__is_leadership"))
+
+    indiv = (
+        _scan(_find_file(INDIV_DIR, "itcont"), INDIV_COLS)
+          .filter(pl.col("TRANSACTION_TP").is_in(["15", "15E"]) & (pl.col("ENTITY_TP") == "IND"))
+          .join(cmte_to_cand, on="CMTE_ID", how="inner")
+          .join(cands, on="CAND_ID", how="inner")
+          .with_columns(_amount().alias("AMT"))
+          .filter(pl.col("AMT") > 0)
+          .group_by("CAND_ID", "CAND_ELECTION_YR")
+          .agg(pl.col("AMT").sum().alias("INDIVIDUAL_SUPPORT"))
+          .sort("INDIVIDUAL_SUPPORT", descending=True, maintain_order=True)
+    )
+
+    itpas2 = (
+        _scan(_find_file(PAS2_DIR, "itpas2"), ITPAS2_COLS)
+          .select("CMTE_ID", "TRANSACTION_TP", "CAND_ID", "TRANSACTION_AMT")
+          .join(cands, on="CAND_ID", how="inner")
+          .with_columns(_amount().alias("AMT"))
+          .filter(pl.col("AMT") > 0)
+    )
+
+    superpac = (
+        itpas2.filter(pl.col("TRANSACTION_TP") == "24E")
+              .join(superpac_ids, on="CMTE_ID", how="semi")
+              .group_by("CAND_ID", "CAND_ELECTION_YR")
+              .agg(pl.col("AMT").sum().alias("SUPERPAC_IE_SUPPORT"))
+              .sort("SUPERPAC_IE_SUPPORT", descending=True, maintain_order=True)
+    )
+
+    pac_rows = (
+        itpas2.filter(~pl.col("TRANSACTION_TP").is_in(["24E", "24A"]))
+              .join(pac_ids, on="CMTE_ID", how="semi")
+              .join(org_type, on="CMTE_ID", how="left")
+              .filter(pl.col("ORG_TP").is_in(list(PAC_ORG_TYPES)))
+    )
+    pac_sums = [pl.col("AMT").filter(pl.col("ORG_TP") == t).sum().alias(col) for t, col in PAC_ORG_TYPES.items()]
+    pac_sums.append(pl.col("AMT").filter(pl.col("__is_party")).sum().alias(PARTY_SUPPORT_COL))
+    if SPLIT_LEADERSHIP_PACS:
+        pac_rows = pac_rows.join(leadership, on="CMTE_ID", how="left")
+        pac_sums.append(pl.col("AMT").filter(pl.col("__is_leadership").fill_null(False)).sum().alias(LEADERSHIP_PAC_COL))
+    # Party committee rows share the itpas2 scan and the PAC group-by
+    party_rows = (
+        itpas2.filter(pl.col("TRANSACTION_TP").is_in(list(PARTY_TRANSACTION_TYPES)))
+              .join(party_ids, on="CMTE_ID", how="semi")
+              .with_columns(pl.lit(True).alias("__is_party"))
+    )
+    pac_rows = pl.concat([pac_rows.with_columns(pl.lit(False).alias("__is_party")), party_rows], how="diagonal")
+    pac = (
+        pac_rows.group_by("CAND_ID", "CAND_ELECTION_YR")
+                .agg(pac_sums)
+                .sort(["CORP_PAC_SUPPORT", "NONCONNECTED_PAC_SUPPORT"], descending=True, maintain_order=True)
+    )
+    return {"superpac": superpac, "indiv": indiv, "pac": pac}
+
+
+def merged_table(office_filter: set, support: dict) -> pl.LazyFrame:
+    """merge_support in Polars: deduplicated cn universe left-joined to the support totals."""
+    from config import CN_DIR, CN_COLS
+
+    cn = (
+        _scan(_find_file(CN_DIR, "cn"), CN_COLS)
+          .filter(pl.col("CAND_OFFICE").is_in(sorted(office_filter)))
+          .with_columns(_year())
+          .filter(pl.col("CAND_ELECTION_YR") == TARGET_ELECTION_YR)
+          # Prefer rows with a PCC, then status 'C' (same scoring as merge_support)
+          .with_columns(
+              (pl.col("CAND_PCC").fill_null("").str.len_chars() > 0).cast(pl.Int8).alias("__has_pcc"),
+              (pl.col("CAND_STATUS").fill_null("") == "C").cast(pl.Int8).alias("__is_status_C"),
+          )
+          .sort(["CAND_ID", "CAND_ELECTION_YR", "__has_pcc", "__is_status_C"],
+                descending=[False, False, True, True], maintain_order=True, nulls_last=True)
+          .unique(["CAND_ID", "CAND_ELECTION_YR"], keep="first", maintain_order=True)
+          .select("CAND_ID", "CAND_ELECTION_YR", "CAND_NAME", "CAND_PTY_AFFILIATION", "CAND_OFFICE", "CAND_OFFICE_ST")
+    )
+
+    keys = ["CAND_ID", "CAND_ELECTION_YR"]
+    detail_cols = detail_support_cols()
+    merged = (
+        cn.join(support["indiv"], on=keys, how="left", maintain_order="left")
+          .join(support["pac"], on=keys, how="left", maintain_order="left")
+          .join(support["superpac"], on=keys, how="left", maintain_order="left")
+          .join(support["transfer"], on=keys, how="left", maintain_order="left")
+          # Amounts are in cents; rounding drops float noise so every engine writes the same digits
+          .with_columns([pl.col(c).fill_null(0.0).round(2) for c in SUPPORT_COLS + detail_cols])
+          .with_columns(pl.sum_horizontal(SUPPORT_COLS).round(2).alias("TOTAL_SUPPORT"))
+          .with_columns((pl.col("TOTAL_SUPPORT") > 0).cast(pl.Int64).alias("HAS_MONEY"))
+          .sort(["CAND_OFFICE_ST", "TOTAL_SUPPORT"], descending=[False, True], nulls_last=True, maintain_order=True)
+    )
+    return merged.select(
+        "CAND_ID", "CAND_ELECTION_YR", "CAND_NAME", "CAND_PTY_AFFILIATION", "CAND_OFFICE", "CAND_OFFICE_ST",
+        "INDIVIDUAL_SUPPORT", "CORP_PAC_SUPPORT", "NONCONNECTED_PAC_SUPPORT", "SUPERPAC_IE_SUPPORT",
+        "TOTAL_SUPPORT", "HAS_MONEY", *detail_cols,
+    )
+
+
+def transfer_frame(transfer, out_dir, prefix: str) -> pl.LazyFrame:
+    """
+    transfer_support's table as a LazyFrame: the in-memory frame when given,
+    else the office's intermediate, else no rows (no itoth file).
+    """
+    from config import SUFFIX
+
+    if transfer is None:
+        path = find_intermediate(out_dir, f"{prefix}_transfer_support_{SUFFIX}")
+        transfer = read_intermediate(path) if path is not None else None
+    schema = {"CAND_ID": pl.Utf8, "CAND_ELECTION_YR": pl.Utf8, TRANSFER_SUPPORT_COL: pl.Float64}
+    if transfer is None or transfer.empty:
+        return pl.LazyFrame(schema=schema)
+    return pl.LazyFrame(
+        {c: transfer[c].astype(float if c == TRANSFER_SUPPORT_COL else str).tolist() for c in schema},
+        schema=schema,
+    )
+
+
+def main(office_filter=None, frames=None):
+    """
+    Run the support steps and merge_support for one office type with Polars.
+
+    Args:
+        office_filter: Set of office codes to include (e.g., {'S'}, {'P'}, or {'S', 'P'})
+        frames: Optional in-memory intermediates of steps run outside this
+            engine ('transfer'); missing ones are read from disk.
+
+    Returns:
+        Dict with the output tables ('final', 'no_support', 'all') and the
+        support intermediates ('superpac', 'indiv', 'pac') as pandas DataFrames,
+        like run_all's pandas path.
+    """
+    from config import SUFFIX, VALID_OFFICES, INTERMEDIATE_FORMAT
+
+    if office_filter is None:
+        office_filter = VALID_OFFICES
+    office_filter = set(office_filter)
+
+    out_dir = get_output_dir(office_filter)
+    prefix = get_output_prefix(office_filter)
+
+    plans = support_frames(office_filter)
+    # One collect_all shares the itpas2 scan between the superpac and PAC plans
+    collected = pl.collect_all([plans["superpac"], plans["indiv"], plans["pac"]])
+    support = dict(zip(["superpac", "indiv", "pac"], collected))
+    lazy = {k: v.lazy() for k, v in support.items()}
+    lazy["transfer"] = transfer_frame((frames or {}).get("transfer"), out_dir, prefix)
+    merged = merged_table(office_filter, lazy).collect()
+
+    names = {
+        "superpac": f"{prefix}_superpac_ie_support_{SUFFIX}",
+        "indiv": f"{prefix}_individual_support_{SUFFIX}",
+        "pac": f"{prefix}_pac_support_corp_nonconnected_{SUFFIX}",
+    }
+    frames = {}
+    for key, df in support.items():
+        frames[key] = df.to_pandas()
+        path = write_intermediate(frames[key], out_dir, names[key])
+        print(f"[polars_engine][{prefix}] Wrote: {path} ({len(df):,} candidates)")
+
+    merged_pd = merged.to_pandas()
+    has_money = (merged_pd["HAS_MONEY"] == 1).to_numpy()
+    out_with_money = out_dir / f"{prefix}_final_support_table_{SUFFIX}.csv"
+    out_no_money = out_dir / f"{prefix}_candidates_no_support_{SUFFIX}.csv"
+    out_all_flag = out_dir / f"{prefix}_candidates_all_with_flag_{SUFFIX}.csv"
+    write_csv_variants(
+        merged_pd,
+        {out_with_money: has_money, out_no_money: ~has_money, out_all_flag: None},
+        index=False,
+    )
+    if INTERMEDIATE_FORMAT != "csv":
+        write_intermediate(merged_pd, out_dir, out_all_flag.stem)
+
+    print(f"[polars_engine][{prefix}] {int(has_money.sum()):,} candidates with money, "
+          f"{int((~has_money).sum()):,} without | Total $ support {merged_pd['TOTAL_SUPPORT'].sum():,.2f}")
+    print(f"[polars_engine][{prefix}] Wrote:")
+    print("  ", out_with_money)
+    print("  ", out_no_money)
+    print("  ", out_all_flag)
+
+    return {
+        "final": merged_pd[has_money].copy(),
+        "no_support": merged_pd[~has_money].copy(),
+        "all": merged_pd,
+        **frames,
+    }
+
+
+if __name__ == "__main__":
+    main()
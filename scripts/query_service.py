@@ -0,0 +1,272 @@
+"""
+Local HTTP/JSON query service over the final support tables.
+
+Loads ``total_candidates_all_with_flag_{cycle}`` (the typed copy when present,
+else the CSV) for every cycle folder under BASE_DIR into one in-memory table
+with positional indexes by CAND_ID, state, office and party, a presorted
+TOTAL_SUPPORT order for top-N, and precomputed state rollups. Senate and
+Presidential views are filters on CAND_OFFICE; "final" rows are HAS_MONEY == 1.
+
+A background thread polls the source files and swaps in a fresh index once a
+rewrite by merge_support has settled, so dashboards never see a half-written
+table.
+
+Usage:
+    python query_service.py --port 8765
+    curl localhost:8765/candidates/S0FL00338
+    curl "localhost:8765/candidates?state=FL&office=S&cycle=2016&final=1"
+    curl "localhost:8765/top?n=10&office=P&by=INDIVIDUAL_SUPPORT"
+    curl "localhost:8765/states?cycle=2016&office=S"
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from config import BASE_DIR, find_intermediate, read_intermediate
+
+
+CYCLE_DIR_RE = re.compile(r"^\d{4}_(\d{4})$")
+TEXT_DTYPES = {
+    "CAND_ID": str, "CAND_ELECTION_YR": str, "CAND_NAME": str, "CAND_PTY_AFFILIATION": str,
+    "CAND_OFFICE": str, "CAND_OFFICE_ST": str,
+}
+INDEXED = {"cand_id": "CAND_ID", "state": "CAND_OFFICE_ST", "office": "CAND_OFFICE", "party": "CAND_PTY_AFFILIATION",
+           "cycle": "CYCLE"}
+DEFAULT_LIMIT = 100
+
+
+def find_sources(base_dir: Path) -> dict[int, Path]:
+    """cycle year -> all_with_flag table for every processed cycle under ``base_dir``."""
+    sources = {}
+    for cycle_dir in sorted(base_dir.iterdir()) if base_dir.exists() else []:
+        m = CYCLE_DIR_RE.match(cycle_dir.name)
+        if not m:
+            continue
+        suffix = m.group(1)[2:]
+        path = find_intermediate(cycle_dir / "outputs" / "total", f"total_candidates_all_with_flag_{suffix}")
+        if path is not None:
+            sources[int(m.group(1))] = path
+    return sources
+
+
+def _signature(sources: dict[int, Path]) -> tuple:
+    sig = []
+    for cycle, path in sorted(sources.items()):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        sig.append((cycle, str(path), st.st_size, st.st_mtime_ns))
+    return tuple(sig)
+
+
+def _records(df: pd.DataFrame) -> list[dict]:
+    """JSON-safe rows (NaN -> null, numpy scalars -> Python)."""
+    return json.loads(df.to_json(orient="records"))
+
+
+class SupportStore:
+    """Immutable, indexed snapshot of every cycle's all_with_flag table."""
+
+    def __init__(self, table: pd.DataFrame, sources: dict[int, Path]):
+        self.sources = sources
+        self.loaded_at = time.time()
+        self.table = table.reset_index(drop=True)
+        self.support_cols = [c for c in self.table.columns if c.endswith("_SUPPORT")]
+
+        # column -> {value: row positions}
+        self.index = {
+            col: {k: np.asarray(v) for k, v in self.table.groupby(col, sort=False, dropna=False).indices.items()}
+            for col in INDEXED.values() if col in self.table.columns
+        }
+        self.by_total = np.argsort(-self.table["TOTAL_SUPPORT"].to_numpy(), kind="stable")
+        self.final_mask = self.table["HAS_MONEY"].to_numpy() == 1
+        self.state_rollup = (
+            self.table.groupby(["CYCLE", "CAND_OFFICE", "CAND_OFFICE_ST"], dropna=False)
+                .agg(CANDIDATES=("CAND_ID", "size"), WITH_MONEY=("HAS_MONEY", "sum"),
+                     **{c: (c, "sum") for c in self.support_cols})
+                .reset_index()
+        )
+
+    @classmethod
+    def load(cls, base_dir: Path) -> "SupportStore":
+        sources = find_sources(base_dir)
+        frames = []
+        for cycle, path in sorted(sources.items()):
+            df = read_intermediate(path, dtypes=TEXT_DTYPES)
+            df.insert(1, "CYCLE", np.int16(cycle))
+            frames.append(df)
+        if frames:
+            table = pd.concat(frames, ignore_index=True, sort=False)
+        else:
+            table = pd.DataFrame(columns=["CAND_ID", "CYCLE", "CAND_OFFICE", "CAND_OFFICE_ST",
+                                          "CAND_PTY_AFFILIATION", "HAS_MONEY", "TOTAL_SUPPORT"])
+        return cls(table, sources)
+
+    def positions(self, filters: dict, final: bool = False) -> np.ndarray | None:
+        """Row positions matching every filter (intersection of index lists); None = all rows."""
+        pos = None
+        for key, value in filters.items():
+            col = INDEXED[key]
+            if col == "CYCLE":
+                value = int(value)
+            hits = self.index.get(col, {}).get(value, np.empty(0, dtype=np.intp))
+            pos = hits if pos is None else np.intersect1d(pos, hits, assume_unique=True)
+        if final:
+            pos = np.flatnonzero(self.final_mask) if pos is None else pos[self.final_mask[pos]]
+        return pos
+
+    def select(self, filters: dict, final: bool = False, limit: int = DEFAULT_LIMIT) -> pd.DataFrame:
+        pos = self.positions(filters, final)
+        rows = self.table if pos is None else self.table.iloc[np.sort(pos)]
+        return rows.head(limit)
+
+    def top(self, n: int, by: str, filters: dict, final: bool = True) -> pd.DataFrame:
+        if by not in self.support_cols:
+            raise KeyError(f"Unknown support column: {by}")
+        order = self.by_total if by == "TOTAL_SUPPORT" else np.argsort(-self.table[by].to_numpy(), kind="stable")
+        pos = self.positions(filters, final)
+        if pos is not None:
+            keep = np.zeros(len(self.table), dtype=bool)
+            keep[pos] = True
+            order = order[keep[order]]
+        return self.table.iloc[order[:n]]
+
+    def states(self, cycle=None, office=None) -> pd.DataFrame:
+        r = self.state_rollup
+        if cycle is not None:
+            r = r[r["CYCLE"] == int(cycle)]
+        if office is not None:
+            r = r[r["CAND_OFFICE"] == office]
+        return r.sort_values("TOTAL_SUPPORT", ascending=False)
+
+    def health(self) -> dict:
+        return {
+            "rows": int(len(self.table)),
+            "cycles": sorted(int(c) for c in self.sources),
+            "sources": {str(c): str(p) for c, p in sorted(self.sources.items())},
+            "loaded_at": self.loaded_at,
+        }
+
+
+class StoreHolder:
+    """Holds the current SupportStore and swaps in a new one when the sources change."""
+
+    def __init__(self, base_dir: Path, poll_seconds: float = 2.0):
+        self.base_dir = base_dir
+        self.poll_seconds = poll_seconds
+        self.store = SupportStore.load(base_dir)
+        self._signature = _signature(self.store.sources)
+        self._stop = threading.Event()
+
+    def _watch(self) -> None:
+        pending = None
+        while not self._stop.wait(self.poll_seconds):
+            sig = _signature(find_sources(self.base_dir))
+            if sig == self._signature:
+                pending = None
+                continue
+            # Reload only once the files stopped changing for one poll interval
+            if sig != pending:
+                pending = sig
+                continue
+            try:
+                store = SupportStore.load(self.base_dir)
+            except Exception as e:
+                print(f"[query_service][WARN] Reload failed, keeping previous tables: {e}")
+                continue
+            self.store, self._signature, pending = store, sig, None
+            print(f"[query_service] Reloaded {len(store.table):,} rows from {len(store.sources)} cycles")
+
+    def start(self) -> None:
+        threading.Thread(target=self._watch, name="query_service-reload", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def _handler_for(holder: StoreHolder):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            parts = [p for p in url.path.split("/") if p]
+            store = holder.store  # one snapshot per request
+            filters = {k: params[k] for k in INDEXED if k in params}
+            final = params.get("final", "0") == "1"
+            try:
+                if parts == ["health"]:
+                    self._send(200, store.health())
+                elif parts[:1] == ["candidates"] and len(parts) == 2:
+                    rows = store.select({**filters, "cand_id": parts[1]}, final, limit=len(store.table))
+                    if rows.empty:
+                        self._send(404, {"error": f"Unknown CAND_ID {parts[1]}"})
+                    else:
+                        self._send(200, _records(rows))
+                elif parts == ["candidates"]:
+                    limit = int(params.get("limit", DEFAULT_LIMIT))
+                    self._send(200, _records(store.select(filters, final, limit)))
+                elif parts == ["top"]:
+                    n = int(params.get("n", 10))
+                    by = params.get("by", "TOTAL_SUPPORT")
+                    self._send(200, _records(store.top(n, by, filters, final=params.get("final", "1") == "1")))
+                elif parts == ["states"]:
+                    self._send(200, _records(store.states(params.get("cycle"), params.get("office"))))
+                else:
+                    self._send(404, {"error": f"Unknown endpoint {url.path}",
+                                     "endpoints": ["/health", "/candidates", "/candidates/<CAND_ID>", "/top", "/states"]})
+            except (KeyError, ValueError) as e:
+                self._send(400, {"error": str(e.args[0]) if e.args else str(e)})
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def serve(base_dir: Path = BASE_DIR, host: str = "127.0.0.1", port: int = 8765, poll_seconds: float = 2.0) -> None:
+    holder = StoreHolder(base_dir, poll_seconds)
+    holder.start()
+    server = ThreadingHTTPServer((host, port), _handler_for(holder))
+    info = holder.store.health()
+    print(f"[query_service] {info['rows']:,} rows from cycles {info['cycles']} -> http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        holder.stop()
+        server.server_close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Serve the final support tables as a local JSON API.")
+    ap.add_argument("--base-dir", type=Path, default=BASE_DIR, help="FEC_Data folder containing the cycle folders")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--poll", type=float, default=2.0, help="Seconds between checks for rewritten outputs")
+    args = ap.parse_args()
+    serve(args.base_dir, args.host, args.port, args.poll)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Raw-to-output reconciliation ledger for the streaming support steps.
+
+Every filter in a step's chunk loop goes through ``ReconLedger.keep``, which
+counts the rows and dollars it drops. Together with the reader's line and
+malformed-line counters this accounts for every line of the raw file:
+
+    lines    = malformed_lines + rows_in
+    rows_in  = sum(dropped rows per stage) + rows kept
+    dollars  = sum(dropped dollars per stage) + dollars kept
+
+and the dollars kept must equal the support columns the step wrote (times
+``scale`` for committee-sampled runs, see sampling.py). Negative amounts kept
+under a netting policy (see netting.py) are counted in the column itself when
+it is net, else in a separate ``<column>_REFUNDS`` bucket. The ledger is saved
+as JSON next to the outputs; validate_outputs asserts it.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+AMT_COL = "__AMT"
+
+
+def ledger_path(out_dir: Path, prefix: str, step: str, suffix: str) -> Path:
+    """Location of a step's reconciliation ledger, next to the CSV outputs."""
+    return out_dir / f"{prefix}_{step}_reconciliation_{suffix}.json"
+
+
+class ReconLedger:
+    """Per-stage row/dollar drop counters for one support step."""
+
+    def __init__(self, step: str, source_path: Path, scale: float = 1.0, netting: str = "gross"):
+        self.step = step
+        self.source_path = Path(source_path)
+        self.scale = scale
+        self.netting = netting
+        self.reader_stats: dict = {}
+        self.rows_in = 0
+        self.dollars_in = 0.0
+        self.stages: dict[str, list] = {}
+        self.kept: dict[str, list] = {}
+
+    def start(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Count a freshly read chunk and attach its parsed amounts (``__AMT``)."""
+        chunk = chunk.assign(**{AMT_COL: pd.to_numeric(chunk["TRANSACTION_AMT"], errors="coerce")})
+        self.rows_in += len(chunk)
+        self.dollars_in += float(chunk[AMT_COL].sum())
+        return chunk
+
+    def keep(self, chunk: pd.DataFrame, mask, stage: str) -> pd.DataFrame:
+        """Return ``chunk[mask]``, recording the dropped rows/dollars under ``stage``."""
+        mask = np.asarray(mask, dtype=bool)
+        counts = self.stages.setdefault(stage, [0, 0.0])
+        n_drop = len(mask) - int(mask.sum())
+        if n_drop:
+            counts[0] += n_drop
+            counts[1] += float(np.nansum(chunk[AMT_COL].to_numpy()[~mask]))
+            return chunk[mask]
+        return chunk
+
+    def count_dropped(self, stage: str, rows: int, dollars: float) -> None:
+        """Record a drop that is not a row mask, e.g. the share of an allocated row that left the office."""
+        counts = self.stages.setdefault(stage, [0, 0.0])
+        counts[0] += int(rows)
+        counts[1] += float(dollars)
+
+    def refund_column(self, column: str) -> str:
+        """Kept bucket for the negative amounts of ``column``: the column itself when it is net."""
+        return column if self.netting == "net" else f"{column}_REFUNDS"
+
+    def count_kept(self, column: str, amounts: pd.Series) -> None:
+        """Record rows/dollars that reached an output support column (negative ones via ``refund_column``)."""
+        neg = (amounts < 0).to_numpy()
+        if neg.any():
+            self.count_kept_totals(self.refund_column(column), int(neg.sum()), amounts[neg].sum())
+            amounts = amounts[~neg]
+        self.count_kept_totals(column, len(amounts), amounts.sum())
+
+    def count_kept_totals(self, column: str, rows: int, dollars: float) -> None:
+        """``count_kept`` for rows already tallied per column (e.g. by one bincount)."""
+        counts = self.kept.setdefault(column, [0, 0.0])
+        counts[0] += int(rows)
+        counts[1] += float(dollars)
+
+    def to_dict(self, output_totals: dict | None = None) -> dict:
+        st = self.source_path.stat()
+        return {
+            "step": self.step,
+            "source": str(self.source_path),
+            "source_size": st.st_size,
+            "source_mtime": st.st_mtime,
+            "lines": int(self.reader_stats.get("lines", 0)),
+            "malformed_lines": int(self.reader_stats.get("malformed_lines", 0)),
+            "rows_in": self.rows_in,
+            "dollars_in": round(self.dollars_in, 2),
+            "dropped": {k: {"rows": r, "dollars": round(d, 2)} for k, (r, d) in self.stages.items()},
+            "kept": {k: {"rows": r, "dollars": round(d, 2)} for k, (r, d) in self.kept.items()},
+            "scale": self.scale,
+            "netting": self.netting,
+            "output_totals": {k: round(float(v), 2) for k, v in (output_totals or {}).items()},
+        }
+
+    def save(self, path: Path, output_totals: dict | None = None) -> dict:
+        """Write the ledger; ``output_totals`` maps support column -> sum written."""
+        payload = self.to_dict(output_totals)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        return payload
+
+
+def load_ledgers(out_dir: Path, prefix: str, suffix: str) -> dict[str, dict]:
+    """All ledgers for one office, keyed by step."""
+    ledgers = {}
+    for p in sorted(Path(out_dir).glob(f"{prefix}_*_reconciliation_{suffix}.json")):
+        with open(p, encoding="utf-8") as f:
+            payload = json.load(f)
+        ledgers[payload["step"]] = payload
+    return ledgers
+
+
+def check_ledger(ledger: dict, tol: float = 0.01) -> list[str]:
+    """Internal balance problems of one ledger (empty list when it reconciles)."""
+    problems = []
+    dropped_rows = sum(s["rows"] for s in ledger["dropped"].values())
+    dropped_dollars = sum(s["dollars"] for s in ledger["dropped"].values())
+    kept_rows = sum(s["rows"] for s in ledger["kept"].values())
+    kept_dollars = sum(s["dollars"] for s in ledger["kept"].values())
+
+    if ledger["lines"] != ledger["rows_in"] + ledger["malformed_lines"]:
+        problems.append(f"lines {ledger['lines']:,} != parsed {ledger['rows_in']:,} + malformed {ledger['malformed_lines']:,}")
+    if ledger["rows_in"] != dropped_rows + kept_rows:
+        problems.append(f"rows in {ledger['rows_in']:,} != dropped {dropped_rows:,} + kept {kept_rows:,}")
+    # Dollar sums are rounded per bucket, so allow a cent per bucket
+    slack = tol * (1 + len(ledger["dropped"]) + len(ledger["kept"]))
+    if abs(ledger["dollars_in"] - dropped_dollars - kept_dollars) > max(slack, 1e-9 * abs(ledger["dollars_in"])):
+        problems.append(
+            f"dollars in ${ledger['dollars_in']:,.2f} != dropped ${dropped_dollars:,.2f} + kept ${kept_dollars:,.2f}"
+        )
+    scale = ledger.get("scale", 1.0)
+    for col, total in ledger["output_totals"].items():
+        kept = ledger["kept"].get(col, {"dollars": 0.0})["dollars"] * scale
+        if abs(kept - total) > max(tol * scale, 1e-9 * abs(total)):
+            problems.append(f"{col}: kept ${kept:,.2f} but output sums to ${total:,.2f}")
+    return problems
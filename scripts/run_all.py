@@ -1,38 +1,266 @@
 ## 06
 
+import argparse
 import sys
+import time
+
+# (step, office_filter, seconds, peak RSS MB) of every step run in this process
+STEP_TIMINGS = []
 
 def run_step(name, fn, office_filter):
     """Run a pipeline step with the specified office filter."""
+    from bench_engines import _peak_rss_mb
     office_desc = "+".join(sorted(office_filter))
     print("\n" + "="*80)
     print(f"RUNNING: {name} [{office_desc}]")
     print("="*80)
-    fn(office_filter=office_filter)
+    t0 = time.perf_counter()
+    result = fn(office_filter=office_filter)
+    STEP_TIMINGS.append((name.rsplit(".py", 1)[0], office_filter, time.perf_counter() - t0, _peak_rss_mb()))
+    return result
+
+def record_step_history(engine):
+    """Append this run's step timings to bench_history.jsonl for the --plan estimates."""
+    import os
+    import config
+    import plan
+    files = plan.input_files()
+    records = [
+        {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "kind": "step",
+            "step": step,
+            "engine": engine,
+            "office": config.get_output_prefix(office_filter),
+            "cycle": config.SUFFIX,
+            "seconds": round(seconds, 3),
+            "peak_rss_mb": peak,
+            "input_bytes": plan.step_bytes(step, files),
+            "cpu_count": os.cpu_count(),
+        }
+        for step, office_filter, seconds, peak in STEP_TIMINGS
+    ]
+    return plan.append_history(config.OUT_DIR, records)
 
-def run_full_pipeline(office_filter, label):
+ENGINES = ["pandas", "sql", "polars"]
+
+def run_full_pipeline(office_filter, label, engine="pandas"):
     """Run the complete pipeline for a specific office type."""
     print("\n" + "█"*80)
     print(f"█ PIPELINE: {label}")
     print("█"*80)
     
-    import superpac_ie_support
-    import individual_support
-    import pac_support_corp_union
     import merge_support
+    import transfer_support
+
+    # Committee-to-committee transfers come from itoth, which no engine scans otherwise
+    transfer = run_step("transfer_support.py", transfer_support.main, office_filter)
 
-    run_step("superpac_ie_support.py", superpac_ie_support.main, office_filter)
-    run_step("individual_support.py", individual_support.main, office_filter)
-    run_step("pac_support_corp_union.py", pac_support_corp_union.main, office_filter)
-    run_step("merge_support.py", merge_support.main, office_filter)
+    if engine == "polars":
+        # Lazy plans cover the support steps and the merge in one pass
+        import polars_engine
+        results = run_step("polars_engine.py",
+                           lambda office_filter: polars_engine.main(office_filter, frames={"transfer": transfer}),
+                           office_filter)
+        print(f"\n✓ {label} pipeline completed successfully\n")
+        return {**results, "transfer": transfer}
+
+    # Intermediates stay in memory; merge_support only reads them from disk when run on its own
+    if engine == "sql":
+        import sql_engine
+        frames = dict(run_step("sql_engine.py", sql_engine.main, office_filter))
+    else:
+        import superpac_ie_support
+        import individual_support
+        import pac_support_corp_union
+        frames = {
+            "superpac": run_step("superpac_ie_support.py", superpac_ie_support.main, office_filter),
+            "indiv": run_step("individual_support.py", individual_support.main, office_filter),
+            "pac": run_step("pac_support_corp_union.py", pac_support_corp_union.main, office_filter),
+        }
+    frames["transfer"] = transfer
+    merged = run_step("merge_support.py", lambda office_filter: merge_support.main(office_filter, frames=frames),
+                      office_filter)
     
     print(f"\n✓ {label} pipeline completed successfully\n")
+    return {**merged, **frames}
+
+OFFICE_RUNS = [({"S"}, "SENATE"), ({"P"}, "PRESIDENTIAL"), ({"S", "P"}, "TOTAL (SENATE + PRESIDENTIAL)")]
+
+# engine -> [(step, module, frame key, depends on the engine's support steps)]
+DAG_STEPS = {
+    "pandas": [("transfer_support", "transfer_support", "transfer", False),
+               ("superpac_ie_support", "superpac_ie_support", "superpac", False),
+               ("individual_support", "individual_support", "indiv", False),
+               ("pac_support_corp_union", "pac_support_corp_union", "pac", False),
+               ("merge_support", "merge_support", None, True)],
+    "sql": [("transfer_support", "transfer_support", "transfer", False),
+            ("sql_engine", "sql_engine", None, False),
+            ("merge_support", "merge_support", None, True)],
+    "polars": [("transfer_support", "transfer_support", "transfer", False),
+               ("polars_engine", "polars_engine", None, True)],
+}
+
+def run_pipelines_dag(engine, jobs, mem_budget_mb, overrides):
+    """Run all three office pipelines as one task graph (see dag.py); returns results like run_full_pipeline."""
+    import config
+    import dag
+    import plan
+
+    files = plan.input_files()
+    history = plan.load_history(config.OUT_DIR)
+    multithreaded = {"sql_engine", "polars_engine"}
+    # The first office's transfer step saves the itoth trace; the other offices' reuse it
+    first_transfer = f"{config.get_output_prefix(OFFICE_RUNS[0][0])}/transfer_support"
+    tasks = []
+    for office_filter, _ in OFFICE_RUNS:
+        prefix = config.get_output_prefix(office_filter)
+        support_keys = [f"{prefix}/{step}" for step, _, _, is_merge in DAG_STEPS[engine] if not is_merge]
+        for step, module, _, is_merge in DAG_STEPS[engine]:
+            est = plan.estimate_step(step, engine, plan.step_bytes(step, files), history)
+            cpus = jobs if step in multithreaded else 1
+            if is_merge:
+                deps = support_keys
+            elif step == "transfer_support" and f"{prefix}/{step}" != first_transfer:
+                deps = [first_transfer]
+            else:
+                deps = []
+            tasks.append(dag.Task(
+                key=f"{prefix}/{step}", step=step, module=module, func="main", office_filter=office_filter,
+                deps=deps, cpus=cpus,
+                mem_mb=est["peak_rss_mb"] or dag.DEFAULT_STEP_MEM_MB,
+                kwargs={"threads": cpus} if step == "sql_engine" else {},
+                env={"POLARS_MAX_THREADS": str(cpus)} if step == "polars_engine" else {},
+            ))
+
+    def support_frames(prefix, results):
+        # Frames of the office's finished support steps, keyed like run_full_pipeline's
+        frames = dict(results[f"{prefix}/sql_engine"]) if engine == "sql" else {}
+        frames.update({frame: results[f"{prefix}/{step}"]
+                       for step, _, frame, is_merge in DAG_STEPS[engine] if frame is not None})
+        return frames
+
+    def merge_frames(task, results):
+        # Hand the finished support frames to the office's merge, as the sequential path does
+        if task.step not in ("merge_support", "polars_engine"):
+            return {}
+        return {"frames": support_frames(task.key.split("/")[0], results)}
+
+    print("\n" + "█"*80)
+    print(f"█ TASK GRAPH: {len(tasks)} tasks | {jobs} CPUs | memory budget "
+          f"{'unlimited' if mem_budget_mb is None else f'{mem_budget_mb:,.0f} MB'}")
+    print("█"*80)
+    out = dag.run_dag(tasks, jobs, mem_budget_mb, overrides=overrides, make_kwargs=merge_frames)
+    dag.report(tasks, jobs, mem_budget_mb, path=config.OUT_DIR / "run_dag_report.json")
+
+    STEP_TIMINGS.extend((t.step, t.office_filter, t.seconds, t.peak_rss_mb) for t in tasks)
+    results = {}
+    for office_filter, _ in OFFICE_RUNS:
+        prefix = config.get_output_prefix(office_filter)
+        if engine == "polars":
+            results[prefix] = {**out[f"{prefix}/polars_engine"], **support_frames(prefix, out)}
+        else:
+            results[prefix] = {**out[f"{prefix}/merge_support"], **support_frames(prefix, out)}
+    return results
 
 def main():
     """Run the complete pipeline for Senate, Presidential, and Total (combined)."""
+    ap = argparse.ArgumentParser(description="Run the FEC candidate support pipeline.")
+    ap.add_argument("--incremental", action="store_true",
+                    help="Apply changes in republished itcont/itpas2 to stored totals instead of a full run")
+    ap.add_argument("--engine", choices=ENGINES, default="pandas",
+                    help="Aggregation engine for the support steps (sql needs duckdb, polars needs polars); "
+                         "the final tables are identical, the supplementary files are pandas-only")
+    ap.add_argument("--no-validate", action="store_true",
+                    help="Skip the in-process validation of the results")
+    ap.add_argument("--jobs", type=int, default=1,
+                    help="CPU budget; above 1 the steps of all offices run concurrently as a task graph")
+    ap.add_argument("--mem-budget", type=float, metavar="MB",
+                    help="Memory budget for concurrent steps (default: 80%% of RAM)")
+    ap.add_argument("--allocation", choices=["principal", "equal", "designation"],
+                    help="How individual receipts of multi-candidate committees are split (pandas engine; "
+                         "default: config.INDIV_ALLOCATION)")
+    ap.add_argument("--netting", choices=["gross", "net", "both"],
+                    help="Refunds and other negative amounts: dropped (gross), netted into the support columns (net) "
+                         "or reported in extra NET_ columns (both); pandas engine; default: config.NETTING_POLICY")
+    ap.add_argument("--reader", choices=["pandas", "arrow"],
+                    help="Bulk-file parser of the pandas engine: pandas, or arrow (memory-mapped, multi-threaded, "
+                         "needs pyarrow); outputs are identical; default: config.READER_BACKEND")
+    ap.add_argument("--plan", action="store_true",
+                    help="Only print inputs, time/memory estimates and current outputs (reads no full files)")
+    sample_args = ap.add_argument_group("partial development runs (outputs go to outputs_partial/)")
+    sample_args.add_argument("--sample-chunks", type=int, metavar="N",
+                             help="Only read the first N chunks of each bulk file")
+    sample_args.add_argument("--sample-committees", type=float, metavar="FRACTION",
+                             help="Deterministic hash sample of committees; totals are scaled by 1/FRACTION")
+    sample_args.add_argument("--sample-candidates", metavar="IDS",
+                             help="Comma-separated CAND_IDs to restrict the run to")
+    sample_args.add_argument("--sample-states", metavar="STATES",
+                             help="Comma-separated CAND_OFFICE_ST values to restrict the run to")
+    args = ap.parse_args()
+
+    if args.incremental:
+        # A refresh updates the stored totals of the last full run and ignores the run options
+        ignored = [flag for flag, value in [
+            ("--engine", args.engine != "pandas"), ("--allocation", args.allocation), ("--netting", args.netting),
+            ("--reader", args.reader), ("--plan", args.plan), ("--sample-chunks", args.sample_chunks),
+            ("--sample-committees", args.sample_committees), ("--sample-candidates", args.sample_candidates),
+            ("--sample-states", args.sample_states)] if value]
+        if ignored:
+            ap.error(f"--incremental cannot be combined with {', '.join(ignored)}; "
+                     "it refreshes the totals of the last full run")
+        import incremental
+        incremental.refresh()
+        return
+
+    import config
+    import sampling
+    if args.allocation is not None:
+        config.INDIV_ALLOCATION = args.allocation
+    if config.INDIV_ALLOCATION != "principal" and args.engine != "pandas":
+        ap.error(f"allocation '{config.INDIV_ALLOCATION}' is only supported by the pandas engine")
+    if args.netting is not None:
+        config.NETTING_POLICY = args.netting
+    if config.NETTING_POLICY != "gross" and args.engine != "pandas":
+        ap.error(f"netting '{config.NETTING_POLICY}' is only supported by the pandas engine")
+    if args.engine != "pandas":
+        skipped = ["in-state share and per-state individual support"]
+        skipped += [name for on, name in [
+            (config.BUILD_INDUSTRY_ROLLUP, "per-industry individual support"),
+            (config.SCREEN_DONOR_LIMITS, "donor limit flags"),
+            (config.BUILD_AMOUNT_SKETCHES, "amount sketches"),
+            (config.BUILD_TXN_INDEX, "transaction indexes"),
+        ] if on]
+        print(f"[run_all][WARN] --engine {args.engine} writes the final tables but no supplementary files; "
+              f"skipped: {', '.join(skipped)}, reconciliation ledgers")
+    if args.reader is not None:
+        config.READER_BACKEND = args.reader
+    if config.READER_BACKEND == "arrow":
+        try:
+            import pyarrow.csv  # noqa: F401
+        except ImportError:
+            ap.error("reader 'arrow' needs pyarrow (pip install pyarrow)")
+    if args.plan:
+        import plan
+        plan.print_plan(plan.build_plan(args.engine))
+        return
+    try:
+        sample = sampling.sample_from_args(args, index_dir=config.TOTAL_OUT_DIR)
+    except ValueError as e:
+        ap.error(str(e))
+    if sample.active:
+        if args.engine != "pandas":
+            ap.error("--sample-* options are only supported by the pandas engine")
+        # Never overwrite the full outputs with partial ones
+        config.SAMPLE = sample
+        config.set_output_root(config.CYCLE_DIR / "outputs_partial")
+
     print("\n" + "="*80)
     print("FEC CAMPAIGN FINANCE PIPELINE")
     print("="*80)
+    if sample.active:
+        print(f"PARTIAL RUN: {sample.to_dict()}")
+        print(f"Outputs -> {config.OUT_DIR}")
     print("\nThis will generate three sets of outputs:")
     print("  1. Senate candidates only")
     print("  2. Presidential candidates only")
@@ -40,25 +268,51 @@ def main():
     print("="*80)
     
     try:
-        # Run for Senate only
-        run_full_pipeline({"S"}, "SENATE")
-        
-        # Run for Presidential only
-        run_full_pipeline({"P"}, "PRESIDENTIAL")
-        
-        # Run for Total (both)
-        run_full_pipeline({"S", "P"}, "TOTAL (SENATE + PRESIDENTIAL)")
+        if args.jobs > 1:
+            import dag
+            mem_budget = args.mem_budget if args.mem_budget is not None else dag.default_mem_budget_mb()
+            overrides = {"sample": config.SAMPLE, "out_root": config.OUT_DIR if sample.active else None,
+                         "allocation": config.INDIV_ALLOCATION, "netting": config.NETTING_POLICY,
+                         "reader": config.READER_BACKEND}
+            results = run_pipelines_dag(args.engine, args.jobs, mem_budget, overrides)
+        else:
+            results = {}
+            # Run for Senate only
+            results["senate"] = run_full_pipeline({"S"}, "SENATE", args.engine)
+            
+            # Run for Presidential only
+            results["presidential"] = run_full_pipeline({"P"}, "PRESIDENTIAL", args.engine)
+            
+            # Run for Total (both)
+            results["total"] = run_full_pipeline({"S", "P"}, "TOTAL (SENATE + PRESIDENTIAL)", args.engine)
+
+        for office_filter in ({"S"}, {"P"}, {"S", "P"}):
+            config.write_run_manifest(
+                config.get_output_dir(office_filter), config.get_output_prefix(office_filter),
+                {"engine": args.engine, "partial": sample.active, "sample": sample.to_dict() if sample.active else None,
+                 "allocation": config.INDIV_ALLOCATION, "netting": config.NETTING_POLICY,
+                 "reader": config.READER_BACKEND},
+            )
         
         print("\n" + "█"*80)
         print("█ ALL PIPELINES COMPLETED SUCCESSFULLY")
         print("█"*80)
         print("\nOutput directories:")
-        from config import SENATE_OUT_DIR, PRESIDENTIAL_OUT_DIR, TOTAL_OUT_DIR
-        print(f"  Senate:       {SENATE_OUT_DIR}")
-        print(f"  Presidential: {PRESIDENTIAL_OUT_DIR}")
-        print(f"  Total:        {TOTAL_OUT_DIR}")
+        print(f"  Senate:       {config.SENATE_OUT_DIR}")
+        print(f"  Presidential: {config.PRESIDENTIAL_OUT_DIR}")
+        print(f"  Total:        {config.TOTAL_OUT_DIR}")
+        if sample.active:
+            print("  (PARTIAL outputs; see *_run_manifest_*.json)")
+        else:
+            print(f"Step timings -> {record_step_history(args.engine)}")
         print("="*80)
-        
+
+        if not args.no_validate:
+            # Check the frames just produced instead of re-reading every CSV
+            import validate_outputs
+            if not validate_outputs.validate(results):
+                sys.exit(1)
+
     except Exception as e:
         print("\n" + "█"*80)
         print("█ EXECUTION TERMINATED WITH ERROR")
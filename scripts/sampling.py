@@ -0,0 +1,140 @@
+"""
+Sampling and subset modes for fast development runs.
+
+A ``Sample`` describes which part of the cycle a development run looks at:
+
+    max_chunks     only the first N chunks of each bulk file
+    cmte_fraction  a deterministic hash sample of committees (CMTE_ID); the
+                   support totals are scaled by 1 / fraction
+    cand_ids       only these candidates ...
+    states         ... and/or candidates from these CAND_OFFICE_ST values
+
+With a candidate restriction, and when a full run has left a transaction
+index (txn_index.py) for the same source file, the support steps read only
+the indexed lines of the selected candidates instead of streaming the whole
+file.
+
+run_all.py sets ``config.SAMPLE`` from its ``--sample-*`` flags and sends the
+outputs to ``outputs_partial/``, next to a run manifest marked
+``"partial": true``. The full outputs are never overwritten by a sampled run.
+"""
+
+from __future__ import annotations
+
+import itertools
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from stream_reader import iter_chunks, iter_lines
+
+
+_HASH_KEY = "fec-cmte-sample0"  # 16 bytes, fixed so samples are stable across runs
+_HASH_BUCKETS = 1_000_000
+
+
+@dataclass(frozen=True)
+class Sample:
+    """Subset of the cycle to process; the default instance selects everything."""
+
+    max_chunks: int | None = None
+    cmte_fraction: float | None = None
+    cand_ids: frozenset = field(default_factory=frozenset)
+    states: frozenset = field(default_factory=frozenset)
+    index_dir: Path | None = None  # full-run output folder holding transaction indexes
+
+    @property
+    def active(self) -> bool:
+        return bool(self.max_chunks or self.cmte_fraction or self.cand_ids or self.states)
+
+    @property
+    def scale(self) -> float:
+        """Factor applied to support totals of a committee-sampled run."""
+        return 1.0 / self.cmte_fraction if self.cmte_fraction else 1.0
+
+    def to_dict(self) -> dict:
+        return {
+            "max_chunks": self.max_chunks,
+            "cmte_fraction": self.cmte_fraction,
+            "scale": self.scale,
+            "cand_ids": sorted(self.cand_ids),
+            "states": sorted(self.states),
+        }
+
+    def restrict_candidates(self, cn: pd.DataFrame) -> pd.DataFrame:
+        """Keep the selected candidates of a cn frame (unchanged without a restriction)."""
+        if self.cand_ids:
+            cn = cn[cn["CAND_ID"].isin(self.cand_ids)]
+        if self.states:
+            cn = cn[cn["CAND_OFFICE_ST"].isin(self.states)]
+        return cn
+
+    def cmte_table(self, cmte_codes) -> np.ndarray:
+        """
+        Membership table over an ``IdCodes`` dictionary of committee IDs:
+        True for committees in the hash sample. The trailing slot (unknown
+        committees) is True so those rows drop at their usual stage.
+        """
+        table = np.ones(len(cmte_codes) + 1, dtype=bool)
+        if self.cmte_fraction:
+            h = pd.util.hash_array(cmte_codes.ids.to_numpy(dtype=object), hash_key=_HASH_KEY)
+            table[:-1] = (h % _HASH_BUCKETS) < int(round(self.cmte_fraction * _HASH_BUCKETS))
+        return table
+
+    def iter_chunks(self, path: Path, names: list, chunksize: int, category: str, cand_ids=None, **kwargs):
+        """
+        ``stream_reader.iter_chunks`` for a support step, limited to the first
+        ``max_chunks`` chunks; with a candidate restriction, seeks through the
+        full run's ``category`` index (total office) for ``cand_ids`` when a
+        fresh one exists.
+        """
+        reader = None
+        if (self.cand_ids or self.states) and cand_ids is not None:
+            lines = self._indexed_lines(path, category, cand_ids)
+            if lines is not None:
+                offsets, lengths = lines
+                print(f"[sampling] {Path(path).name}: seeking {len(offsets):,} indexed lines ({category})")
+                reader = iter_lines(path, names, offsets, lengths, chunksize, **kwargs)
+        if reader is None:
+            reader = iter_chunks(path, names, chunksize, **kwargs)
+        if self.max_chunks:
+            reader = itertools.islice(reader, self.max_chunks)
+        return reader
+
+    def _indexed_lines(self, path: Path, category: str, cand_ids):
+        from config import SUFFIX, INDIV_ALLOCATION
+        from txn_index import TxnIndex, index_path
+
+        if self.index_dir is None:
+            return None
+        ix_path = index_path(self.index_dir, "total", category, SUFFIX)
+        if not ix_path.exists():
+            return None
+        idx = TxnIndex(ix_path)
+        if idx.source_path.resolve() != Path(path).resolve() or idx.is_stale():
+            return None
+        # itcont lines are indexed under the candidates of the rule that built the index
+        if category == "individual" and idx.allocation != INDIV_ALLOCATION:
+            return None
+        parts = [idx.lookup(c) for c in sorted(set(cand_ids))]
+        if not parts:
+            return idx.offsets[:0], idx.lengths[:0]
+        # A multi-candidate committee's line is indexed under each of its candidates
+        offsets, first = np.unique(np.concatenate([p[0] for p in parts]), return_index=True)
+        return offsets, np.concatenate([p[1] for p in parts])[first]
+
+
+def sample_from_args(args, index_dir: Path | None = None) -> Sample:
+    """Build a Sample from run_all's ``--sample-*`` arguments."""
+    fraction = args.sample_committees
+    if fraction is not None and not 0 < fraction <= 1:
+        raise ValueError(f"--sample-committees must be in (0, 1], got {fraction}")
+    return Sample(
+        max_chunks=args.sample_chunks,
+        cmte_fraction=fraction if fraction not in (None, 1) else None,
+        cand_ids=frozenset(c.strip().upper() for c in (args.sample_candidates or "").split(",") if c.strip()),
+        states=frozenset(s.strip().upper() for s in (args.sample_states or "").split(",") if s.strip()),
+        index_dir=index_dir,
+    )
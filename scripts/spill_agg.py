@@ -0,0 +1,330 @@
+"""
+Grouped sums over high-cardinality keys with bounded memory.
+
+The support steps sum into (candidate x slot) arrays, which only works while
+the key space fits in RAM. A ``SpillAggregator`` takes keys of any
+cardinality - (CAND_ID, CMTE_ID, TRANSACTION_DT), (donor, CAND_ID), ... -
+and works in two phases:
+
+1. ``add`` buffers the integer key columns and value columns of each chunk.
+   Once ``buffer_rows`` rows are buffered they are pre-summed by key (unless
+   ``combine=False``), hash-partitioned on the key into ``n_buckets`` and
+   appended to one binary spill file per bucket.
+2. ``iter_groups`` reduces every bucket on its own and yields one DataFrame
+   per bucket. A key lives in exactly one bucket, so its sums are final.
+   Buckets are reduced on ``jobs`` threads. A bucket that is still larger than
+   ``max_bucket_bytes`` is split again with another hash seed before loading.
+
+Keys must be integers: encode IDs with ``IdCodes`` and decode the reduced
+frames. Memory is about ``buffer_rows`` records while streaming and one
+bucket per thread while reducing. ``reduce`` can replace the grouped sum
+with any function of a bucket's rows (with ``combine=False`` it sees the raw
+rows).
+
+    agg = SpillAggregator({"CAND": np.int32, "CMTE": np.int32, "DT": np.int32}, {"AMT": np.float64})
+    with agg:
+        for chunk in reader:
+            agg.add({"CAND": cand, "CMTE": cmte, "DT": dt}, {"AMT": amt})
+        for frame in agg.iter_groups(jobs=4):
+            ...
+
+    python spill_agg.py itpas2 --by CAND_ID CMTE_ID TRANSACTION_DT --out cand_cmte_day.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import shutil
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+MAX_DEPTH = 3   # re-partitioning rounds for buckets that stay over max_bucket_bytes
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_M1 = np.uint64(0xBF58476D1CE4E5B9)
+_M2 = np.uint64(0x94D049BB133111EB)
+
+
+def _mix(h: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer (uint64 arrays wrap on overflow)."""
+    h = (h ^ (h >> np.uint64(30))) * _M1
+    h = (h ^ (h >> np.uint64(27))) * _M2
+    return h ^ (h >> np.uint64(31))
+
+
+def _as_u64(col: np.ndarray) -> np.ndarray:
+    col = np.asarray(col)
+    return col if col.dtype == np.uint64 else col.astype(np.int64).view(np.uint64)
+
+
+def hash_keys(columns, seed: int = 0) -> np.ndarray:
+    """64-bit hash per row of integer key columns; ``seed`` gives an independent hash."""
+    h = np.full(len(columns[0]), seed, dtype=np.uint64) * _GOLDEN
+    for col in columns:
+        h = _mix(h ^ (_as_u64(col) + _GOLDEN))
+    return h
+
+
+class SpillAggregator:
+    """Hash-partitioned grouped sum that spills to ``n_buckets`` files (see module docstring)."""
+
+    def __init__(self, keys: dict, values: dict, n_buckets: int = 64, buffer_rows: int = 4_000_000,
+                 spill_dir=None, max_bucket_bytes: int = 1 << 30, combine: bool = True, seed: int = 0):
+        self.key_names = list(keys)
+        self.value_names = list(values)
+        self.dtype = np.dtype([(k, np.dtype(t)) for k, t in {**keys, **values}.items()])
+        self.n_buckets = n_buckets
+        self.buffer_rows = buffer_rows
+        self.max_bucket_bytes = max_bucket_bytes
+        self.combine = combine
+        self.seed = seed
+        if spill_dir is not None:
+            Path(spill_dir).mkdir(parents=True, exist_ok=True)
+        self.dir = Path(tempfile.mkdtemp(prefix="spill_", dir=spill_dir))
+        self.bucket_bytes = np.zeros(n_buckets, dtype=np.int64)
+        self.rows_in = 0
+        self.rows_spilled = 0
+        self.flushes = 0
+        self._buffer: list[np.ndarray] = []
+        self._buffered = 0
+        self._children: dict[int, SpillAggregator] = {}  # re-partitioned oversized buckets
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        """Delete the spill files."""
+        for child in self._children.values():
+            child.close()
+        self._children.clear()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def bucket_path(self, b: int) -> Path:
+        return self.dir / f"bucket_{b:04d}.bin"
+
+    def add(self, keys: dict, values: dict) -> None:
+        """Buffer one chunk: ``keys``/``values`` map column name -> equal-length arrays."""
+        n = len(next(iter(keys.values())))
+        if n == 0:
+            return
+        recs = np.empty(n, dtype=self.dtype)
+        for name, col in {**keys, **values}.items():
+            recs[name] = col
+        self.add_records(recs)
+
+    def add_records(self, recs: np.ndarray) -> None:
+        """Buffer rows already in the record layout (``self.dtype``)."""
+        self._buffer.append(recs)
+        self._buffered += len(recs)
+        self.rows_in += len(recs)
+        if self._buffered >= self.buffer_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """Pre-sum the buffer (``combine``) and append it to the bucket files."""
+        if not self._buffer:
+            return
+        recs = np.concatenate(self._buffer)
+        self._buffer, self._buffered = [], 0
+        if self.combine:
+            recs = self._to_records(self._sum(self._to_frame(recs), sort=False))
+        bucket = (hash_keys([recs[k] for k in self.key_names], self.seed) % np.uint64(self.n_buckets)).astype(np.int64)
+        order = np.argsort(bucket, kind="stable")
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(bucket, minlength=self.n_buckets))])
+        recs = recs[order]
+        for b in np.flatnonzero(np.diff(bounds)):
+            part = recs[bounds[b]:bounds[b + 1]]
+            self.bucket_bytes[b] += part.nbytes
+            if b in self._children:
+                # Already re-partitioned by an earlier iter_groups
+                self._children[b].add_records(part)
+                continue
+            with open(self.bucket_path(b), "ab") as f:
+                part.tofile(f)
+        self.rows_spilled += len(recs)
+        self.flushes += 1
+
+    def _to_frame(self, recs: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame({name: recs[name] for name in self.dtype.names})
+
+    def _to_records(self, df: pd.DataFrame) -> np.ndarray:
+        recs = np.empty(len(df), dtype=self.dtype)
+        for name in self.dtype.names:
+            recs[name] = df[name].to_numpy()
+        return recs
+
+    def _sum(self, df: pd.DataFrame, sort: bool = True) -> pd.DataFrame:
+        return df.groupby(self.key_names, sort=sort, as_index=False)[self.value_names].sum()
+
+    def _load(self, b: int, reduce) -> pd.DataFrame:
+        frame = self._to_frame(np.fromfile(self.bucket_path(b), dtype=self.dtype))
+        return reduce(frame) if reduce is not None else self._sum(frame)
+
+    def _split(self, b: int, depth: int):
+        """Re-partition an oversized bucket with the next seed into a child aggregator that replaces its file."""
+        child = SpillAggregator(
+            dict(zip(self.key_names, [self.dtype[k] for k in self.key_names])),
+            dict(zip(self.value_names, [self.dtype[v] for v in self.value_names])),
+            n_buckets=self.n_buckets, buffer_rows=self.buffer_rows, spill_dir=self.dir,
+            max_bucket_bytes=self.max_bucket_bytes, combine=self.combine, seed=self.seed + depth + 1,
+        )
+        data = np.memmap(self.bucket_path(b), dtype=self.dtype, mode="r")
+        for start in range(0, len(data), self.buffer_rows):
+            child.add_records(np.array(data[start:start + self.buffer_rows]))
+        del data
+        self.bucket_path(b).unlink()
+        self._children[b] = child
+        return child
+
+    def iter_groups(self, jobs: int = 1, reduce=None, _depth: int = 0):
+        """
+        Yield the reduced frame of every non-empty bucket in bucket order.
+        ``reduce(frame) -> frame`` defaults to the grouped sum (keys sorted
+        within a bucket). At most ``2 * jobs`` buckets are loaded at once.
+        """
+        self.flush()
+        buckets = [int(b) for b in np.flatnonzero(self.bucket_bytes)]
+        oversized = {b for b in buckets
+                     if b in self._children or (self.bucket_bytes[b] > self.max_bucket_bytes and _depth < MAX_DEPTH)}
+        if jobs <= 1:
+            for b in buckets:
+                if b in oversized:
+                    yield from self._iter_split(b, jobs, reduce, _depth)
+                else:
+                    yield self._load(b, reduce)
+            return
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            pending = deque()
+            for b in buckets:
+                if b in oversized:
+                    while pending:
+                        yield pending.popleft().result()
+                    yield from self._iter_split(b, jobs, reduce, _depth)
+                    continue
+                pending.append(pool.submit(self._load, b, reduce))
+                if len(pending) >= 2 * jobs:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _iter_split(self, b: int, jobs: int, reduce, depth: int):
+        child = self._children.get(b) or self._split(b, depth)
+        yield from child.iter_groups(jobs, reduce, _depth=depth + 1)
+
+    def aggregate(self, jobs: int = 1, reduce=None) -> pd.DataFrame:
+        """All bucket results in one frame (only when the result fits in memory)."""
+        frames = list(self.iter_groups(jobs, reduce))
+        if not frames:
+            return pd.DataFrame({name: pd.Series(dtype=self.dtype[name]) for name in self.dtype.names})
+        return pd.concat(frames, ignore_index=True)
+
+    def stats(self) -> dict:
+        return {"rows_in": self.rows_in, "rows_spilled": self.rows_spilled, "flushes": self.flushes,
+                "spill_mb": round(float(self.bucket_bytes.sum()) / 1e6, 1),
+                "largest_bucket_mb": round(float(self.bucket_bytes.max()) / 1e6, 1)}
+
+
+# ---------------------------------------------------------------------------
+# CLI: grouped TRANSACTION_AMT sums of a bulk file at any granularity
+# ---------------------------------------------------------------------------
+
+ID_KEYS = ("CMTE_ID", "CAND_ID", "OTHER_ID")
+INT_KEYS = ("TRANSACTION_DT", "ZIP_CODE")
+
+
+def _int_key(values: pd.Series, name: str) -> np.ndarray:
+    """TRANSACTION_DT MMDDYYYY -> YYYYMMDD, ZIP_CODE -> its first five digits; -1 when unparseable."""
+    text = values.astype("string")
+    if name == "TRANSACTION_DT":
+        text = text.str[4:8] + text.str[0:4]
+    else:
+        text = text.str[:5]
+    return pd.to_numeric(text, errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+
+
+def _id_key(values: pd.Series, ids, extra: dict) -> np.ndarray:
+    """Codes of ``ids``; IDs missing from cm/cn get codes after them, recorded in ``extra``; -1 when blank."""
+    codes = ids.encode(values)
+    unknown = np.flatnonzero(codes < 0)
+    if len(unknown):
+        raw = values.iloc[unknown]
+        for v in raw.dropna().unique():
+            extra.setdefault(v, len(ids) + len(extra))
+        codes[unknown] = raw.map(extra).fillna(-1).to_numpy(dtype=np.int32)
+    return codes
+
+
+def main(argv=None) -> None:
+    from config import (CM_DIR, CN_DIR, INDIV_DIR, PAS2_DIR, OTH_DIR, CM_COLS, CN_COLS, INDIV_COLS, ITPAS2_COLS,
+                        ITOTH_COLS, CHUNKSIZE, SPILL_BUCKETS, SPILL_BUFFER_ROWS, SPILL_DIR)
+    from id_codes import IdCodes
+    from individual_support import _find_file
+    from stream_reader import iter_chunks
+
+    sources = {"itcont": (INDIV_DIR, INDIV_COLS), "itpas2": (PAS2_DIR, ITPAS2_COLS), "itoth": (OTH_DIR, ITOTH_COLS)}
+    ap = argparse.ArgumentParser(description="Sum TRANSACTION_AMT of a bulk file by any key columns, spilling to disk.")
+    ap.add_argument("source", choices=sorted(sources))
+    ap.add_argument("--by", nargs="+", required=True, choices=ID_KEYS + INT_KEYS,
+                    help="Group-by columns (CAND_ID is only in itpas2)")
+    ap.add_argument("--out", type=Path, required=True, help="Output CSV")
+    ap.add_argument("--jobs", type=int, default=1, help="Buckets reduced concurrently")
+    ap.add_argument("--buckets", type=int, default=SPILL_BUCKETS)
+    args = ap.parse_args(argv)
+
+    folder, cols = sources[args.source]
+    path = _find_file(folder, args.source)
+    by = list(dict.fromkeys(args.by))
+    missing = [k for k in by if k not in cols]
+    if missing:
+        ap.error(f"{args.source} has no {', '.join(missing)} column; choose --by from "
+                 f"{', '.join(k for k in ID_KEYS + INT_KEYS if k in cols)}")
+    ids = None
+    if any(k in ID_KEYS for k in by):
+        cm = pd.read_csv(_find_file(CM_DIR, "cm"), sep="|", header=None, names=CM_COLS, dtype=str, usecols=["CMTE_ID"],
+                         encoding_errors="ignore")
+        cn = pd.read_csv(_find_file(CN_DIR, "cn"), sep="|", header=None, names=CN_COLS, dtype=str, usecols=["CAND_ID"],
+                         encoding_errors="ignore")
+        ids = IdCodes(cm["CMTE_ID"], cn["CAND_ID"])
+    extra = {}
+    keys = {k: np.int32 if k in ID_KEYS else np.int64 for k in by}
+
+    t0 = time.perf_counter()
+    with SpillAggregator(keys, {"TRANSACTION_AMT": np.float64, "N": np.int64}, n_buckets=args.buckets,
+                         buffer_rows=SPILL_BUFFER_ROWS, spill_dir=SPILL_DIR) as agg:
+        for chunk in iter_chunks(path, cols, CHUNKSIZE):
+            amt = pd.to_numeric(chunk["TRANSACTION_AMT"], errors="coerce").fillna(0.0).to_numpy()
+            agg.add({k: _id_key(chunk[k], ids, extra) if k in ID_KEYS else _int_key(chunk[k], k) for k in by},
+                    {"TRANSACTION_AMT": amt, "N": np.ones(len(chunk), dtype=np.int64)})
+        agg.flush()
+        st = agg.stats()
+        print(f"[spill_agg] {st['rows_in']:,} rows -> {st['rows_spilled']:,} spilled in {st['flushes']} flushes "
+              f"({st['spill_mb']:,} MB, largest bucket {st['largest_bucket_mb']:,} MB)")
+
+        # IDs missing from cm/cn follow the known ones; blank IDs (-1) read the trailing blank entry
+        id_table = (np.concatenate([ids.ids.to_numpy(), np.array(list(extra), dtype=object), [""]])
+                    if ids is not None else None)
+        n_groups = 0
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, "w", newline="", encoding="utf-8") as out:
+            pd.DataFrame(columns=by + ["TRANSACTION_AMT", "N"]).to_csv(out, index=False)
+            for frame in agg.iter_groups(jobs=args.jobs):
+                for k in by:
+                    if k in ID_KEYS:
+                        frame[k] = id_table[frame[k].to_numpy()]
+                frame.to_csv(out, index=False, header=False)
+                n_groups += len(frame)
+    print(f"[spill_agg] {n_groups:,} groups -> {args.out} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
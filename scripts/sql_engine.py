@@ -0,0 +1,177 @@
+"""
+Embedded SQL (DuckDB) engine for the three support steps.
+
+The small dimension tables (candidate universe, committee -> candidate
+linkage, committee types) are built with the same pandas code the support
+scripts use and registered with DuckDB; the bulk files are then scanned once
+each by DuckDB's parallel CSV reader as filtered GROUP BYs:
+
+    itcont -> INDIVIDUAL_SUPPORT
+    itpas2 -> SUPERPAC_IE_SUPPORT, the PAC columns per ORG_TP and PARTY_SUPPORT (one scan)
+
+The intermediates are written with write_intermediate under the same names
+as the pandas path and returned for merge_support, so the final CSVs are
+identical. Amount sketches, transaction indexes and reconciliation ledgers
+are only built by the pandas path.
+
+Requires ``pip install duckdb``. Select with ``python run_all.py --engine sql``.
+"""
+
+from __future__ import annotations
+
+import os
+
+import pandas as pd
+
+from config import (TARGET_ELECTION_YR, PAC_ORG_TYPES, LEADERSHIP_PAC_COL, PARTY_SUPPORT_COL, PARTY_CMTE_TYPES,
+                    PARTY_TRANSACTION_TYPES, write_intermediate, get_output_dir, get_output_prefix)
+from individual_support import _build_cmte_to_cand, _find_file
+
+
+def _read_dim(path, cols) -> pd.DataFrame:
+    return pd.read_csv(path, sep="|", header=None, names=cols, dtype=str, encoding_errors="ignore")
+
+
+def _candidates(cn: pd.DataFrame, office_filter: set) -> pd.DataFrame:
+    """(CAND_ID, CAND_ELECTION_YR) for the office/year universe, as in the support scripts."""
+    cn = cn[cn["CAND_OFFICE"].isin(office_filter)].copy()
+    cn["CAND_ELECTION_YR"] = cn["CAND_ELECTION_YR"].astype(str).str.extract(r"(\d{4})", expand=False)
+    cn = cn[cn["CAND_ELECTION_YR"] == TARGET_ELECTION_YR]
+    return cn.dropna(subset=["CAND_ID"]).drop_duplicates("CAND_ID")[["CAND_ID", "CAND_ELECTION_YR"]]
+
+
+def _scan(path, cols) -> str:
+    """DuckDB table function matching stream_reader.iter_chunks' parsing of a bulk file."""
+    spec = ", ".join(f"'{c}': 'VARCHAR'" for c in cols)
+    # No quoting, short lines padded with NULL, over-long lines skipped,
+    # undecodable bytes kept (latin-1) so the row survives as it does in pandas.
+    return (
+        f"read_csv('{path}', delim='|', header=false, quote='', escape='', columns={{{spec}}}, "
+        f"auto_detect=false, null_padding=true, ignore_errors=true, encoding='latin-1')"
+    )
+
+
+def _finish(df: pd.DataFrame, cols: list, sort_cols: list) -> pd.DataFrame:
+    """Same layout/dtypes/order as the pandas intermediates."""
+    df = df[cols].astype({c: "float64" for c in cols[2:]})
+    return df.sort_values(sort_cols, ascending=False, kind="stable").reset_index(drop=True)
+
+
+def main(office_filter=None, threads=None):
+    """
+    Run all three support steps for one office type through DuckDB.
+
+    Args:
+        office_filter: Set of office codes to include (e.g., {'S'}, {'P'}, or {'S', 'P'})
+        threads: DuckDB worker threads (default: all cores)
+
+    Returns:
+        Dict of typed intermediates keyed 'superpac', 'indiv' and 'pac',
+        ready for merge_support.main(..., frames=...).
+    """
+    import duckdb
+    from config import (CM_DIR, CN_DIR, CCL_DIR, INDIV_DIR, PAS2_DIR, CM_COLS, CN_COLS, CCL_COLS,
+                        INDIV_COLS, ITPAS2_COLS, SUFFIX, VALID_OFFICES, SPLIT_LEADERSHIP_PACS)
+
+    if office_filter is None:
+        office_filter = VALID_OFFICES
+    office_filter = set(office_filter)
+
+    out_dir = get_output_dir(office_filter)
+    prefix = get_output_prefix(office_filter)
+
+    cm = _read_dim(_find_file(CM_DIR, "cm"), CM_COLS)
+    cn = _read_dim(_find_file(CN_DIR, "cn"), CN_COLS)
+    ccl = _read_dim(_find_file(CCL_DIR, "ccl"), CCL_COLS)
+    indiv_path = _find_file(INDIV_DIR, "itcont")
+    itpas2_path = _find_file(PAS2_DIR, "itpas2")
+
+    cands = _candidates(cn, office_filter)
+    cmte_to_cand = pd.DataFrame(list(_build_cmte_to_cand(ccl).items()), columns=["CMTE_ID", "CAND_ID"])
+    cm["CMTE_TP"] = cm["CMTE_TP"].fillna("")
+    cm["ORG_TP"] = cm["ORG_TP"].fillna("")
+    cmte_types = cm.drop_duplicates("CMTE_ID", keep="last")[["CMTE_ID", "CMTE_TP", "ORG_TP"]]
+    print(f"[sql_engine][{prefix}] {len(cands):,} candidates | {len(cmte_to_cand):,} linked committees")
+
+    con = duckdb.connect()
+    con.execute(f"SET threads = {int(threads or os.cpu_count() or 1)}")
+    con.register("cands", cands)
+    con.register("cmte_to_cand", cmte_to_cand)
+    # Membership sets in the pandas path come from every cm row, types from the last one
+    con.register("superpac_ids", cm.loc[cm["CMTE_TP"] == "O", ["CMTE_ID"]].drop_duplicates())
+    pac_ids = cm.loc[cm["CMTE_TP"].isin(["Q", "N"]), ["CMTE_ID"]].drop_duplicates()
+    con.register("pac_ids", pac_ids)
+    # A committee also listed as a PAC counts as a PAC
+    party_ids = cm.loc[cm["CMTE_TP"].isin(PARTY_CMTE_TYPES) & ~cm["CMTE_ID"].isin(pac_ids["CMTE_ID"]), ["CMTE_ID"]]
+    con.register("party_ids", party_ids.drop_duplicates())
+    con.register("cmte_types", cmte_types)
+    con.register("leadership_ids", cm.loc[cm["CMTE_DSGN"] == "D", ["CMTE_ID"]].drop_duplicates())
+
+    party_types = ", ".join(f"'{t}'" for t in PARTY_TRANSACTION_TYPES)
+    pac_cols = list(PAC_ORG_TYPES.values()) + [PARTY_SUPPORT_COL]
+    pac_sums = [f"SUM(amt) FILTER (WHERE is_pac AND ORG_TP = '{t}') AS {col}" for t, col in PAC_ORG_TYPES.items()]
+    pac_sums.append(f"SUM(amt) FILTER (WHERE is_party AND TRANSACTION_TP IN ({party_types})) AS {PARTY_SUPPORT_COL}")
+    if SPLIT_LEADERSHIP_PACS:
+        pac_cols.append(LEADERSHIP_PAC_COL)
+        pac_sums.append(f"SUM(amt) FILTER (WHERE is_pac AND is_leadership) AS {LEADERSHIP_PAC_COL}")
+    org_types = ", ".join(f"'{t}'" for t in PAC_ORG_TYPES)
+
+    print(f"[sql_engine][{prefix}] Scanning itcont:", indiv_path)
+    indiv = con.execute(f"""
+        WITH t AS (
+            SELECT m.CAND_ID, TRY_CAST(i.TRANSACTION_AMT AS DOUBLE) AS amt
+            FROM {_scan(indiv_path, INDIV_COLS)} i
+            JOIN cmte_to_cand m ON m.CMTE_ID = i.CMTE_ID
+            WHERE i.TRANSACTION_TP IN ('15', '15E') AND i.ENTITY_TP = 'IND'
+        )
+        SELECT c.CAND_ID, c.CAND_ELECTION_YR, SUM(t.amt) AS INDIVIDUAL_SUPPORT
+        FROM t JOIN cands c ON c.CAND_ID = t.CAND_ID
+        WHERE t.amt > 0
+        GROUP BY c.CAND_ID, c.CAND_ELECTION_YR
+    """).df()
+
+    print(f"[sql_engine][{prefix}] Scanning itpas2:", itpas2_path)
+    pas = con.execute(f"""
+        WITH t AS (
+            SELECT p.CAND_ID, p.TRANSACTION_TP, TRY_CAST(p.TRANSACTION_AMT AS DOUBLE) AS amt,
+                   p.CMTE_ID IN (SELECT CMTE_ID FROM superpac_ids) AS is_superpac,
+                   p.CMTE_ID IN (SELECT CMTE_ID FROM pac_ids) AS is_pac,
+                   p.CMTE_ID IN (SELECT CMTE_ID FROM party_ids) AS is_party,
+                   p.CMTE_ID IN (SELECT CMTE_ID FROM leadership_ids) AS is_leadership,
+                   ct.ORG_TP
+            FROM {_scan(itpas2_path, ITPAS2_COLS)} p
+            LEFT JOIN cmte_types ct ON ct.CMTE_ID = p.CMTE_ID
+        )
+        SELECT c.CAND_ID, c.CAND_ELECTION_YR,
+               SUM(amt) FILTER (WHERE is_superpac AND TRANSACTION_TP = '24E') AS SUPERPAC_IE_SUPPORT,
+               {", ".join(pac_sums)}
+        FROM t JOIN cands c ON c.CAND_ID = t.CAND_ID
+        WHERE t.amt > 0
+          AND ((is_superpac AND TRANSACTION_TP = '24E')
+               OR (is_pac AND TRANSACTION_TP NOT IN ('24E', '24A') AND ORG_TP IN ({org_types}))
+               OR (is_party AND TRANSACTION_TP IN ({party_types})))
+        GROUP BY c.CAND_ID, c.CAND_ELECTION_YR
+    """).df()
+    con.close()
+
+    superpac = _finish(pas[pas["SUPERPAC_IE_SUPPORT"].notna()],
+                       ["CAND_ID", "CAND_ELECTION_YR", "SUPERPAC_IE_SUPPORT"], ["SUPERPAC_IE_SUPPORT"])
+    pac_rows = pas[pas[list(PAC_ORG_TYPES.values()) + [PARTY_SUPPORT_COL]].notna().any(axis=1)]
+    pac_rows = pac_rows.fillna({c: 0.0 for c in pac_cols})
+    pac = _finish(pac_rows, ["CAND_ID", "CAND_ELECTION_YR"] + pac_cols, ["CORP_PAC_SUPPORT", "NONCONNECTED_PAC_SUPPORT"])
+    indiv = _finish(indiv, ["CAND_ID", "CAND_ELECTION_YR", "INDIVIDUAL_SUPPORT"], ["INDIVIDUAL_SUPPORT"])
+
+    frames = {"superpac": superpac, "indiv": indiv, "pac": pac}
+    names = {
+        "superpac": f"{prefix}_superpac_ie_support_{SUFFIX}",
+        "indiv": f"{prefix}_individual_support_{SUFFIX}",
+        "pac": f"{prefix}_pac_support_corp_nonconnected_{SUFFIX}",
+    }
+    for key, df in frames.items():
+        path = write_intermediate(df, out_dir, names[key])
+        print(f"[sql_engine][{prefix}] Wrote: {path} ({len(df):,} candidates)")
+    return frames
+
+
+if __name__ == "__main__":
+    main()
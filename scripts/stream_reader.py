@@ -0,0 +1,269 @@
+"""
+Byte-level chunk reader for the pipe-delimited FEC bulk files.
+
+Replaces the chunked ``pd.read_csv`` calls in the support scripts. The file is
+read in newline-aligned byte blocks, so every parsed row keeps the byte offset
+of its source line (the DataFrame index). Lines with too many fields are
+dropped before parsing, which matches ``on_bad_lines="skip"``; short lines are
+padded with NaN as before.
+
+Two parser backends sit behind the same ``iter_chunks`` interface
+(``READER_BACKEND`` in config.py):
+
+- "pandas": blocks are read into memory and parsed by the pandas C parser
+  (one thread)
+- "arrow": the file is memory-mapped and each block (a zero-copy slice of the
+  map) is parsed by pyarrow's multi-threaded CSV reader. Delimiter '|', no
+  quoting, every column typed as string and pandas' missing-value spellings,
+  so the chunks are identical to the pandas backend's. A block with short
+  lines or invalid UTF-8 goes to the pandas parser instead (``stats``
+  counts these ``arrow_fallback_blocks``).
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+LINE_LEN_COL = "__LINE_LEN"
+BACKENDS = ("pandas", "arrow")
+_SAMPLE_BYTES = 1 << 20
+_NL, _CR, _PIPE = 10, 13, 124
+_BLANK_BYTES = (9, 13, 32)  # pandas skips lines made only of tab, CR and space
+# pandas' default na_values, so the arrow backend reads the same fields as missing
+_NA_VALUES = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN", "<NA>",
+              "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"]
+
+
+def _iter_blocks(path: Path, block_bytes: int):
+    """Yield (start_offset, bytes) blocks that end on a line boundary."""
+    with open(path, "rb") as f:
+        base = 0
+        tail = b""
+        while True:
+            data = f.read(block_bytes)
+            if not data:
+                if tail:
+                    yield base, tail
+                return
+            buf = tail + data if tail else data
+            cut = buf.rfind(b"\n")
+            if cut < 0:
+                tail = buf
+                continue
+            yield base, buf[:cut + 1]
+            base += cut + 1
+            tail = buf[cut + 1:]
+
+
+def _iter_mapped_blocks(path: Path, block_bytes: int):
+    """Yield (start_offset, pyarrow.Buffer) blocks of the memory-mapped file that end on a line boundary."""
+    import pyarrow as pa
+
+    with pa.memory_map(str(path), "r") as mm:
+        whole = mm.read_buffer()  # zero-copy view of the mapping
+        size = whole.size
+        base = 0
+        while base < size:
+            n = min(block_bytes, size - base)
+            buf = whole.slice(base, n)
+            if base + n < size:
+                arr = np.frombuffer(buf, dtype=np.uint8)
+                window = 1 << 16
+                while True:
+                    nl = np.flatnonzero(arr[-window:] == _NL)
+                    if nl.size or window >= n:
+                        break
+                    window *= 4
+                if nl.size == 0:
+                    # One line longer than the block: grow the block
+                    block_bytes *= 2
+                    continue
+                n = n - min(window, n) + int(nl[-1]) + 1
+                buf = buf.slice(0, n)
+            yield base, buf
+            base += n
+
+
+def _block_bytes_for(path: Path, chunksize: int) -> int:
+    """Translate a row chunksize into a byte block size using the first 1 MB."""
+    with open(path, "rb") as f:
+        sample = f.read(_SAMPLE_BYTES)
+    n_lines = sample.count(b"\n")
+    avg = len(sample) / n_lines if n_lines else len(sample) or 1
+    return max(_SAMPLE_BYTES, int(chunksize * avg))
+
+
+def _parse_block(block, names: list, usecols=None, backend: str = "pandas",
+                 stats: dict | None = None) -> tuple[pd.DataFrame, np.ndarray, np.ndarray, int]:
+    """Parse one block; return (frame, line starts, line lengths, malformed count)."""
+    arr = np.frombuffer(block, dtype=np.uint8)
+    # Both parsers also end a line at a lone CR (e.g. one inside MEMO_TEXT); blank
+    # those out so the rows match the LF line geometry (offsets and lengths unchanged)
+    cr = np.flatnonzero(arr[:-1] == _CR)
+    lone_cr = cr[arr[cr + 1] != _NL]
+    if lone_cr.size:
+        arr = arr.copy()
+        arr[lone_cr] = ord(" ")
+        block = arr.tobytes()
+    ends = np.flatnonzero(arr == _NL)
+    if ends.size == 0 or ends[-1] != len(arr) - 1:
+        ends = np.append(ends, len(arr))
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    line_len = ends - starts
+
+    pipes = np.flatnonzero(arr == _PIPE)
+    n_pipes = np.searchsorted(pipes, ends) - np.searchsorted(pipes, starts)
+    blank = line_len == 0
+    # Whitespace-only lines have no pipes; check just those few
+    for i in np.flatnonzero((n_pipes == 0) & ~blank):
+        blank[i] = np.isin(arr[starts[i]:ends[i]], _BLANK_BYTES).all()
+    too_long = n_pipes > len(names) - 1
+    good = ~blank & ~too_long
+
+    if good.all():
+        data = block
+    else:
+        keep = np.repeat(good, np.minimum(line_len + 1, len(arr) - starts))
+        data = arr[keep].tobytes()
+
+    df = None
+    if backend == "arrow":
+        # Arrow cannot pad short lines with nulls; those blocks take the pandas path
+        if (n_pipes[good] == len(names) - 1).all():
+            df = _read_arrow(data, names, usecols)
+        if df is None and stats is not None:
+            stats["arrow_fallback_blocks"] = stats.get("arrow_fallback_blocks", 0) + 1
+    if df is None:
+        df = pd.read_csv(
+            io.BytesIO(data), sep="|", header=None, names=names,
+            dtype=str, encoding_errors="ignore", quoting=csv.QUOTE_NONE, usecols=usecols,
+        )
+    if len(df) != int(good.sum()):
+        # The parser skipped or split a line we counted: redo the block line by line
+        print(f"[stream_reader][WARN] {len(df):,} rows parsed for {int(good.sum()):,} lines; "
+              f"re-parsing the block line by line")
+        df, lines = _parse_lines(arr, starts, line_len, good, names, usecols)
+        return df, starts[lines], line_len[lines], int(too_long.sum())
+    return df, starts[good], line_len[good], int(too_long.sum())
+
+
+def _parse_lines(arr: np.ndarray, starts, line_len, good, names: list, usecols=None) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Slow path with the pandas reader's rules, one line at a time: invalid UTF-8
+    dropped, short lines padded, blank lines skipped, default NA strings missing.
+    Returns the frame and the indices of the lines it holds.
+    """
+    rows, lines = [], []
+    for i in np.flatnonzero(good).tolist():
+        text = arr[starts[i]:starts[i] + line_len[i]].tobytes().decode("utf-8", errors="ignore")
+        if not text.strip(" \t\r"):
+            continue
+        fields = (text[:-1] if text.endswith("\r") else text).split("|")
+        rows.append(fields + [None] * (len(names) - len(fields)))
+        lines.append(i)
+    na = set(_NA_VALUES)
+    columns = [c for c in names if usecols is None or c in usecols]
+    df = pd.DataFrame({
+        c: pd.Series([None if r[j] in na else r[j] for r in rows], dtype=str)
+        for j, c in enumerate(names) if c in columns
+    })
+    return df, np.asarray(lines, dtype=np.int64)
+
+
+def _read_arrow(data, names: list, usecols=None) -> pd.DataFrame | None:
+    """Parse a block of complete lines with pyarrow's threaded CSV reader (None on invalid UTF-8)."""
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    columns = list(usecols) if usecols is not None else list(names)
+    try:
+        table = pa_csv.read_csv(
+            pa.BufferReader(data),
+            read_options=pa_csv.ReadOptions(column_names=names, use_threads=True),
+            parse_options=pa_csv.ParseOptions(delimiter="|", quote_char=False),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={c: pa.string() for c in names}, include_columns=columns,
+                null_values=_NA_VALUES, strings_can_be_null=True,
+            ),
+        )
+    except pa.ArrowInvalid:
+        return None
+    # pandas orders usecols by file position
+    return table.select([c for c in names if c in columns]).to_pandas()
+
+
+def default_backend() -> str:
+    """``config.READER_BACKEND`` (read at call time, so run_all --reader reaches every step)."""
+    import config
+    return config.READER_BACKEND
+
+
+def iter_chunks(path: Path, names: list, chunksize: int, with_offsets: bool = False, stats: dict | None = None,
+                usecols=None, backend: str | None = None):
+    """
+    Stream ``path`` as string DataFrames of roughly ``chunksize`` rows.
+
+    Args:
+        path: Pipe-delimited FEC file (itcont.txt, itpas2.txt, ...)
+        names: Column names (e.g. config.INDIV_COLS)
+        chunksize: Target rows per chunk
+        with_offsets: Also add a ``__LINE_LEN`` column (byte length of each line)
+        stats: Optional dict updated with line/byte/malformed counters
+        usecols: Only materialize these columns (much cheaper to parse)
+        backend: "pandas" or "arrow" (default: config.READER_BACKEND)
+
+    The index of every chunk is the byte offset of each row's line in ``path``.
+    """
+    path = Path(path)
+    backend = backend or default_backend()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown reader backend {backend!r} (expected one of {BACKENDS})")
+    blocks = _iter_mapped_blocks if backend == "arrow" else _iter_blocks
+    for base, block in blocks(path, _block_bytes_for(path, chunksize)):
+        df, starts, line_len, n_bad = _parse_block(block, names, usecols, backend, stats)
+        df.index = pd.Index(starts + base, dtype=np.int64)
+        if with_offsets:
+            df[LINE_LEN_COL] = line_len.astype(np.int32)
+        if stats is not None:
+            stats["lines"] = stats.get("lines", 0) + len(df) + n_bad
+            stats["malformed_lines"] = stats.get("malformed_lines", 0) + n_bad
+            stats["bytes"] = stats.get("bytes", 0) + len(block)
+        yield df
+
+
+def iter_lines(path: Path, names: list, offsets, lengths, chunksize: int, with_offsets: bool = False,
+               stats: dict | None = None, usecols=None, backend: str | None = None):
+    """
+    Like ``iter_chunks``, but parse only the lines at ``offsets``/``lengths``
+    (e.g. from a transaction index) instead of streaming the whole file.
+    Rows keep their line's byte offset in ``path`` as the index.
+    """
+    import mmap
+
+    backend = backend or default_backend()
+    offsets = np.asarray(offsets, dtype=np.int64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    order = np.argsort(offsets, kind="stable")
+    offsets, lengths = offsets[order], lengths[order]
+    if len(offsets) == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for lo in range(0, len(offsets), chunksize):
+            offs, lens = offsets[lo:lo + chunksize], lengths[lo:lo + chunksize]
+            block = b"\n".join([mm[o:o + n] for o, n in zip(offs.tolist(), lens.tolist())]) + b"\n"
+            block_starts = np.concatenate(([0], np.cumsum(lens + 1)[:-1]))
+            df, starts, line_len, n_bad = _parse_block(block, names, usecols, backend, stats)
+            df.index = pd.Index(offs[np.searchsorted(block_starts, starts)], dtype=np.int64)
+            if with_offsets:
+                df[LINE_LEN_COL] = line_len.astype(np.int32)
+            if stats is not None:
+                stats["lines"] = stats.get("lines", 0) + len(df) + n_bad
+                stats["malformed_lines"] = stats.get("malformed_lines", 0) + n_bad
+                stats["bytes"] = stats.get("bytes", 0) + len(block)
+            yield df
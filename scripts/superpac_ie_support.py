@@ -1,8 +1,16 @@
 ## 02
 
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from config import TARGET_ELECTION_YR, write_csv_no_blank_line, get_output_dir, get_output_prefix
+from config import TARGET_ELECTION_YR, write_intermediate, get_output_dir, get_output_prefix
+from amount_sketches import SketchSet, sketch_path
+from stream_reader import LINE_LEN_COL
+from txn_index import TxnIndexBuilder, index_path
+from reconciliation import ReconLedger, ledger_path, AMT_COL
+from netting import amount_mask, split_signed, netted_columns, side_mask
+from id_codes import IdCodes
+from sampling import Sample
 
 def _find_file(folder: Path, startswith: str) -> Path:
     for ext in ("*.txt", "*.dat"):
@@ -21,9 +29,13 @@ def main(office_filter=None, cfg=None):
     Args:
         office_filter: Set of office codes to include (e.g., {'S'}, {'P'}, or {'S', 'P'})
         cfg: Optional config dict (for testing/flexibility)
+
+    Returns:
+        The typed intermediate (CAND_ID, CAND_ELECTION_YR, support columns),
+        so merge_support can take it in memory when run in the same process.
     """
     if cfg is None:
-        from config import CM_DIR, CN_DIR, PAS2_DIR, CM_COLS, CN_COLS, ITPAS2_COLS, SUFFIX, VALID_OFFICES, CHUNKSIZE
+        from config import CM_DIR, CN_DIR, PAS2_DIR, CM_COLS, CN_COLS, ITPAS2_COLS, SUFFIX, VALID_OFFICES, CHUNKSIZE, BUILD_AMOUNT_SKETCHES, BUILD_TXN_INDEX, SAMPLE, NETTING_POLICY
     else:
         CM_DIR = cfg['CM_DIR']
         CN_DIR = cfg['CN_DIR']
@@ -34,6 +46,11 @@ def main(office_filter=None, cfg=None):
         SUFFIX = cfg['SUFFIX']
         VALID_OFFICES = cfg['VALID_OFFICES']
         CHUNKSIZE = cfg['CHUNKSIZE']
+        BUILD_AMOUNT_SKETCHES = cfg.get('BUILD_AMOUNT_SKETCHES', True)
+        BUILD_TXN_INDEX = cfg.get('BUILD_TXN_INDEX', True)
+        SAMPLE = cfg.get('SAMPLE')
+        NETTING_POLICY = cfg.get('NETTING_POLICY', "gross")
+    sample = SAMPLE or Sample()
     
     # Use provided office_filter or default to all valid offices
     if office_filter is None:
@@ -55,6 +72,11 @@ def main(office_filter=None, cfg=None):
 
     print(f"[superpac_ie_support][{prefix}] Loading candidate master:", cn_path)
     cn = pd.read_csv(cn_path, sep="|", header=None, names=CN_COLS, dtype=str, encoding_errors="ignore")
+    # Dense codes: chunks are hashed once, every later test is an array lookup
+    cmte_codes = IdCodes(cm["CMTE_ID"])
+    cand_codes = IdCodes(cn["CAND_ID"])
+    is_superpac = cmte_codes.mask(superpac_ids)
+    in_sample = sample.cmte_table(cmte_codes)
 
     # Filter to specified offices
     cn = cn[cn["CAND_OFFICE"].isin(office_filter)].copy()
@@ -64,61 +86,104 @@ def main(office_filter=None, cfg=None):
     before = len(cn)
     cn = cn[cn["CAND_ELECTION_YR"] == TARGET_ELECTION_YR].copy()
     print(f"[superpac_ie_support][{prefix}] After year filter {TARGET_ELECTION_YR}: {before:,} -> {len(cn):,}")
+    if sample.active:
+        cn = sample.restrict_candidates(cn)
+        print(f"[superpac_ie_support][{prefix}] PARTIAL RUN {sample.to_dict()}: {len(cn):,} candidates selected")
 
-    valid_cand_ids = set(cn["CAND_ID"].dropna().unique())
-    cn_index = cn.set_index("CAND_ID")
+    is_valid_cand = cand_codes.mask(cn["CAND_ID"].dropna())
+    cand_year = cn.drop_duplicates("CAND_ID").set_index("CAND_ID")["CAND_ELECTION_YR"]
 
-    totals = {}
+    # Gross and refund (negative amount) accumulators; refunds stay 0 under the gross policy
+    totals = np.zeros(len(cand_codes))
+    refunds = np.zeros(len(cand_codes))
+    seen = np.zeros(len(cand_codes), dtype=bool)
+    sketches = SketchSet("superpac_ie") if BUILD_AMOUNT_SKETCHES else None
 
     print(f"[superpac_ie_support][{prefix}] Streaming itpas2:", itpas2_path)
-    reader = pd.read_csv(
-        itpas2_path, sep="|", header=None, names=ITPAS2_COLS,
-        dtype=str, chunksize=CHUNKSIZE, encoding_errors="ignore",
-        on_bad_lines="skip"
-    )
+    txn_index = TxnIndexBuilder(itpas2_path) if BUILD_TXN_INDEX else None
+    recon = ReconLedger("superpac_ie_support", itpas2_path, scale=sample.scale, netting=NETTING_POLICY)
+    reader = sample.iter_chunks(itpas2_path, ITPAS2_COLS, CHUNKSIZE, "superpac_ie", cand_ids=cn["CAND_ID"].dropna(),
+                                with_offsets=txn_index is not None, stats=recon.reader_stats)
 
     for i, chunk in enumerate(reader, start=1):
+        chunk = recon.start(chunk)
         # IE support
-        chunk = chunk[chunk["TRANSACTION_TP"] == "24E"]
+        chunk = recon.keep(chunk, chunk["TRANSACTION_TP"] == "24E", "transaction_type")
         if chunk.empty:
             continue
 
         # IE-only committees
-        chunk = chunk[chunk["CMTE_ID"].isin(superpac_ids)]
+        cmte = cmte_codes.encode(chunk["CMTE_ID"])
+        if sample.cmte_fraction:
+            chunk = recon.keep(chunk, in_sample[cmte], "sample")
+            cmte = cmte[in_sample[cmte]]
+        chunk = recon.keep(chunk, is_superpac[cmte], "committee_type")
         if chunk.empty:
             continue
 
         # Filter to valid candidates for this office type
-        chunk = chunk[chunk["CAND_ID"].isin(valid_cand_ids)]
+        chunk = chunk.assign(CAND_CODE=cand_codes.encode(chunk["CAND_ID"]))
+        chunk = recon.keep(chunk, chunk["CAND_CODE"].to_numpy() >= 0, "unmapped_candidate")
+        chunk = recon.keep(chunk, is_valid_cand[chunk["CAND_CODE"].to_numpy()], "office_year")
         if chunk.empty:
             continue
 
-        amt = pd.to_numeric(chunk["TRANSACTION_AMT"], errors="coerce")
-        mask = amt.notna() & (amt > 0)
-        if not mask.any():
+        amt = chunk[AMT_COL]
+        chunk = recon.keep(chunk, amount_mask(amt, NETTING_POLICY), "non_positive_amount")
+        if chunk.empty:
             continue
 
-        amt = amt.loc[mask]
-        chunk = chunk.loc[mask]
+        amt = chunk[AMT_COL]
+        recon.count_kept("SUPERPAC_IE_SUPPORT", amt)
+
+        cand = chunk["CAND_CODE"].to_numpy()
+        gross, negative = split_signed(amt.to_numpy())
+        totals += np.bincount(cand, weights=gross, minlength=len(totals))
+        if NETTING_POLICY != "gross":
+            refunds += np.bincount(cand, weights=negative, minlength=len(refunds))
+        seen[cand] = True
+
+        side = side_mask(amt.to_numpy(), NETTING_POLICY)
+        if side is not None:
+            chunk, amt = chunk[side], amt[side]
 
-        grp = amt.groupby(chunk["CAND_ID"]).sum()
-        for cand_id, val in grp.items():
-            totals[cand_id] = totals.get(cand_id, 0.0) + float(val)
+        if sketches is not None:
+            sketches.update(chunk["CAND_ID"], amt)
+        if txn_index is not None:
+            txn_index.add(chunk["CAND_ID"], chunk.index, chunk[LINE_LEN_COL])
 
         if i % 5 == 0:
-            print(f"[superpac_ie_support][{prefix}] chunks: {i:,} | candidates so far: {len(totals):,}")
+            print(f"[superpac_ie_support][{prefix}] chunks: {i:,} | candidates so far: {int(seen.sum()):,}")
 
-    rows = [{"CAND_ID": k, "SUPERPAC_IE_SUPPORT": v} for k, v in totals.items()]
+    columns = netted_columns("SUPERPAC_IE_SUPPORT", totals[seen], refunds[seen], NETTING_POLICY)
     out = (
-        pd.DataFrame(rows, columns=["CAND_ID", "SUPERPAC_IE_SUPPORT"])
-          .merge(cn_index, left_on="CAND_ID", right_index=True, how="left")
+        pd.DataFrame({"CAND_ID": cand_codes.decode(np.flatnonzero(seen)), **columns})
+          .assign(CAND_ELECTION_YR=lambda d: d["CAND_ID"].map(cand_year))
+          [["CAND_ID", "CAND_ELECTION_YR", *columns]]
           .sort_values("SUPERPAC_IE_SUPPORT", ascending=False)
     )
+    # Committee-sampled runs estimate the full totals
+    out[list(columns)] *= sample.scale
 
     from config import SUFFIX
-    out_path = out_dir / f"{prefix}_superpac_ie_support_{SUFFIX}.csv"
-    write_csv_no_blank_line(out, out_path, index=False)
+    out_path = write_intermediate(out, out_dir, f"{prefix}_superpac_ie_support_{SUFFIX}")
     print(f"[superpac_ie_support][{prefix}] Wrote:", out_path)
 
+    if sketches is not None:
+        sk_path = sketch_path(out_dir, prefix, sketches.category, SUFFIX)
+        sketches.to_json(sk_path, office=prefix, cycle=SUFFIX)
+        print(f"[superpac_ie_support][{prefix}] Wrote:", sk_path)
+
+    if txn_index is not None:
+        ix_path = index_path(out_dir, prefix, "superpac_ie", SUFFIX)
+        n_lines = txn_index.save(ix_path)
+        print(f"[superpac_ie_support][{prefix}] Wrote: {ix_path} ({n_lines:,} indexed lines)")
+
+    rc_path = ledger_path(out_dir, prefix, "superpac_ie_support", SUFFIX)
+    recon.save(rc_path, {"SUPERPAC_IE_SUPPORT": out["SUPERPAC_IE_SUPPORT"].sum()})
+    print(f"[superpac_ie_support][{prefix}] Wrote:", rc_path)
+
+    return out
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,278 @@
+"""
+Transfer-graph stage: pass-through money that reaches candidates via other committees.
+
+PAC and party money often reaches a campaign through committee-to-committee
+transfers (affiliated transfers, joint fundraising distributions) that the
+itoth file records and the itpas2-based steps ignore. This step:
+
+1. Streams itoth once and keeps the transfer types in ``TRANSFER_TYPES``
+   (18G received / 24G sent by default). Both sides of a transfer usually
+   report it, so (source, destination, date, amount) duplicates are dropped.
+2. Builds the committee flow graph on dense ``IdCodes`` node codes and sums
+   parallel edges into a CSR adjacency (indptr by source committee). A few
+   arrays of int32/float64 per edge keep millions of edges in memory.
+3. Starts from the money each committee originates (what it sends on beyond
+   what it received by transfer) and pushes it along the edges in
+   proportion to each committee's outflows for at most
+   ``TRANSFER_MAX_HOPS`` hops. Candidate committees (ccl) absorb what
+   reaches them, and what never reaches one is reported as unattributed.
+4. Spreads the absorbed amounts to candidates with the same committee ->
+   candidate rule as individual receipts (``allocation.AllocationMatrix``,
+   ``INDIV_ALLOCATION``).
+
+Steps 1-3 do not depend on the office, so their result is saved once per
+cycle (``outputs/transfer_trace_{cycle}.npz``) and reused by the other
+offices' runs until itoth, cm, ccl or the tracing settings change; only
+step 4 runs per office.
+
+Transfers between committees of the same candidate are ignored. A
+committee-sampled run (``--sample-committees``) traces the full graph and
+keeps what the sampled candidate committees absorb, scaled like the other
+steps' totals. The result
+is ``ATTRIBUTED_TRANSFER_SUPPORT``, which merge_support reports next to,
+not inside, TOTAL_SUPPORT. Without an itoth file the column is zero.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import TARGET_ELECTION_YR, TRANSFER_SUPPORT_COL, write_intermediate, get_output_dir, get_output_prefix
+from individual_support import _find_file, _build_cmte_to_cand
+from id_codes import IdCodes
+from allocation import AllocationMatrix
+from sampling import Sample
+
+
+class TransferGraph:
+    """Committee flow graph in CSR form: edges sorted by source node, parallel edges summed."""
+
+    def __init__(self, src, dst, amount, n_nodes: int):
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        key, inverse = np.unique(src * n_nodes + dst, return_inverse=True)
+        self.n_nodes = n_nodes
+        self.amount = np.bincount(inverse, weights=np.asarray(amount, dtype=float), minlength=len(key))
+        self.src = (key // n_nodes).astype(np.int32)
+        self.dst = (key % n_nodes).astype(np.int32)
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(self.src, minlength=n_nodes))])
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.src)
+
+    def outflow(self) -> np.ndarray:
+        return np.bincount(self.src, weights=self.amount, minlength=self.n_nodes)
+
+    def inflow(self) -> np.ndarray:
+        return np.bincount(self.dst, weights=self.amount, minlength=self.n_nodes)
+
+    def propagate(self, origin, absorbing, max_hops: int) -> tuple[np.ndarray, list]:
+        """
+        Push ``origin`` (amount per node) along the edges, split by each
+        node's outflow shares, for at most ``max_hops`` hops. Nodes flagged
+        in ``absorbing`` keep what reaches them.
+
+        Returns (absorbed amount per node, amount absorbed at each hop).
+        """
+        out = self.outflow()
+        share = self.amount / out[self.src]   # row-normalized CSR values
+        absorbed = np.zeros(self.n_nodes)
+        moving = np.asarray(origin, dtype=float)
+        per_hop = []
+        for _ in range(max_hops):
+            # Transposed CSR mat-vec: what every node receives this hop
+            arrived = np.bincount(self.dst, weights=share * moving[self.src], minlength=self.n_nodes)
+            absorbed += np.where(absorbing, arrived, 0.0)
+            per_hop.append(float(arrived[absorbing].sum()))
+            moving = np.where(absorbing, 0.0, arrived)
+            if not moving.any():
+                break
+        return absorbed, per_hop
+
+
+def _scan_transfers(path, cols, chunksize, cmte_codes, cand_of_cmte, transfer_types, sample) -> pd.DataFrame:
+    """(SRC, DST, DATE, AMT) per transfer row of itoth, node-coded and deduplicated."""
+    parts = []
+    usecols = ["CMTE_ID", "TRANSACTION_TP", "TRANSACTION_DT", "TRANSACTION_AMT", "OTHER_ID"]
+    outgoing = {tp for tp, direction in transfer_types.items() if direction == "out"}
+    for chunk in sample.iter_chunks(path, cols, chunksize, "transfer", usecols=usecols):
+        chunk = chunk[chunk["TRANSACTION_TP"].isin(list(transfer_types))]
+        if chunk.empty:
+            continue
+        filer = cmte_codes.encode(chunk["CMTE_ID"])
+        other = cmte_codes.encode(chunk["OTHER_ID"])
+        sent = chunk["TRANSACTION_TP"].isin(outgoing).to_numpy()
+        src = np.where(sent, filer, other)
+        dst = np.where(sent, other, filer)
+        amt = pd.to_numeric(chunk["TRANSACTION_AMT"], errors="coerce").to_numpy()
+        date = pd.to_numeric(chunk["TRANSACTION_DT"], errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+        # Known committees, positive amounts, no transfers within one candidate's committees
+        same_cand = (cand_of_cmte[src] == cand_of_cmte[dst]) & (cand_of_cmte[src] >= 0)
+        ok = (src >= 0) & (dst >= 0) & (src != dst) & (amt > 0) & ~same_cand
+        parts.append(pd.DataFrame({"SRC": src[ok], "DST": dst[ok], "DATE": date[ok], "AMT": amt[ok]}))
+    if not parts:
+        return pd.DataFrame({"SRC": [], "DST": [], "DATE": [], "AMT": []})
+    edges = pd.concat(parts, ignore_index=True)
+    # The sender's 24G and the recipient's 18G describe the same transfer
+    return edges.drop_duplicates(["SRC", "DST", "DATE", "AMT"])
+
+
+def _load_trace(path: Path, key: dict):
+    """Absorbed amount per committee code and the trace stats saved under ``key`` (None if absent or stale)."""
+    if not path.exists():
+        return None
+    with np.load(path) as z:
+        meta = json.loads(str(z["meta"]))
+        if meta.pop("key") != json.loads(json.dumps(key)):
+            return None
+        return z["absorbed"], meta
+
+
+def _save_trace(path: Path, key: dict, absorbed: np.ndarray, stats: dict) -> None:
+    # Written under a temporary name so a concurrent reader never sees a partial file
+    tmp = path.with_name(path.stem + ".tmp.npz")
+    np.savez(tmp, absorbed=absorbed, meta=np.array(json.dumps({"key": key, **stats})))
+    os.replace(tmp, path)
+
+
+def _trace(itoth_path, cols, chunksize, cmte_codes, cand_of_cmte, is_cand_cmte, transfer_types, max_hops,
+           sample, cache_path: Path | None, key: dict) -> np.ndarray:
+    """Amount absorbed per candidate committee code, reusing the saved trace when ``key`` matches."""
+    cached = _load_trace(cache_path, key) if cache_path is not None else None
+    if cached is not None and len(cached[0]) == len(cmte_codes):
+        absorbed, stats = cached
+        print(f"[transfer_support] Reusing the transfer trace of {itoth_path.name} ({cache_path.name})")
+    else:
+        print("[transfer_support] Streaming itoth:", itoth_path)
+        edges = _scan_transfers(itoth_path, cols, chunksize, cmte_codes, cand_of_cmte, transfer_types, sample)
+        graph = TransferGraph(edges["SRC"].to_numpy(), edges["DST"].to_numpy(), edges["AMT"].to_numpy(),
+                              len(cmte_codes))
+        # Money a committee sends on beyond what it received by transfer originates there
+        origin = np.clip(graph.outflow() - graph.inflow(), 0.0, None)
+        absorbed, per_hop = graph.propagate(origin, is_cand_cmte, max_hops)
+        stats = {"transfers": len(edges), "edges": graph.n_edges, "amount": float(graph.amount.sum()),
+                 "originated": float(origin.sum()), "per_hop": per_hop}
+        if cache_path is not None:
+            _save_trace(cache_path, key, absorbed, stats)
+    print(f"[transfer_support] {stats['transfers']:,} transfers -> graph of {len(cmte_codes):,} committees, "
+          f"{stats['edges']:,} edges (${stats['amount']:,.2f})")
+    print(f"[transfer_support] Originated ${stats['originated']:,.2f}; reached candidate committees by hop: "
+          + ", ".join(f"{h + 1}: ${v:,.2f}" for h, v in enumerate(stats["per_hop"]))
+          + f" | unattributed ${stats['originated'] - absorbed.sum():,.2f}")
+    return absorbed
+
+
+def main(office_filter=None, cfg=None):
+    """
+    Attribute committee-to-committee transfers to candidates.
+
+    Args:
+        office_filter: Set of office codes to include (e.g., {'S'}, {'P'}, or {'S', 'P'})
+        cfg: Optional config dict (for testing/flexibility)
+
+    Returns:
+        The typed intermediate (CAND_ID, CAND_ELECTION_YR, ATTRIBUTED_TRANSFER_SUPPORT),
+        so merge_support can take it in memory when run in the same process.
+    """
+    if cfg is None:
+        from config import (CM_DIR, CN_DIR, CCL_DIR, OTH_DIR, CM_COLS, CN_COLS, CCL_COLS, ITOTH_COLS, SUFFIX,
+                            VALID_OFFICES, CHUNKSIZE, SAMPLE, INDIV_ALLOCATION, ALLOCATION_DSGN_WEIGHTS,
+                            TRANSFER_TYPES, TRANSFER_MAX_HOPS, OUT_DIR)
+    else:
+        CM_DIR = cfg['CM_DIR']
+        CN_DIR = cfg['CN_DIR']
+        CCL_DIR = cfg['CCL_DIR']
+        OTH_DIR = cfg['OTH_DIR']
+        CM_COLS = cfg['CM_COLS']
+        CN_COLS = cfg['CN_COLS']
+        CCL_COLS = cfg['CCL_COLS']
+        ITOTH_COLS = cfg['ITOTH_COLS']
+        SUFFIX = cfg['SUFFIX']
+        VALID_OFFICES = cfg['VALID_OFFICES']
+        CHUNKSIZE = cfg['CHUNKSIZE']
+        SAMPLE = cfg.get('SAMPLE')
+        INDIV_ALLOCATION = cfg.get('INDIV_ALLOCATION', "principal")
+        ALLOCATION_DSGN_WEIGHTS = cfg.get('ALLOCATION_DSGN_WEIGHTS', {})
+        TRANSFER_TYPES = cfg.get('TRANSFER_TYPES', {"18G": "in", "24G": "out"})
+        TRANSFER_MAX_HOPS = cfg.get('TRANSFER_MAX_HOPS', 3)
+        OUT_DIR = cfg.get('OUT_DIR')
+    sample = SAMPLE or Sample()
+
+    if office_filter is None:
+        office_filter = VALID_OFFICES
+    office_filter = set(office_filter)
+
+    out_dir = get_output_dir(office_filter)
+    prefix = get_output_prefix(office_filter)
+    columns = ["CAND_ID", "CAND_ELECTION_YR", TRANSFER_SUPPORT_COL]
+
+    try:
+        itoth_path = _find_file(OTH_DIR, "itoth")
+    except FileNotFoundError:
+        print(f"[transfer_support][{prefix}] No itoth file in {OTH_DIR}; {TRANSFER_SUPPORT_COL} will be 0")
+        out = pd.DataFrame({c: pd.Series(dtype=float if c == TRANSFER_SUPPORT_COL else object) for c in columns})
+        write_intermediate(out, out_dir, f"{prefix}_transfer_support_{SUFFIX}")
+        return out
+
+    cm_path, ccl_path = _find_file(CM_DIR, "cm"), _find_file(CCL_DIR, "ccl")
+    cm = pd.read_csv(cm_path, sep="|", header=None, names=CM_COLS, dtype=str, encoding_errors="ignore")
+    cn = pd.read_csv(_find_file(CN_DIR, "cn"), sep="|", header=None, names=CN_COLS, dtype=str, encoding_errors="ignore")
+    ccl = pd.read_csv(ccl_path, sep="|", header=None, names=CCL_COLS, dtype=str, encoding_errors="ignore")
+
+    # Graph nodes: every committee known to cm or ccl
+    cmte_codes = IdCodes(cm["CMTE_ID"], ccl["CMTE_ID"])
+    cand_codes = IdCodes(cn["CAND_ID"])
+    cmte_to_cand = _build_cmte_to_cand(ccl)
+    cand_of_cmte = cmte_codes.lookup(
+        pd.Series(cand_codes.encode(list(cmte_to_cand.values())), index=list(cmte_to_cand.keys())),
+        fill=-1, dtype=np.int32,
+    )
+    alloc = AllocationMatrix.from_ccl(ccl, cmte_codes, cand_codes, INDIV_ALLOCATION, ALLOCATION_DSGN_WEIGHTS)
+    is_cand_cmte = alloc.row_share()[:-1] > 0
+    in_sample = sample.cmte_table(cmte_codes)[:-1]
+
+    cn = cn[cn["CAND_OFFICE"].isin(office_filter)].copy()
+    cn["CAND_ELECTION_YR"] = cn["CAND_ELECTION_YR"].astype(str).str.extract(r"(\d{4})", expand=False)
+    cn = cn[cn["CAND_ELECTION_YR"] == TARGET_ELECTION_YR].copy()
+    if sample.active:
+        cn = sample.restrict_candidates(cn)
+        print(f"[transfer_support][{prefix}] PARTIAL RUN {sample.to_dict()}: {len(cn):,} candidates selected")
+    is_valid_cand = cand_codes.mask(cn["CAND_ID"].dropna())
+    cand_year = cn.drop_duplicates("CAND_ID").set_index("CAND_ID")["CAND_ELECTION_YR"]
+
+    # The trace is the same for every office; it changes with the files and settings it is built from
+    key = {
+        "sources": {str(p): [p.stat().st_size, p.stat().st_mtime] for p in (itoth_path, cm_path, ccl_path)},
+        "transfer_types": TRANSFER_TYPES, "max_hops": TRANSFER_MAX_HOPS, "allocation": INDIV_ALLOCATION,
+        "designation_weights": ALLOCATION_DSGN_WEIGHTS, "max_chunks": sample.max_chunks,
+    }
+    cache_path = Path(OUT_DIR) / f"transfer_trace_{SUFFIX}.npz" if OUT_DIR is not None else None
+    absorbed = _trace(itoth_path, ITOTH_COLS, CHUNKSIZE, cmte_codes, cand_of_cmte, is_cand_cmte, TRANSFER_TYPES,
+                      TRANSFER_MAX_HOPS, sample, cache_path, key)
+
+    if sample.cmte_fraction:
+        # Sampled like a receipt: by the candidate committee the money reaches
+        absorbed = np.where(in_sample, absorbed, 0.0)
+    totals = alloc.allocate(absorbed) * sample.scale
+    keep = np.flatnonzero(is_valid_cand[:-1] & (totals > 0))
+    out = (
+        pd.DataFrame({"CAND_ID": cand_codes.decode(keep), TRANSFER_SUPPORT_COL: totals[keep]})
+          .assign(CAND_ELECTION_YR=lambda d: d["CAND_ID"].map(cand_year))
+          [columns]
+          .sort_values(TRANSFER_SUPPORT_COL, ascending=False)
+    )
+
+    out_path = write_intermediate(out, out_dir, f"{prefix}_transfer_support_{SUFFIX}")
+    print(f"[transfer_support][{prefix}] Wrote: {out_path} ({len(out):,} candidates, "
+          f"${out[TRANSFER_SUPPORT_COL].sum():,.2f})")
+    return out
+
+
+if __name__ == "__main__":
+    main()
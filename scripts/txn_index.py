@@ -0,0 +1,169 @@
+"""
+Byte-offset transaction index: CAND_ID -> raw lines in itcont/itpas2.
+
+The support steps record the byte offset and length of every line that
+contributed to a candidate's total while they stream the raw file. The index
+is stored as sorted int64 arrays in CSR layout (one slice per candidate), so a
+drill-down is a binary search plus a few mmap slices.
+
+Usage:
+    python txn_index.py drilldown S0FL00338
+    python txn_index.py drilldown P00003392 --office presidential --category individual --limit 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+OFFICE_FILTERS = {"senate": {"S"}, "presidential": {"P"}, "total": {"S", "P"}}
+
+
+def index_path(out_dir: Path, prefix: str, category: str, suffix: str) -> Path:
+    """Location of a category's transaction index, next to the CSV outputs."""
+    return out_dir / f"{prefix}_{category}_txn_index_{suffix}.npz"
+
+
+class TxnIndexBuilder:
+    """
+    Collects (CAND_ID, offset, length) per chunk and writes the CSR index.
+    ``allocation`` records the committee -> candidate rule of itcont indexes
+    (a line of a multi-candidate committee is indexed under every candidate
+    it was allocated to).
+    """
+
+    def __init__(self, source_path: Path, allocation: str | None = None):
+        self.source_path = Path(source_path)
+        self.allocation = allocation
+        self._cands: list[np.ndarray] = []
+        self._offsets: list[np.ndarray] = []
+        self._lengths: list[np.ndarray] = []
+
+    def add(self, cand_ids: pd.Series, offsets, lengths) -> None:
+        if len(cand_ids) == 0:
+            return
+        self._cands.append(np.asarray(cand_ids, dtype=object))
+        self._offsets.append(np.asarray(offsets, dtype=np.int64))
+        self._lengths.append(np.asarray(lengths, dtype=np.int32))
+
+    def save(self, path: Path) -> int:
+        """Write the index; returns the number of indexed lines."""
+        if self._cands:
+            cands = np.concatenate(self._cands)
+            offsets = np.concatenate(self._offsets)
+            lengths = np.concatenate(self._lengths)
+        else:
+            cands = np.empty(0, dtype=object)
+            offsets = np.empty(0, dtype=np.int64)
+            lengths = np.empty(0, dtype=np.int32)
+
+        codes, uniques = pd.factorize(cands, sort=True)
+        order = np.lexsort((offsets, codes))
+        indptr = np.zeros(len(uniques) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(uniques)), out=indptr[1:])
+
+        st = self.source_path.stat()
+        meta = {"source": str(self.source_path), "size": st.st_size, "mtime": st.st_mtime}
+        if self.allocation is not None:
+            meta["allocation"] = self.allocation
+        np.savez(
+            path,
+            cand_ids=np.asarray(uniques, dtype="U9"),
+            indptr=indptr,
+            offsets=offsets[order],
+            lengths=lengths[order],
+            meta=np.array(json.dumps(meta)),
+        )
+        return int(len(offsets))
+
+
+class TxnIndex:
+    """Read side of a saved index."""
+
+    def __init__(self, path: Path):
+        with np.load(path) as z:
+            self.cand_ids = z["cand_ids"]
+            self.indptr = z["indptr"]
+            self.offsets = z["offsets"]
+            self.lengths = z["lengths"]
+            self.meta = json.loads(str(z["meta"]))
+        self.path = Path(path)
+        self.source_path = Path(self.meta["source"])
+        self.allocation = self.meta.get("allocation")
+
+    def lookup(self, cand_id: str) -> tuple[np.ndarray, np.ndarray]:
+        """Byte offsets and lengths of ``cand_id``'s lines (empty if not indexed)."""
+        i = int(np.searchsorted(self.cand_ids, cand_id))
+        if i >= len(self.cand_ids) or self.cand_ids[i] != cand_id:
+            return self.offsets[:0], self.lengths[:0]
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        return self.offsets[lo:hi], self.lengths[lo:hi]
+
+    def is_stale(self) -> bool:
+        st = self.source_path.stat()
+        return st.st_size != self.meta["size"] or st.st_mtime != self.meta["mtime"]
+
+    def read_lines(self, cand_id: str, limit: int | None = None) -> list[bytes]:
+        offsets, lengths = self.lookup(cand_id)
+        if limit is not None:
+            offsets, lengths = offsets[:limit], lengths[:limit]
+        if len(offsets) == 0:
+            return []
+        with open(self.source_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return [mm[o:o + n].rstrip(b"\r") for o, n in zip(offsets.tolist(), lengths.tolist())]
+
+
+def drilldown(cand_id: str, office: str = "total", categories=None, limit: int | None = None, out=None) -> int:
+    """Print the raw rows behind ``cand_id`` from every index in the office folder."""
+    from config import SUFFIX, get_output_dir
+
+    out = out or sys.stdout
+    out_dir = get_output_dir(OFFICE_FILTERS[office])
+    paths = sorted(out_dir.glob(f"{office}_*_txn_index_{SUFFIX}.npz"))
+    if categories:
+        paths = [p for p in paths if any(p.name == index_path(out_dir, office, c, SUFFIX).name for c in categories)]
+    if not paths:
+        print(f"[txn_index][{office}] No transaction indexes found in {out_dir}", file=sys.stderr)
+        return 0
+
+    total = 0
+    for p in paths:
+        idx = TxnIndex(p)
+        if idx.is_stale():
+            print(f"[txn_index][WARN] {idx.source_path} changed since {p.name} was built", file=sys.stderr)
+        offsets, _ = idx.lookup(cand_id)
+        print(f"[txn_index][{office}] {p.name}: {len(offsets):,} lines in {idx.source_path.name}", file=sys.stderr)
+        for line in idx.read_lines(cand_id, limit):
+            out.write(line.decode("utf-8", errors="ignore") + "\n")
+        total += len(offsets)
+    return total
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Drill down from a candidate to the raw FEC rows behind its totals.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    dd = sub.add_parser("drilldown", help="Print the raw itcont/itpas2 lines for a CAND_ID")
+    dd.add_argument("cand_id")
+    dd.add_argument("--office", choices=sorted(OFFICE_FILTERS), default="total")
+    dd.add_argument("--category", action="append", help="Only these categories (individual, superpac_ie, pac)")
+    dd.add_argument("--limit", type=int, help="Max lines per category")
+    dd.add_argument("--out", type=Path, help="Write rows to this file instead of stdout")
+    args = ap.parse_args()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            n = drilldown(args.cand_id, args.office, args.category, args.limit, out=f)
+        print(f"Wrote {n:,} rows -> {args.out}")
+    else:
+        drilldown(args.cand_id, args.office, args.category, args.limit)
+
+
+if __name__ == "__main__":
+    main()
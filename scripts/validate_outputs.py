@@ -9,13 +9,20 @@ Checks for:
 7. Sample candidate verification
 """
 
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from typing import Dict, List, Tuple
 import sys
 
 # Import config for paths
-from config import SENATE_OUT_DIR, PRESIDENTIAL_OUT_DIR, TOTAL_OUT_DIR, SUFFIX, TARGET_ELECTION_YR
+from config import SENATE_OUT_DIR, PRESIDENTIAL_OUT_DIR, TOTAL_OUT_DIR, SUFFIX, TARGET_ELECTION_YR, PAC_ORG_TYPES
+from config import find_intermediate, read_intermediate, detail_support_cols, PARTY_SUPPORT_COL
+from reconciliation import load_ledgers, check_ledger
+from netting import NET_PREFIX, NET_TOTAL_SUPPORT_COL
+
+# Share of raw lines the reader may skip as malformed before CHECK 10 fails
+MAX_MALFORMED_SHARE = 0.001
 
 
 class ValidationReport:
@@ -76,47 +83,92 @@ class ValidationReport:
         return len(self.error_messages) == 0
 
 
+OFFICES = [
+    ('senate', 'senate', SENATE_OUT_DIR),
+    ('pres', 'presidential', PRESIDENTIAL_OUT_DIR),
+    ('total', 'total', TOTAL_OUT_DIR),
+]
+
+# dtypes for reading the publication CSVs when no typed copy exists
+OUTPUT_DTYPES = {
+    'CAND_ID': str, 'CAND_ELECTION_YR': str, 'CAND_NAME': str, 'CAND_PTY_AFFILIATION': str,
+    'CAND_OFFICE': str, 'CAND_OFFICE_ST': str, 'HAS_MONEY': 'int64',
+}
+
+
+def _expected_files() -> Dict[str, Path]:
+    files = {}
+    for key, prefix, out_dir in OFFICES:
+        files[f'{key}_final'] = out_dir / f"{prefix}_final_support_table_{SUFFIX}.csv"
+        files[f'{key}_no_support'] = out_dir / f"{prefix}_candidates_no_support_{SUFFIX}.csv"
+        files[f'{key}_all'] = out_dir / f"{prefix}_candidates_all_with_flag_{SUFFIX}.csv"
+        # Support-step intermediates are typed Parquet/Feather now; accept whichever exists
+        for short, name in [('superpac', 'superpac_ie_support'), ('indiv', 'individual_support'),
+                            ('pac', 'pac_support_corp_nonconnected')]:
+            stem = f"{prefix}_{name}_{SUFFIX}"
+            files[f'{key}_{short}'] = find_intermediate(out_dir, stem) or out_dir / f"{stem}.parquet"
+    return files
+
+
+def _split_all(all_df: pd.DataFrame, key: str, data: Dict[str, pd.DataFrame]):
+    """final / no_support are the HAS_MONEY slices of all_with_flag, in the same order."""
+    has_money = all_df['HAS_MONEY'].to_numpy() == 1
+    data[f'{key}_all'] = all_df
+    data[f'{key}_final'] = all_df[has_money]
+    data[f'{key}_no_support'] = all_df[~has_money]
+
+
+def results_to_data(results: Dict[str, Dict[str, pd.DataFrame]]) -> Dict[str, pd.DataFrame]:
+    """
+    Flatten in-memory pipeline results ({'senate': {'final': df, 'superpac': df, ...}, ...})
+    into the {'senate_final': df, ...} layout the checks use.
+    """
+    data = {}
+    for key, prefix, _ in OFFICES:
+        for name, df in results.get(prefix, {}).items():
+            if df is not None:
+                data[f'{key}_{name}'] = df
+    return data
+
+
 def check_files_exist(report: ValidationReport) -> Dict[str, pd.DataFrame]:
-    """Check that all expected output files exist and load them."""
+    """
+    Check that all expected output files exist and load them.
+    Typed columnar copies are preferred over re-parsing the CSVs.
+    """
     print("\n" + "="*80)
     print("CHECK 1: File Existence")
     print("="*80)
     
-    files_to_check = {
-        'senate_final': SENATE_OUT_DIR / f"senate_final_support_table_{SUFFIX}.csv",
-        'senate_no_support': SENATE_OUT_DIR / f"senate_candidates_no_support_{SUFFIX}.csv",
-        'senate_all': SENATE_OUT_DIR / f"senate_candidates_all_with_flag_{SUFFIX}.csv",
-        'senate_superpac': SENATE_OUT_DIR / f"senate_superpac_ie_support_{SUFFIX}.csv",
-        'senate_indiv': SENATE_OUT_DIR / f"senate_individual_support_{SUFFIX}.csv",
-        'senate_pac': SENATE_OUT_DIR / f"senate_pac_support_corp_nonconnected_{SUFFIX}.csv",
-        
-        'pres_final': PRESIDENTIAL_OUT_DIR / f"presidential_final_support_table_{SUFFIX}.csv",
-        'pres_no_support': PRESIDENTIAL_OUT_DIR / f"presidential_candidates_no_support_{SUFFIX}.csv",
-        'pres_all': PRESIDENTIAL_OUT_DIR / f"presidential_candidates_all_with_flag_{SUFFIX}.csv",
-        'pres_superpac': PRESIDENTIAL_OUT_DIR / f"presidential_superpac_ie_support_{SUFFIX}.csv",
-        'pres_indiv': PRESIDENTIAL_OUT_DIR / f"presidential_individual_support_{SUFFIX}.csv",
-        'pres_pac': PRESIDENTIAL_OUT_DIR / f"presidential_pac_support_corp_nonconnected_{SUFFIX}.csv",
-        
-        'total_final': TOTAL_OUT_DIR / f"total_final_support_table_{SUFFIX}.csv",
-        'total_no_support': TOTAL_OUT_DIR / f"total_candidates_no_support_{SUFFIX}.csv",
-        'total_all': TOTAL_OUT_DIR / f"total_candidates_all_with_flag_{SUFFIX}.csv",
-        'total_superpac': TOTAL_OUT_DIR / f"total_superpac_ie_support_{SUFFIX}.csv",
-        'total_indiv': TOTAL_OUT_DIR / f"total_individual_support_{SUFFIX}.csv",
-        'total_pac': TOTAL_OUT_DIR / f"total_pac_support_corp_nonconnected_{SUFFIX}.csv",
-    }
-    
-    loaded_data = {}
-    
+    files_to_check = _expected_files()
     for key, filepath in files_to_check.items():
         if filepath.exists():
+            report.success(f"Found {filepath.name}")
+        else:
+            report.error(f"Missing file: {filepath}")
+    
+    loaded_data = {}
+    for key, prefix, out_dir in OFFICES:
+        typed = find_intermediate(out_dir, f"{prefix}_candidates_all_with_flag_{SUFFIX}")
+        if typed is not None and typed.suffix != '.csv':
+            try:
+                _split_all(read_intermediate(typed), key, loaded_data)
+                report.success(f"Loaded typed copy {typed.name} ({len(loaded_data[f'{key}_all']):,} rows)")
+            except Exception as e:
+                report.error(f"Failed to load {typed.name}: {e}")
+        
+        for name in ('final', 'no_support', 'all', 'superpac', 'indiv', 'pac'):
+            k = f'{key}_{name}'
+            filepath = files_to_check[k]
+            if k in loaded_data or not filepath.exists():
+                continue
             try:
-                df = pd.read_csv(filepath)
-                loaded_data[key] = df
-                report.success(f"Found and loaded {filepath.name} ({len(df):,} rows)")
+                if filepath.suffix == '.csv':
+                    loaded_data[k] = pd.read_csv(filepath, dtype=OUTPUT_DTYPES)
+                else:
+                    loaded_data[k] = read_intermediate(filepath)
             except Exception as e:
                 report.error(f"Failed to load {filepath.name}: {e}")
-        else:
-            report.error(f"Missing file: {filepath}")
     
     return loaded_data
 
@@ -171,21 +223,22 @@ def check_office_filters(data: Dict[str, pd.DataFrame], report: ValidationReport
             report.warning(f"{key}: Missing CAND_OFFICE column")
             continue
         
-        offices = df['CAND_OFFICE'].unique()
-        if len(offices) == 1 and offices[0] == expected_office:
+        bad = df['CAND_OFFICE'].to_numpy() != expected_office
+        if not bad.any():
             report.success(f"{key}: Only contains office '{expected_office}' as expected")
         else:
-            report.error(f"{key}: Expected only '{expected_office}', found {sorted(offices)}")
+            found = sorted(df.loc[bad, 'CAND_OFFICE'].astype(str).unique())
+            report.error(f"{key}: Expected only '{expected_office}', found {found}")
     
     # Check total contains both
     if 'total_final' in data:
         df = data['total_final']
         if 'CAND_OFFICE' in df.columns:
-            offices = set(df['CAND_OFFICE'].unique())
-            if 'S' in offices or 'P' in offices:
-                report.success(f"total_final: Contains offices {sorted(offices)}")
+            in_sp = df['CAND_OFFICE'].isin(['S', 'P'])
+            if in_sp.any() and in_sp.all():
+                report.success(f"total_final: Contains offices {sorted(df['CAND_OFFICE'].unique())}")
             else:
-                report.error(f"total_final: Expected S and/or P, found {sorted(offices)}")
+                report.error(f"total_final: Expected S and/or P, found {sorted(df['CAND_OFFICE'].astype(str).unique())}")
 
 
 def check_election_year(data: Dict[str, pd.DataFrame], report: ValidationReport):
@@ -200,11 +253,12 @@ def check_election_year(data: Dict[str, pd.DataFrame], report: ValidationReport)
                 report.warning(f"{name}: Missing CAND_ELECTION_YR column")
                 continue
             
-            years = df['CAND_ELECTION_YR'].unique()
-            if len(years) == 1 and str(years[0]) == TARGET_ELECTION_YR:
+            years = df['CAND_ELECTION_YR'].astype(str)
+            bad = years.to_numpy() != TARGET_ELECTION_YR
+            if not bad.any():
                 report.success(f"{name}: All candidates from election year {TARGET_ELECTION_YR}")
             else:
-                years_str = ', '.join(sorted([str(y) for y in years]))
+                years_str = ', '.join(sorted(years.unique()))
                 report.error(f"{name}: Expected only {TARGET_ELECTION_YR}, found: {years_str}")
 
 
@@ -238,7 +292,7 @@ def check_total_calculations(data: Dict[str, pd.DataFrame], report: ValidationRe
             
             # Allow small floating point differences
             diff = (calculated - df['TOTAL_SUPPORT']).abs()
-            max_diff = diff.max()
+            max_diff = diff.max() if len(diff) else 0.0
             
             if max_diff < 0.01:
                 report.success(f"{name}: TOTAL_SUPPORT correctly calculated (max diff: {max_diff:.6f})")
@@ -251,6 +305,16 @@ def check_total_calculations(data: Dict[str, pd.DataFrame], report: ValidationRe
                     cols_to_show = ['CAND_ID', 'CAND_NAME'] + support_cols + ['TOTAL_SUPPORT']
                     print(problem_rows[cols_to_show].to_string(index=False))
 
+            # NETTING_POLICY "both": the NET_ columns add up the same way
+            net_cols = [NET_PREFIX + col for col in support_cols]
+            if NET_TOTAL_SUPPORT_COL in df.columns and all(col in df.columns for col in net_cols):
+                net_diff = (df[net_cols].sum(axis=1) - df[NET_TOTAL_SUPPORT_COL]).abs()
+                net_max = net_diff.max() if len(net_diff) else 0.0
+                if net_max < 0.01:
+                    report.success(f"{name}: {NET_TOTAL_SUPPORT_COL} correctly calculated (max diff: {net_max:.6f})")
+                else:
+                    report.error(f"{name}: {NET_TOTAL_SUPPORT_COL} mismatch (max diff: {net_max:.2f})")
+
 
 def check_has_money_flag(data: Dict[str, pd.DataFrame], report: ValidationReport):
     """Check HAS_MONEY flag is consistent."""
@@ -305,19 +369,17 @@ def check_final_vs_all_consistency(data: Dict[str, pd.DataFrame], report: Valida
                         f"= {combined_count:,} but {all_key} has {all_count:,} rows")
         
         # Check candidate IDs match
-        final_ids = set(final_df['CAND_ID'].unique())
-        no_support_ids = set(no_support_df['CAND_ID'].unique())
-        all_ids = set(all_df['CAND_ID'].unique())
+        combined_ids = pd.Index(final_df['CAND_ID']).append(pd.Index(no_support_df['CAND_ID'])).unique()
+        all_ids = pd.Index(all_df['CAND_ID']).unique()
         
-        combined_ids = final_ids | no_support_ids
-        if combined_ids == all_ids:
+        missing = all_ids.difference(combined_ids)
+        extra = combined_ids.difference(all_ids)
+        if len(missing) == 0 and len(extra) == 0:
             report.success(f"{final_key} + {no_support_key} candidate IDs match {all_key}")
         else:
-            missing = all_ids - combined_ids
-            extra = combined_ids - all_ids
-            if missing:
+            if len(missing):
                 report.error(f"{all_key} has {len(missing)} IDs not in final+no_support")
-            if extra:
+            if len(extra):
                 report.error(f"final+no_support has {len(extra)} IDs not in {all_key}")
 
 
@@ -346,29 +408,29 @@ def check_senate_plus_presidential_equals_total(data: Dict[str, pd.DataFrame], r
                     f"but Total has {total_count:,} rows")
     
     # Candidate ID check
-    senate_ids = set(senate_df['CAND_ID'].unique())
-    pres_ids = set(pres_df['CAND_ID'].unique())
-    total_ids = set(total_df['CAND_ID'].unique())
+    senate_ids = pd.Index(senate_df['CAND_ID']).unique()
+    pres_ids = pd.Index(pres_df['CAND_ID']).unique()
+    total_ids = pd.Index(total_df['CAND_ID']).unique()
     
-    combined_ids = senate_ids | pres_ids
+    combined_ids = senate_ids.union(pres_ids)
+    missing = total_ids.difference(combined_ids)
+    extra = combined_ids.difference(total_ids)
     
-    if combined_ids == total_ids:
+    if len(missing) == 0 and len(extra) == 0:
         report.success("Senate + Presidential candidate IDs exactly match Total")
     else:
-        missing = total_ids - combined_ids
-        extra = combined_ids - total_ids
-        if missing:
+        if len(missing):
             report.error(f"Total has {len(missing)} candidate IDs not in Senate+Presidential")
-            print(f"  Missing IDs: {list(missing)[:5]}")
-        if extra:
+            print(f"  Missing IDs: {list(missing[:5])}")
+        if len(extra):
             report.error(f"Senate+Presidential has {len(extra)} candidate IDs not in Total")
-            print(f"  Extra IDs: {list(extra)[:5]}")
+            print(f"  Extra IDs: {list(extra[:5])}")
     
     # Check for overlap (should be none)
-    overlap = senate_ids & pres_ids
-    if overlap:
+    overlap = senate_ids.intersection(pres_ids)
+    if len(overlap):
         report.error(f"Found {len(overlap)} candidates appearing in BOTH Senate and Presidential files")
-        print(f"  Overlapping IDs: {list(overlap)[:10]}")
+        print(f"  Overlapping IDs: {list(overlap[:10])}")
     else:
         report.success("No candidates appear in both Senate and Presidential files")
     
@@ -385,6 +447,18 @@ def check_senate_plus_presidential_equals_total(data: Dict[str, pd.DataFrame], r
     else:
         report.error(f"Support totals don't match: Senate+Presidential = ${combined_support:,.2f} "
                     f"but Total = ${total_support:,.2f} (diff: ${diff:,.2f})")
+    
+    # Party support sits outside TOTAL_SUPPORT (party-only candidates have HAS_MONEY 0), so compare the _all tables
+    all_keys = ['senate_all', 'pres_all', 'total_all']
+    if all(k in data and PARTY_SUPPORT_COL in data[k].columns for k in all_keys):
+        senate_party, pres_party, total_party = (float(data[k][PARTY_SUPPORT_COL].sum()) for k in all_keys)
+        diff = abs(senate_party + pres_party - total_party)
+        if diff < 0.01:
+            report.success(f"{PARTY_SUPPORT_COL} matches: Senate (${senate_party:,.2f}) + Presidential "
+                          f"(${pres_party:,.2f}) = Total (${total_party:,.2f})")
+        else:
+            report.error(f"{PARTY_SUPPORT_COL} doesn't match: Senate+Presidential = ${senate_party + pres_party:,.2f} "
+                        f"but Total = ${total_party:,.2f} (diff: ${diff:,.2f})")
 
 
 def check_support_intermediate_files(data: Dict[str, pd.DataFrame], report: ValidationReport):
@@ -395,19 +469,82 @@ def check_support_intermediate_files(data: Dict[str, pd.DataFrame], report: Vali
     
     # Check Senate intermediate files
     if all(k in data for k in ['senate_final', 'senate_superpac', 'senate_indiv', 'senate_pac']):
-        final_ids = set(data['senate_final']['CAND_ID'].unique())
+        final_ids = data['senate_final']['CAND_ID'].to_numpy()
         
         for key in ['senate_superpac', 'senate_indiv', 'senate_pac']:
-            intermediate_ids = set(data[key]['CAND_ID'].unique())
+            intermediate_ids = data[key]['CAND_ID'].to_numpy()
             
             # All intermediate IDs should be in final
-            extra = intermediate_ids - final_ids
-            if extra:
-                report.warning(f"{key} has {len(extra)} candidate IDs not in senate_final")
+            n_extra = int((~np.isin(intermediate_ids, final_ids)).sum())
+            if n_extra:
+                report.warning(f"{key} has {n_extra} candidate IDs not in senate_final")
             else:
                 report.success(f"{key}: All candidate IDs appear in senate_final")
 
 
+RECON_STEPS = {
+    'superpac_ie_support': ['SUPERPAC_IE_SUPPORT'],
+    'individual_support': ['INDIVIDUAL_SUPPORT'],
+    'pac_support': list(PAC_ORG_TYPES.values()) + [PARTY_SUPPORT_COL],
+}
+
+
+def check_reconciliation_ledgers(data: Dict[str, pd.DataFrame], report: ValidationReport):
+    """Check raw-file -> output reconciliation ledgers written by the streaming steps."""
+    print("\n" + "="*80)
+    print("CHECK 10: Raw-to-Output Reconciliation")
+    print("="*80)
+    
+    for key, prefix, out_dir in OFFICES:
+        ledgers = load_ledgers(out_dir, prefix, SUFFIX)
+        for step, cols in RECON_STEPS.items():
+            name = f"{prefix}/{step}"
+            ledger = ledgers.get(step)
+            if ledger is None:
+                report.warning(f"{name}: No reconciliation ledger")
+                continue
+            
+            problems = check_ledger(ledger)
+            for problem in problems:
+                report.error(f"{name}: {problem}")
+            if not problems:
+                report.success(f"{name}: {ledger['lines']:,} raw lines reconcile to outputs")
+            
+            if ledger['malformed_lines']:
+                share = ledger['malformed_lines'] / max(ledger['lines'], 1)
+                msg = f"{name}: {ledger['malformed_lines']:,} malformed lines ({share:.2%}) skipped by the reader"
+                if share > MAX_MALFORMED_SHARE:
+                    report.error(msg)
+                else:
+                    report.warning(msg)
+            
+            # Source republished since the ledger was written (e.g. after an incremental refresh)
+            src = Path(ledger['source'])
+            stale = (not src.exists() or src.stat().st_size != ledger['source_size']
+                     or src.stat().st_mtime != ledger['source_mtime'])
+            
+            all_df = data.get(f'{key}_all')
+            for col in cols:
+                if all_df is None or col not in all_df.columns:
+                    continue
+                scale = ledger.get('scale', 1.0)
+                kept = ledger['kept'].get(col, {'dollars': 0.0})['dollars'] * scale
+                total = float(all_df[col].sum())
+                # Scaled totals are not whole cents; merge_support rounds each row to the cent
+                tol = 0.01 if scale == 1.0 else 0.01 + 0.005 * len(all_df)
+                if abs(kept - total) <= max(tol, 1e-9 * abs(total)):
+                    continue
+                msg = f"{name}: ledger kept ${kept:,.2f} of {col} but {key}_all sums to ${total:,.2f}"
+                if stale:
+                    report.warning(msg + " (source file changed since the ledger was written)")
+                else:
+                    report.error(msg)
+            
+            dropped = ", ".join(f"{stage} {v['rows']:,} (${v['dollars']:,.0f})"
+                                for stage, v in ledger['dropped'].items() if v['rows'])
+            print(f"  {name} dropped: {dropped or 'none'}")
+
+
 def print_summary_statistics(data: Dict[str, pd.DataFrame]):
     """Print summary statistics for each dataset."""
     print("\n" + "="*80)
@@ -437,12 +574,18 @@ def print_summary_statistics(data: Dict[str, pd.DataFrame]):
                 total = df[col].sum()
                 pct = (total / df['TOTAL_SUPPORT'].sum() * 100) if df['TOTAL_SUPPORT'].sum() > 0 else 0
                 print(f"    {col:30s}: ${total:15,.2f} ({pct:5.1f}%)")
+        
+        detail_cols = [col for col in detail_support_cols(split_leadership=True) if col in df.columns]
+        if detail_cols:
+            print("\n  Reported outside TOTAL_SUPPORT:")
+            for col in detail_cols:
+                print(f"    {col:30s}: ${df[col].sum():15,.2f}")
 
 
 def spot_check_sample_candidates(data: Dict[str, pd.DataFrame], report: ValidationReport):
     """Display sample candidates for manual verification."""
     print("\n" + "="*80)
-    print("CHECK 10: Sample Candidates for Manual Verification")
+    print("CHECK 11: Sample Candidates for Manual Verification")
     print("="*80)
     
     for name in ['senate_final', 'pres_final']:
@@ -450,6 +593,9 @@ def spot_check_sample_candidates(data: Dict[str, pd.DataFrame], report: Validati
             continue
         
         df = data[name]
+        if df.empty:
+            report.warning(f"{name}: No candidates to spot check")
+            continue
         
         # Top 5 by total support
         print(f"\n{name.upper()} - Top 5 by Total Support:")
@@ -459,31 +605,16 @@ def spot_check_sample_candidates(data: Dict[str, pd.DataFrame], report: Validati
         print(top5.to_string(index=False))
         
         report.info(f"{name}: Top candidate: {top5.iloc[0]['CAND_NAME']} (${top5.iloc[0]['TOTAL_SUPPORT']:,.2f})")
+        print(f"  Raw rows behind a candidate: python txn_index.py drilldown {top5.iloc[0]['CAND_ID']} --office {name.split('_')[0].replace('pres', 'presidential')}")
 
 
-def main():
-    """Run all validation checks."""
-    print("\n" + "█"*80)
-    print("█ FEC CAMPAIGN FINANCE PIPELINE VALIDATION")
-    print("█"*80)
-    print(f"\nTarget Election Year: {TARGET_ELECTION_YR}")
-    print(f"Cycle Suffix: {SUFFIX}")
-    print(f"\nDirectories:")
-    print(f"  Senate:       {SENATE_OUT_DIR}")
-    print(f"  Presidential: {PRESIDENTIAL_OUT_DIR}")
-    print(f"  Total:        {TOTAL_OUT_DIR}")
-    
-    report = ValidationReport()
-    
-    # Load all data
-    data = check_files_exist(report)
-    
+def run_checks(data: Dict[str, pd.DataFrame], report: ValidationReport) -> bool:
+    """Run every check against already-loaded tables and print the report."""
     if not data:
         report.error("No data files loaded - cannot proceed with validation")
         report.print_summary()
         return False
     
-    # Run all checks
     check_no_duplicates(data, report)
     check_office_filters(data, report)
     check_election_year(data, report)
@@ -492,15 +623,48 @@ def main():
     check_final_vs_all_consistency(data, report)
     check_senate_plus_presidential_equals_total(data, report)
     check_support_intermediate_files(data, report)
+    check_reconciliation_ledgers(data, report)
     
     # Summary stats and spot checks
     print_summary_statistics(data)
     spot_check_sample_candidates(data, report)
     
     # Print final report
-    success = report.print_summary()
+    return report.print_summary()
+
+
+def validate(results: Dict[str, Dict[str, pd.DataFrame]]) -> bool:
+    """
+    Validate the frames a pipeline run just produced, without reloading any file.
+
+    Args:
+        results: {'senate'|'presidential'|'total': {'final', 'no_support', 'all',
+                 'superpac', 'indiv', 'pac': DataFrame}}
+    """
+    print("\n" + "█"*80)
+    print("█ FEC CAMPAIGN FINANCE PIPELINE VALIDATION (in-process)")
+    print("█"*80)
+    return run_checks(results_to_data(results), ValidationReport())
+
+
+def main():
+    """Run all validation checks against the files on disk."""
+    print("\n" + "█"*80)
+    print("█ FEC CAMPAIGN FINANCE PIPELINE VALIDATION")
+    print("█"*80)
+    print(f"\nTarget Election Year: {TARGET_ELECTION_YR}")
+    print(f"Cycle Suffix: {SUFFIX}")
+    print(f"\nDirectories:")
+    print(f"  Senate:       {SENATE_OUT_DIR}")
+    print(f"  Presidential: {PRESIDENTIAL_OUT_DIR}")
+    print(f"  Total:        {TOTAL_OUT_DIR}")
+    
+    report = ValidationReport()
+    
+    # Load all data (typed columnar copies where available)
+    data = check_files_exist(report)
     
-    return success
+    return run_checks(data, report)
 
 
 if __name__ == "__main__":
@@ -5,13 +5,29 @@ from pathlib import Path
 # Import config
 try:
     from config import SENATE_OUT_DIR, PRESIDENTIAL_OUT_DIR, TOTAL_OUT_DIR, SUFFIX, TARGET_ELECTION_YR
+    from config import find_intermediate, read_intermediate
 except ImportError:
     print("ERROR: Could not import config. Make sure config.py is in the same directory.")
     sys.exit(1)
 
 
-def verify_data():
-    """Comprehensive data verification with detailed checks."""
+def _load_final(out_dir: Path, prefix: str) -> pd.DataFrame:
+    """Final support table, from the typed all_with_flag copy when there is one."""
+    typed = find_intermediate(out_dir, f"{prefix}_candidates_all_with_flag_{SUFFIX}")
+    if typed is not None and typed.suffix != ".csv":
+        df = read_intermediate(typed)
+        return df[df["HAS_MONEY"].to_numpy() == 1]
+    return pd.read_csv(out_dir / f"{prefix}_final_support_table_{SUFFIX}.csv")
+
+
+def verify_data(frames=None):
+    """
+    Comprehensive data verification with detailed checks.
+
+    Args:
+        frames: Optional {'senate'|'presidential'|'total': final support DataFrame}
+                from an in-process run; files are loaded when omitted
+    """
     
     print("\n" + "█"*80)
     print("█ COMPREHENSIVE DATA VERIFICATION")
@@ -29,9 +45,12 @@ def verify_data():
     print("="*80)
     
     try:
-        df_total = pd.read_csv(TOTAL_OUT_DIR / f"total_final_support_table_{SUFFIX}.csv")
-        df_senate = pd.read_csv(SENATE_OUT_DIR / f"senate_final_support_table_{SUFFIX}.csv")
-        df_pres = pd.read_csv(PRESIDENTIAL_OUT_DIR / f"presidential_final_support_table_{SUFFIX}.csv")
+        if frames is not None:
+            df_total, df_senate, df_pres = frames["total"], frames["senate"], frames["presidential"]
+        else:
+            df_total = _load_final(TOTAL_OUT_DIR, "total")
+            df_senate = _load_final(SENATE_OUT_DIR, "senate")
+            df_pres = _load_final(PRESIDENTIAL_OUT_DIR, "presidential")
         print(f"✅ Loaded all files successfully")
     except Exception as e:
         print(f"❌ ERROR loading files: {e}")
@@ -273,7 +292,20 @@ def verify_data():
     print(f"  25th percentile: ${q25:,.2f}")
     print(f"  75th percentile: ${q75:,.2f}")
     print(f"  95th percentile: ${q95:,.2f}")
-    
+
+    # Transaction-level distribution from the streaming sketches (no raw reread)
+    sketch_files = sorted(TOTAL_OUT_DIR.glob(f"total_*_amount_sketch_{SUFFIX}.json"))
+    if sketch_files:
+        from amount_sketches import load_and_merge
+        print(f"\nTransaction amount quantiles (TRANSACTION_AMT, from {len(sketch_files)} sketch files):")
+        for category, ss in load_and_merge(sketch_files).items():
+            td = ss.overall
+            print(f"  {category:18s} n={td.n:>11,}  p50=${td.quantile(0.5):>10,.2f}  "
+                  f"p90=${td.quantile(0.9):>10,.2f}  p99=${td.quantile(0.99):>12,.2f}")
+        info.append(f"Transaction amount sketches available for {len(sketch_files)} categories")
+    else:
+        print("\nNo transaction amount sketches found (run the support steps with BUILD_AMOUNT_SKETCHES = True)")
+
     # Test 9: Office-Specific Checks
     print("\n" + "="*80)
     print("[9/10] OFFICE-SPECIFIC CHECKS")